@@ -0,0 +1,95 @@
+'''
+Sequential first-fit admission, the part of the greedy award that has to stay in order.
+
+Moves are admitted one after the other while the running totals stay within their budgets
+(share_sweep.admit_within_budget: new-supplier spend against the PERCENT_NEW budget;
+capacity.admit_within_caps: volume and spend against a supplier's caps), so each admission
+depends on every earlier one. The loop runs over plain float arrays: compiled with Numba when
+it is installed, otherwise the same loop in Python. first_fit_budgets runs the loop for many
+budgets at once, for the new-share sweep and scenario batches.
+
+numba is optional (pip install numba); COMPILED tells which path is in use.
+'''
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+COMPILED = njit is not None
+
+
+def _first_fit_loop(usage, limits, admitted):
+    """Compiled kernel: admitted[i] = True for each row of usage that fits all limits, first fit in row order."""
+    spent = np.zeros(limits.shape[0])
+    for i in range(usage.shape[0]):
+        fits = True
+        for k in range(limits.shape[0]):
+            if not spent[k] + usage[i, k] <= limits[k]:
+                fits = False
+                break
+        if fits:
+            admitted[i] = True
+            for k in range(limits.shape[0]):
+                spent[k] += usage[i, k]
+
+
+def _first_fit_budgets_loop(costs, budgets, admitted):
+    """Compiled kernel: first fit of costs within each budget, admitted is budgets x costs."""
+    for b in range(budgets.shape[0]):
+        spent = 0.0
+        for i in range(costs.shape[0]):
+            if spent + costs[i] <= budgets[b]:
+                admitted[b, i] = True
+                spent += costs[i]
+
+
+if COMPILED:
+    _first_fit_loop = njit(cache=True, nogil=True)(_first_fit_loop)
+    _first_fit_budgets_loop = njit(cache=True, nogil=True)(_first_fit_budgets_loop)
+
+
+def _first_fit_python(usage, limits):
+    # lists, not array indexing: element access on NumPy arrays costs more than the loop itself
+    admitted = np.zeros(len(usage), dtype=bool)
+    if len(limits) == 1:
+        spent, limit = 0.0, limits[0]
+        for i, cost in enumerate(usage[:, 0].tolist()):
+            if spent + cost <= limit:
+                admitted[i] = True
+                spent += cost
+        return admitted
+    spent = [0.0] * len(limits)
+    for i, row in enumerate(usage.tolist()):
+        if all(s + u <= limit for s, u, limit in zip(spent, row, limits)):
+            admitted[i] = True
+            spent = [s + u for s, u in zip(spent, row)]
+    return admitted
+
+
+def first_fit(usage, limits):
+    """
+    First fit in the given order over several budgets: True for each row of usage (moves x
+    budgets) that fits all of limits given the rows admitted before it.
+    """
+    limits = np.asarray(limits, dtype=np.float64).reshape(-1)
+    usage = np.ascontiguousarray(usage, dtype=np.float64).reshape(len(usage), len(limits))
+    if not COMPILED:
+        return _first_fit_python(usage, limits.tolist())
+    admitted = np.zeros(len(usage), dtype=bool)
+    _first_fit_loop(usage, limits, admitted)
+    return admitted
+
+
+def first_fit_budgets(costs, budgets):
+    """budgets x costs admitted mask: first fit of costs in the given order within each budget."""
+    costs = np.ascontiguousarray(costs, dtype=np.float64)
+    budgets = np.asarray(budgets, dtype=np.float64).reshape(-1)
+    if not COMPILED:
+        admitted = [_first_fit_python(costs[:, None], [budget]) for budget in budgets.tolist()]
+        return np.array(admitted, dtype=bool).reshape(len(budgets), len(costs))
+    admitted = np.zeros((len(budgets), len(costs)), dtype=bool)
+    _first_fit_budgets_loop(costs, budgets, admitted)
+    return admitted
@@ -0,0 +1,148 @@
+'''
+MILP award optimizer (alternative to the greedy allocation in scenario_3.py).
+
+Every part gets exactly one of its options (a landed bid, or keeping the incumbent at its
+bid / WAPP landed cost) so that the total landed extended cost is minimal, i.e. the landed
+savings against the baseline are maximal, subject to:
+    - new-supplier spend <= percent_new * total baseline landed cost
+    - per-supplier caps on annual volume and landed spend moved to that supplier, in total or
+      per Division / Product Group (capacity.py)
+    - an optional allowed mask (exclusion rules) over the parts x suppliers matrix
+
+The side constraints are elastic: a violation is allowed at a penalty far above any saving,
+so parts that can only go to a capped supplier still get awarded, and the violation is
+reported. Solved with HiGHS through scipy: the LP relaxation first (a vertex solution has at
+most one fractional part per side constraint), then an exact MILP over the fractional parts
+and the parts the LP moved to capped suppliers, with the capacity left by the rest. The LP objective is a lower bound on any award, so the
+reported gap bounds the distance to the true optimum. scipy is optional; without it only
+the greedy mode is available.
+'''
+
+import time
+
+import numpy as np
+
+from bid_matrix import NO_AWARD
+
+try:
+    from scipy import sparse
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+except ImportError:
+    milp = None
+
+# Added to the cost of every switch so that ties are resolved towards the incumbent
+SWITCH_PENALTY = 1e-6
+# Cost per USD (or per USD worth of volume) of breaking a side constraint
+VIOLATION_PENALTY = 1e3
+
+
+def side_constraints(matrix, part_idx, supplier_idx, extended, is_new, percent_new=None, caps=None):
+    """(name, coefficients per option, limit, penalty per unit) for the share and cap constraints."""
+    rows = []
+    if percent_new is not None:
+        rows.append(("new supplier share", np.where(is_new, extended, 0.0),
+                     percent_new * matrix.baseline_cost.sum(), VIOLATION_PENALTY))
+    unit_scale = max(np.nanmax(matrix.landed, initial=1.0), 1.0)
+    for supplier, cap in (caps or {}).items():
+        on_supplier = is_new & (supplier_idx == matrix.code(supplier))
+        if not on_supplier.any():
+            continue
+        if cap.get("per") is not None:
+            groups = matrix.parts[cap["per"]].astype(str).to_numpy()[part_idx]
+            buckets = [(f"{supplier} {group}", on_supplier & (groups == group)) for group in np.unique(groups[on_supplier])]
+        else:
+            buckets = [(supplier, on_supplier)]
+        for name, on_bucket in buckets:
+            if cap.get("volume") is not None:
+                rows.append((f"{name} volume", np.where(on_bucket, matrix.volume[part_idx], 0.0),
+                             cap["volume"], VIOLATION_PENALTY * unit_scale))
+            if cap.get("spend") is not None:
+                rows.append((f"{name} spend", np.where(on_bucket, extended, 0.0),
+                             cap["spend"], VIOLATION_PENALTY))
+    return rows
+
+
+def _solve(cost, part_idx, rows, limits, penalties, integral):
+    """Minimize cost.x + penalties.slack with one option per part and rows.x - slack <= limits."""
+    n_vars, n_rows = len(cost), len(limits)
+    parts, part_of = np.unique(part_idx, return_inverse=True)
+    assign = sparse.hstack([
+        sparse.csr_array((np.ones(n_vars), (part_of, np.arange(n_vars))), shape=(len(parts), n_vars)),
+        sparse.csr_array((len(parts), n_rows)),
+    ]).tocsr()
+    c = np.concatenate([cost, penalties])
+    upper = np.concatenate([np.ones(n_vars), np.full(n_rows, np.inf)])
+    if n_rows:
+        side = sparse.hstack([sparse.csr_array(rows), -sparse.identity(n_rows, format="csr")]).tocsr()
+    if integral:
+        constraints = [LinearConstraint(assign, 1, 1)]
+        if n_rows:
+            constraints.append(LinearConstraint(side, -np.inf, limits))
+        integrality = np.concatenate([np.ones(n_vars), np.zeros(n_rows)])
+        result = milp(c, constraints=constraints, integrality=integrality, bounds=Bounds(0, upper),
+                      options={"disp": False, "presolve": False})
+    else:
+        result = linprog(c, A_ub=side if n_rows else None, b_ub=limits if n_rows else None,
+                         A_eq=assign, b_eq=np.ones(len(parts)), bounds=np.column_stack([np.zeros(len(c)), upper]),
+                         method="highs-ds")
+    if result.x is None:
+        raise ValueError(f"award optimizer failed: {result.message}")
+    return result.x[:n_vars], result.fun
+
+
+def optimize_awards(matrix, percent_new=None, caps=None, allowed=None):
+    """
+    Returns a dict with the award vector (supplier code per part, NO_AWARD where a part has
+    no option), its total landed cost, the lower bound and gap, constraint violations and
+    the solve time.
+
+    caps: {supplier: {"volume": max annual volume, "spend": max landed USD, "per": group column}},
+    counted over parts that move to the supplier (parts it already holds as incumbent are not
+    capped). keep_incumbents is applied through allowed (capacity.kept_mask).
+    """
+    if milp is None:
+        raise ImportError("award optimizer needs scipy (pip install scipy)")
+
+    start = time.time()
+    unit_costs = matrix.unit_costs(allowed)
+    part_idx, supplier_idx = np.nonzero(np.isfinite(unit_costs))
+    extended = unit_costs[part_idx, supplier_idx] * matrix.volume[part_idx]
+    is_new = supplier_idx != matrix.incumbent[part_idx]
+    cost = extended + SWITCH_PENALTY * is_new
+
+    constraints = side_constraints(matrix, part_idx, supplier_idx, extended, is_new, percent_new, caps)
+    rows = np.array([coef for _, coef, _, _ in constraints]).reshape(len(constraints), len(cost))
+    limits = np.array([limit for _, _, limit, _ in constraints], dtype=float)
+    penalties = np.array([penalty for _, _, _, penalty in constraints], dtype=float)
+
+    # 1. LP relaxation: lower bound, and an integral award for all but a handful of parts
+    x, lower_bound = _solve(cost, part_idx, rows, limits, penalties, integral=False)
+    integral = np.isclose(x, 1.0, atol=1e-7)
+    part_fixed = np.zeros(matrix.shape[0], dtype=bool)
+    part_fixed[part_idx[integral]] = True
+    # parts the LP moved to a capped supplier are re-solved too, so the cap is packed exactly
+    capped = np.isin(supplier_idx, [matrix.code(supplier) for supplier in (caps or {})]) & is_new
+    part_fixed[part_idx[integral & capped]] = False
+    chosen = integral & part_fixed[part_idx]
+
+    # 2. exact MILP over the fractional parts, with the capacity the fixed parts left
+    free = ~part_fixed[part_idx]
+    if free.any():
+        residual = limits - rows[:, chosen].sum(axis=1) if len(limits) else limits
+        x_free, _ = _solve(cost[free], part_idx[free], rows[:, free], residual, penalties, integral=True)
+        chosen[np.flatnonzero(free)[x_free > 0.5]] = True
+
+    award = np.full(matrix.shape[0], NO_AWARD, dtype=np.intp)
+    award[part_idx[chosen]] = supplier_idx[chosen]
+    usage = rows[:, chosen].sum(axis=1) if len(limits) else limits
+    violations = {name: float(used - limit) for (name, _, limit, _), used in zip(constraints, usage) if used > limit + 1e-6}
+    objective = float(cost[chosen].sum() + sum(p * v for p, v in zip(penalties, np.maximum(usage - limits, 0))))
+    return {
+        "award": award,
+        "landed_cost": float(extended[chosen].sum()),
+        "lower_bound": float(lower_bound),
+        "gap": objective - float(lower_bound),
+        "exact_parts": int(len(np.unique(part_idx[free]))),
+        "violations": violations,
+        "seconds": time.time() - start,
+    }
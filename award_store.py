@@ -0,0 +1,147 @@
+'''
+Parquet store of scenario awards, and a diff between two runs.
+
+Every scenario run also writes its final award next to the xlsx: one row per part with the
+ROW ID #, selected supplier, reason, supplier country, landed extended cost and landed savings,
+plus the run settings and summary figures as file metadata. Supplier, reason and country are
+dictionary encoded, so a 14k part award is a few hundred KB and loads in milliseconds.
+
+    python award_store.py <old award.parquet> <new award.parquet>
+
+joins the two runs on ROW ID # and prints the switched parts, the landed savings delta by
+supplier and by country, and the reason changes.
+'''
+
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+AWARD_COLUMNS = {
+    "ROW ID #": "ROW ID #",
+    "Supplier": "Selected Supplier",
+    "Reason": "Reason",
+    "Country": "Country",
+    "Landed Extended Cost USD": "Landed Extended Cost USD",
+    "Landed Cost Savings USD": "Landed Cost Savings USD",
+}
+CODED_COLUMNS = ["Supplier", "Reason", "Country"]
+METADATA_KEY = b"scenario_run"
+
+
+def award_path(output_file):
+    """Award file next to a scenario xlsx."""
+    return os.path.splitext(output_file)[0] + " award.parquet"
+
+
+def award_frame(output_df):
+    """Compact award of a scenario output frame: coded text columns, numeric cost and savings."""
+    award = pd.DataFrame({col: output_df[source].to_numpy() for col, source in AWARD_COLUMNS.items()
+                          if source in output_df.columns})
+    award["ROW ID #"] = award["ROW ID #"].astype(str)
+    for col in CODED_COLUMNS:
+        if col in award.columns:
+            award[col] = award[col].astype(str).astype("category")
+    for col in ["Landed Extended Cost USD", "Landed Cost Savings USD"]:
+        award[col] = pd.to_numeric(award[col], errors="coerce")
+    return award
+
+
+def write_award(output_df, path, metadata=None):
+    """Write the award of output_df to path with metadata (JSON-able dict). Returns path, or None without pyarrow."""
+    if pq is None:
+        print("pyarrow not installed, skipping award store")
+        return None
+    table = pa.Table.from_pandas(award_frame(output_df), preserve_index=False)
+    run = {"written": time.strftime("%Y-%m-%d %H:%M:%S"), **(metadata or {})}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           METADATA_KEY: json.dumps(run, default=str).encode()})
+    pq.write_table(table, path, compression="zstd")
+    return path
+
+
+def read_award(path):
+    """(award frame, run metadata dict) of an award file."""
+    table = pq.read_table(path)
+    metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+    return table.to_pandas(), metadata
+
+
+def _savings_by(old, new, key):
+    """Landed savings per key value in each run and the delta, largest changes first."""
+    by = pd.concat([old.groupby(key, observed=True)["Landed Cost Savings USD"].sum().rename("Old savings USD"),
+                    new.groupby(key, observed=True)["Landed Cost Savings USD"].sum().rename("New savings USD")],
+                   axis=1).fillna(0.0)
+    by["Delta USD"] = by["New savings USD"] - by["Old savings USD"]
+    by = by[by["Delta USD"].abs() > 0.005]
+    return by.reindex(by["Delta USD"].abs().sort_values(ascending=False).index)
+
+
+def diff_awards(old, new):
+    """
+    Differences between two award frames, joined on ROW ID #. Returns a dict of frames:
+    switched (parts whose supplier changed), by_supplier and by_country (landed savings delta),
+    reasons (parts per old / new reason pair, over the parts whose reason changed), and
+    unmatched (ROW ID # present in one run only).
+    """
+    joined = old.merge(new, on="ROW ID #", how="outer", suffixes=(" old", " new"), indicator=True)
+    both = joined[joined["_merge"] == "both"]
+    supplier_old = both["Supplier old"].astype(str)
+    supplier_new = both["Supplier new"].astype(str)
+    switched = both.loc[supplier_old != supplier_new, ["ROW ID #", "Supplier old", "Supplier new",
+                                                        "Landed Cost Savings USD old", "Landed Cost Savings USD new"]]
+    switched = switched.assign(**{"Delta USD": switched["Landed Cost Savings USD new"].fillna(0)
+                                  - switched["Landed Cost Savings USD old"].fillna(0)})
+
+    reason_old = both["Reason old"].astype(str)
+    reason_new = both["Reason new"].astype(str)
+    changed = both[reason_old != reason_new]
+    reasons = (changed.groupby([changed["Reason old"].astype(str), changed["Reason new"].astype(str)])
+               .size().rename("Parts").sort_values(ascending=False).reset_index())
+
+    result = {
+        "switched": switched.reset_index(drop=True),
+        "by_supplier": _savings_by(old, new, "Supplier"),
+        "reasons": reasons,
+        "unmatched": joined.loc[joined["_merge"] != "both", ["ROW ID #", "_merge"]].reset_index(drop=True),
+    }
+    if "Country" in old.columns and "Country" in new.columns:
+        result["by_country"] = _savings_by(old, new, "Country")
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python award_store.py <old award.parquet> <new award.parquet>")
+    start_time = time.time()
+    (old, old_run), (new, new_run) = read_award(sys.argv[1]), read_award(sys.argv[2])
+    diff = diff_awards(old, new)
+    print(f"Old: {sys.argv[1]} ({old_run.get('written', '?')})")
+    print(f"New: {sys.argv[2]} ({new_run.get('written', '?')})")
+    settings = sorted(set(old_run.get("settings", {})) | set(new_run.get("settings", {})))
+    for key in settings:
+        before, after = old_run.get("settings", {}).get(key), new_run.get("settings", {}).get(key)
+        if before != after:
+            print(f"  {key}: {before} -> {after}")
+
+    switched = diff["switched"]
+    print(f"\nParts switched: {len(switched)} (landed savings delta ${switched['Delta USD'].sum():,.2f})")
+    print(switched.head(20).to_string(index=False))
+    print("\nLanded savings delta by supplier:")
+    print(diff["by_supplier"].to_string())
+    if "by_country" in diff:
+        print("\nLanded savings delta by country:")
+        print(diff["by_country"].to_string())
+    print(f"\nReason changes: {int(diff['reasons']['Parts'].sum()) if len(diff['reasons']) else 0} parts")
+    print(diff["reasons"].to_string(index=False))
+    if len(diff["unmatched"]):
+        print(f"\nROW ID # in one run only: {len(diff['unmatched'])}")
+    print(f"\n⏱ Time taken: {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,247 @@
+'''
+Stage timings of scenario_3.py on synthetic bidsheets, kept per commit.
+
+Generates a landed bidsheet shaped like the real one (Midland / Buchanan parts, sparse bids from
+SUPPLIERS suppliers, the same "<supplier> - R2 - <metric>" and savings columns) with the supplier
+port, freight multiplier, tariff and supplier reference tables that go with it, at BASE_PARTS
+parts times each scale. scenario_3.py then runs on each one in a scratch directory and times its
+stages (stage_timer.py): load, classification, exclusions, threshold assignment, finalizing,
+rationalization, metrics, award store and the Excel write.
+
+    python benchmark.py [scales] [suppliers]
+
+runs scales 1,5,10 by default (e.g. "python benchmark.py 1,5 80"), prints the stage table and
+appends one row per scale to TIMINGS_FILE, with the commit, so a regression shows up as a jump
+between commits. A run that fails is recorded with the stages it finished and the error.
+'''
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from bidsheet_schema import (FOB_METRIC, FOB_PCT_SAVINGS, FOB_USD_SAVINGS, LANDED_METRIC, LANDED_PCT_SAVINGS,
+                             LANDED_USD_SAVINGS)
+from landed_store import write_landed
+from lookups import PORT_COUNTRY_MAP
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIO_SCRIPT = os.path.join(REPO_DIR, "scenario_scripts", "scenario_3.py")
+TIMINGS_FILE = os.path.join(REPO_DIR, "benchmarks", "scenario_3 timings.csv")
+
+SCALES = (1, 5, 10)
+BASE_PARTS = 14000
+SUPPLIERS = 75
+# mean number of bids per part; a few suppliers bid on most parts, most bid on few
+BIDS_PER_PART = 5
+DIVISIONS = {"Midland": 0.8, "Buchanan": 0.2}
+METAL_TYPES = ["Aluminum", "Brass", "Copper", "Steel", "Stainless Steel"]
+STAGES = ["load", "classification", "exclusions", "threshold assignment", "optimizer", "finalizing",
+          "rationalization", "metrics", "award store", "excel write"]
+
+# bidsheet, lookup and output file names inside the scratch directory; scenario_3.py reads the
+# lookup tables from its working directory
+INPUT_FILE = "Bidsheet Master Consolidate Landed.csv"
+SUPPLIER_PORT_FILE = "Supplier Port per Part table 070925.csv"
+FREIGHT_FILE = "Freight cost mutipliers table 071025v2.csv"
+TARIFF_FILE = "tariff_part_level_cleaned.csv"
+REFERENCE_FILE = "new/outout-reference.csv"
+
+
+def supplier_names(count):
+    return [f"Supplier {j:03d}" for j in range(count)]
+
+
+def benchmark_scenario(suppliers):
+    """The scenario_3.yaml settings, with caps and rules on synthetic suppliers."""
+    return {
+        "input": INPUT_FILE,
+        "output": "scenario 3 benchmark",
+        "scenarios": [{
+            "name": "benchmark",
+            "mode": "greedy",
+            "percent_new": 0.65,
+            "enforce_percent_new": False,
+            "caps": {
+                suppliers[0]: {"volume": 5000000, "spend": 3000000, "keep_incumbents": [suppliers[2]]},
+                suppliers[1]: {"volume": 1000000, "keep_incumbents": [suppliers[2]]},
+            },
+            "tail_threshold": 100000,
+            "tail_fixed_point": False,
+            "tail_suppliers": [],
+            "rules": [
+                {"supplier": suppliers[3], "action": "exclude", "reason": f"{suppliers[3]} avoided"},
+                {"supplier": suppliers[4], "action": "exclude", "reason": f"{suppliers[4]} not for Buchanan",
+                 "divisions": ["Buchanan"]},
+            ],
+        }],
+    }
+
+
+def synthetic_bidsheet(parts, suppliers=SUPPLIERS, seed=0):
+    """
+    (landed bidsheet, supplier port table, freight table, tariff table, reference table) of parts
+    parts and suppliers suppliers, as DataFrames in the layout of the real files.
+    """
+    rng = np.random.default_rng(seed)
+    names = supplier_names(suppliers)
+    row_ids = np.arange(1, parts + 1)
+    division = rng.choice(list(DIVISIONS), parts, p=list(DIVISIONS.values()))
+    buchanan = division == "Buchanan"
+    volume = rng.integers(10, 50000, parts).astype(float)
+    wapp = rng.lognormal(1.0, 1.0, parts).round(4)
+
+    # every supplier ships from one port; freight per port and division; one tariff row per part
+    ports = list(PORT_COUNTRY_MAP)
+    supplier_port = rng.choice(ports, suppliers)
+    freight = pd.DataFrame({"Midland": rng.uniform(1.03, 1.12, len(ports)).round(6),
+                            "Buchanan": rng.uniform(1.03, 1.12, len(ports)).round(6)}, index=pd.Index(ports, name="Reference"))
+    tariff_value = rng.choice([0.0, 0.1, 0.25, 0.5], parts)
+    metal_tariff = rng.choice([0.0, 0.25, 0.5], parts)
+    multiplier = freight.loc[supplier_port].to_numpy()
+    multiplier = np.where(buchanan[:, None], multiplier[None, :, 1],
+                          multiplier[None, :, 0] + (tariff_value + metal_tariff)[:, None])
+
+    # sparse bids: supplier j bids on a part with a probability falling off with j
+    popularity = 0.9 ** np.arange(suppliers)
+    popularity *= BIDS_PER_PART / popularity.sum()
+    has_bid = rng.random((parts, suppliers)) < np.minimum(popularity, 0.9)
+    incumbent = rng.choice(suppliers, parts, p=popularity / popularity.sum())
+    has_bid[np.arange(parts), incumbent] |= rng.random(parts) < 0.85
+    fob = np.where(has_bid, wapp[:, None] * rng.uniform(0.6, 1.3, (parts, suppliers)), np.nan).round(4)
+    landed = (fob * multiplier).round(4)
+    wapp_landed = (wapp * np.where(buchanan, 1.08, 1.45)).round(4)
+
+    incumbent_names = np.array(names, dtype=object)[incumbent]
+    incumbent_names[rng.random(parts) < 0.02] = "-"
+    columns = {
+        "ROW ID #": row_ids,
+        "Division": division,
+        "Part #": [f"P{row_id:07d}" for row_id in row_ids],
+        "Item Description": "synthetic part",
+        "Product Group": rng.choice([f"Group {g}" for g in range(12)], parts),
+        "Part Family": rng.choice([f"Family {f}" for f in range(40)], parts),
+        "Normalized incumbent supplier": incumbent_names,
+        "Annual Volume (per UOM)": volume,
+        "Volume-banded WAPP": wapp,
+        "Volume-banded WAPP Landed Cost": wapp_landed,
+        "Landed Extended Cost USD": volume * wapp_landed,
+    }
+    for j, supplier in enumerate(names):
+        columns[f"{supplier} - R2 - {FOB_METRIC}"] = fob[:, j]
+        columns[f"{supplier} - R2 - {LANDED_METRIC}"] = landed[:, j]
+        columns[f"{supplier} - {FOB_PCT_SAVINGS}"] = 1 - fob[:, j] / wapp
+        columns[f"{supplier} - {FOB_USD_SAVINGS}"] = (wapp - fob[:, j]) * volume
+        columns[f"{supplier} - {LANDED_PCT_SAVINGS}"] = 1 - landed[:, j] / wapp_landed
+        columns[f"{supplier} - {LANDED_USD_SAVINGS}"] = (wapp_landed - landed[:, j]) * volume
+
+    bid_count = has_bid.sum(axis=1)
+    ranked = np.argsort(np.where(has_bid, landed, np.inf), axis=1, kind="stable")[:, :2]
+    ranked_names = np.array(names, dtype=object)[ranked]
+    columns["Valid Supplier"] = bid_count
+    columns["Final Minimum Bid Landed Supplier"] = np.where(bid_count >= 1, ranked_names[:, 0], np.nan)
+    columns["2nd Lowest Bid Landed Supplier"] = np.where(bid_count >= 2, ranked_names[:, 1], np.nan)
+    bidsheet = pd.DataFrame(columns)
+
+    port_table = pd.DataFrame(np.broadcast_to(supplier_port, (parts, suppliers)), columns=names)
+    port_table.insert(0, "Division", division)
+    port_table.insert(0, "ROW ID #", row_ids)
+    tariff_table = pd.DataFrame({
+        "ROW ID #": row_ids,
+        "Metal Type": rng.choice(METAL_TYPES, parts),
+        "Country": [PORT_COUNTRY_MAP[port] for port in rng.choice(ports, parts)],
+        "tariff_value": tariff_value,
+        "Metal Tariff": metal_tariff,
+    })
+    reference = pd.DataFrame({
+        "Reference": names,
+        "Standard leadtime - days PO-shipment POL": rng.integers(30, 120, suppliers),
+        "Payment term - days and discounts": "90 days BOL",
+    })
+    return bidsheet, port_table, freight.reset_index(), tariff_table, reference
+
+
+def write_inputs(work_dir, parts, suppliers, seed=0):
+    """Write the synthetic bidsheet, lookup tables and scenario file into work_dir; returns the scenario file path."""
+    bidsheet, port_table, freight, tariff_table, reference = synthetic_bidsheet(parts, suppliers, seed)
+    input_path = os.path.join(work_dir, INPUT_FILE)
+    # scenario_3.py reads the .feather handoff file; the CSV is only written without pyarrow
+    if write_landed(bidsheet, input_path) is None:
+        bidsheet.to_csv(input_path, index=False)
+    port_table.to_csv(os.path.join(work_dir, SUPPLIER_PORT_FILE), index=False)
+    freight.to_csv(os.path.join(work_dir, FREIGHT_FILE), index=False)
+    tariff_table.to_csv(os.path.join(work_dir, TARIFF_FILE), index=False)
+    os.makedirs(os.path.join(work_dir, os.path.dirname(REFERENCE_FILE)), exist_ok=True)
+    reference.to_csv(os.path.join(work_dir, REFERENCE_FILE), index=False)
+    scenario_path = os.path.join(work_dir, "benchmark.json")
+    with open(scenario_path, "w", encoding="utf-8") as f:
+        json.dump(benchmark_scenario(supplier_names(suppliers)), f, indent=2)
+    return scenario_path
+
+
+def run_scale(scale, suppliers=SUPPLIERS, seed=0):
+    """Stage timings row of one scenario_3.py run on a bidsheet of BASE_PARTS x scale parts."""
+    parts = BASE_PARTS * scale
+    with tempfile.TemporaryDirectory(prefix="scenario_3 benchmark ") as work_dir:
+        start = time.time()
+        scenario_path = write_inputs(work_dir, parts, suppliers, seed)
+        print(f"Scale {scale}x: {parts} parts x {suppliers} suppliers written in {time.time() - start:.1f} seconds")
+        timings_path = os.path.join(work_dir, "timings.json")
+        run = subprocess.run([sys.executable, SCENARIO_SCRIPT, scenario_path, timings_path], cwd=work_dir,
+                             capture_output=True, text=True)
+        timings = {"stages": {}, "total": np.nan}
+        if os.path.exists(timings_path):
+            with open(timings_path, encoding="utf-8") as f:
+                timings = json.load(f)
+    errors = run.stderr.strip().splitlines()
+    row = {"Scale": scale, "Parts": parts, "Suppliers": suppliers,
+           "Status": "ok" if run.returncode == 0 else f"failed: {errors[-1] if errors else run.returncode}"}
+    row.update({stage: timings["stages"].get(stage, np.nan) for stage in STAGES})
+    row["Total"] = timings["total"]
+    return row
+
+
+def commit_id():
+    """Short hash of the checked-out commit, with "+" when the tree has local changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "-"
+    return commit + ("+" if dirty else "")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    scales = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else list(SCALES)
+    suppliers = int(sys.argv[2]) if len(sys.argv) > 2 else SUPPLIERS
+
+    commit, run_at = commit_id(), datetime.now().strftime("%Y-%m-%d %H:%M")
+    rows = []
+    for scale in scales:
+        row = {"Commit": commit, "Run at": run_at, **run_scale(scale, suppliers)}
+        print(f"  {row['Status']}, total {row['Total']:.2f}s")
+        rows.append(row)
+    timings = pd.DataFrame(rows)
+    print("\nStage seconds per scale:")
+    print(timings.set_index("Scale")[STAGES + ["Total"]].T.round(2).to_string())
+
+    os.makedirs(os.path.dirname(TIMINGS_FILE), exist_ok=True)
+    if os.path.exists(TIMINGS_FILE):
+        history = pd.read_csv(TIMINGS_FILE)
+        previous = history[history["Commit"] != commit].groupby("Scale").tail(1).set_index("Scale")["Total"]
+        change = timings.set_index("Scale")["Total"] / previous.reindex(timings["Scale"]) - 1
+        print("\nTotal vs the last other commit: " + ", ".join(
+            f"{scale}x {pct:+.0%}" for scale, pct in change.dropna().items()))
+        timings = pd.concat([history, timings], ignore_index=True)
+    timings.to_csv(TIMINGS_FILE, index=False)
+    print(f"\n✅ Appended to '{TIMINGS_FILE}'")
+    print(f"⏱ Time taken: {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,155 @@
+'''
+Dense parts x suppliers view of the landed bidsheet.
+
+Rows follow the bidsheet order, columns are the R2 landed bidders followed by incumbents
+that did not bid. Awards are stored as supplier codes (column numbers), NO_AWARD (-1)
+meaning "-". A bid of 0 or a missing bid is stored as NaN.
+'''
+
+import numpy as np
+import pandas as pd
+
+from bidsheet_schema import FOB_METRIC, LANDED_METRIC
+
+NO_AWARD = -1
+
+PART_COLUMNS = ["ROW ID #", "Division", "Part #", "Product Group", "Part Family", "Valid Supplier"]
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+
+
+def lowest_bidders(bids, allowed=None, count=2):
+    """
+    Supplier codes of the count lowest positive bids per part, lowest first, NO_AWARD past a
+    part's last bid. Cells outside the allowed mask are skipped; equal bids keep column order.
+    Suppliers are the last axis, so bids may carry leading axes (e.g. samples x parts x suppliers).
+    """
+    bids = np.where(bids > 0, bids, np.nan)
+    if allowed is not None:
+        bids = np.where(allowed, bids, np.nan)
+    order = np.full(bids.shape[:-1] + (count,), NO_AWARD, dtype=np.intp)
+    if count == 1:
+        # argmin keeps the first of equal bids, like the stable sort
+        ranked = np.argmin(np.where(np.isnan(bids), np.inf, bids), axis=-1)[..., None]
+    else:
+        ranked = np.argsort(bids, axis=-1, kind="stable")[..., :count]
+    has_bid = ~np.isnan(np.take_along_axis(bids, ranked, axis=-1))
+    order[..., :ranked.shape[-1]] = np.where(has_bid, ranked, NO_AWARD)
+    return order
+
+
+class BidMatrix:
+
+    def __init__(self, parts, suppliers, landed, fob, volume, baseline_cost, wapp, incumbent, incumbent_landed):
+        self.parts = parts
+        self.row_ids = parts["ROW ID #"].to_numpy()
+        self.suppliers = list(suppliers)
+        self.supplier_codes = {supplier: code for code, supplier in enumerate(self.suppliers)}
+        self.landed = landed
+        self.fob = fob
+        self.volume = volume
+        self.baseline_cost = baseline_cost
+        self.wapp = wapp
+        self.incumbent = incumbent
+        self.incumbent_landed = incumbent_landed
+
+    @classmethod
+    def from_frame(cls, df, schema, supplier_info=None, incumbent_col="Normalized incumbent supplier",
+                   volume_col="Annual Volume (per UOM)"):
+        """
+        Build from the landed bidsheet. schema must describe df's columns. With a SupplierInfoTable,
+        incumbents without a landed bid are costed at their WAPP landed cost.
+        """
+        bidders = schema.suppliers_with(LANDED_METRIC, "R2")
+        incumbent_names = df[incumbent_col].to_numpy(dtype=object)
+        others = sorted({s for s in incumbent_names if isinstance(s, str) and s != "-" and s not in bidders})
+        suppliers = bidders + others
+
+        def matrix(metric):
+            values = np.full((len(df), len(suppliers)), np.nan)
+            for j, supplier in enumerate(bidders):
+                col = schema.column_name(supplier, metric, "R2")
+                if col is not None:
+                    values[:, j] = _numeric(df[col])
+            values[~(values > 0)] = np.nan
+            return values
+
+        landed = matrix(LANDED_METRIC)
+        fob = matrix(FOB_METRIC)
+        codes = {supplier: code for code, supplier in enumerate(suppliers)}
+        incumbent = np.array([codes.get(s, NO_AWARD) if isinstance(s, str) else NO_AWARD for s in incumbent_names], dtype=np.intp)
+
+        volume = np.nan_to_num(_numeric(df[volume_col]))
+        wapp = _numeric(df["Volume-banded WAPP"])
+        has_incumbent = incumbent != NO_AWARD
+        incumbent_landed = np.full(len(df), np.nan)
+        incumbent_landed[has_incumbent] = landed[np.flatnonzero(has_incumbent), incumbent[has_incumbent]]
+        if supplier_info is not None:
+            no_bid = np.flatnonzero(has_incumbent & np.isnan(incumbent_landed))
+            info = supplier_info.gather(df["ROW ID #"].to_numpy()[no_bid], incumbent_names[no_bid])
+            price = wapp[no_bid]
+            incumbent_landed[no_bid] = price * info["FreightMultiplier"] + price * (info["tariff_value"] + info["Metal Tariff"])
+            incumbent_landed[~(incumbent_landed > 0)] = np.nan
+
+        parts = df[[col for col in PART_COLUMNS if col in df.columns]].reset_index(drop=True)
+        return cls(parts, suppliers, landed, fob, volume, np.nan_to_num(_numeric(df["Landed Extended Cost USD"])),
+                   wapp, incumbent, incumbent_landed)
+
+    @property
+    def shape(self):
+        return self.landed.shape
+
+    def code(self, supplier):
+        return self.supplier_codes.get(supplier, NO_AWARD)
+
+    def codes(self, suppliers):
+        return np.array([self.code(s) for s in suppliers], dtype=np.intp)
+
+    def names(self, award):
+        """Supplier names for an award vector, "-" for NO_AWARD."""
+        lookup = np.array(self.suppliers + ["-"], dtype=object)
+        return lookup[np.where(award == NO_AWARD, len(self.suppliers), award)]
+
+    def unit_costs(self, allowed=None):
+        """
+        Landed cost per UOM of awarding each part to each supplier: the landed bid, or for the
+        incumbent without a bid its WAPP landed cost. NaN where the part cannot go to the supplier.
+        """
+        cost = self.landed.copy()
+        rows = np.flatnonzero(self.incumbent != NO_AWARD)
+        cols = self.incumbent[rows]
+        cost[rows, cols] = np.where(np.isnan(cost[rows, cols]), self.incumbent_landed[rows], cost[rows, cols])
+        if allowed is not None:
+            cost[~allowed] = np.nan
+        return cost
+
+    def valid_count(self):
+        """Number of valid bids per part: the sheet's Valid Supplier count, else the landed bids."""
+        if "Valid Supplier" in self.parts:
+            return np.nan_to_num(_numeric(self.parts["Valid Supplier"]))
+        return (self.landed > 0).sum(axis=1)
+
+    def is_new(self):
+        """True where the supplier is not the part's incumbent."""
+        return np.arange(len(self.suppliers))[None, :] != self.incumbent[:, None]
+
+    def award_costs(self, award, unit_costs=None):
+        """Landed extended cost per part of an award vector (NaN for NO_AWARD or an award without a cost)."""
+        unit_costs = self.unit_costs() if unit_costs is None else unit_costs
+        awarded = award != NO_AWARD
+        out = np.full(len(award), np.nan)
+        out[awarded] = unit_costs[np.flatnonzero(awarded), award[awarded]] * self.volume[awarded]
+        return out
+
+    def landed_savings(self, award, unit_costs=None):
+        """Baseline landed extended cost minus awarded landed cost, over parts whose award has a cost."""
+        costs = self.award_costs(award, unit_costs)
+        costed = ~np.isnan(costs)
+        return float((self.baseline_cost[costed] - costs[costed]).sum())
+
+    def new_supplier_spend(self, award, unit_costs=None):
+        """Landed extended cost of the parts awarded away from their incumbent."""
+        costs = self.award_costs(award, unit_costs)
+        return float(np.nansum(np.where((award != NO_AWARD) & (award != self.incumbent), costs, 0.0)))
@@ -0,0 +1,115 @@
+'''
+Supplier column schema for the bidsheet header.
+
+Supplier columns in the bidsheet follow two naming patterns:
+    "<supplier> - <round> - <metric>"   e.g. "Coda - R2 - Total landed cost per UOM (USD)"
+    "<supplier> - <metric>"             e.g. "Coda - Final Landed USD savings vs baseline"
+
+The header is parsed once into supplier -> round -> metric -> column position so the
+stages can address columns by integer position instead of splitting strings per row.
+Metrics that are not tied to a bid round are stored under NO_ROUND.
+'''
+
+import json
+import os
+import re
+
+FOB_METRIC = "Total Cost Per UOM FOB Port of Origin/Departure (USD)"
+LANDED_METRIC = "Total landed cost per UOM (USD)"
+FOB_PCT_SAVINGS = "Final % savings vs baseline"
+FOB_USD_SAVINGS = "Final USD savings vs baseline"
+LANDED_PCT_SAVINGS = "Final Landed % savings vs baseline"
+LANDED_USD_SAVINGS = "Final Landed USD savings vs baseline"
+
+NO_ROUND = ""
+
+round_pattern = re.compile(r"^(.*?) - (R[12]) - (.+)$")
+savings_pattern = re.compile(
+    r"^(.*?) - (" + "|".join(re.escape(m) for m in [FOB_PCT_SAVINGS, FOB_USD_SAVINGS, LANDED_PCT_SAVINGS, LANDED_USD_SAVINGS]) + r")$"
+)
+
+
+def schema_path(data_path):
+    """Sidecar path of the schema for a bidsheet file (shared by the .xlsx, .csv and .feather versions)."""
+    return os.path.splitext(data_path)[0] + ".schema.json"
+
+
+class BidsheetSchema:
+    """
+    Supplier -> round -> metric -> column position, built from a bidsheet header.
+    Suppliers keep the order in which they first appear in the header.
+    """
+
+    def __init__(self, header, columns):
+        self.header = list(header)
+        self.columns = columns
+        self.suppliers = list(columns)
+
+    @classmethod
+    def from_columns(cls, header, start=0):
+        header = [str(col) for col in header]
+        columns = {}
+        for pos in range(start, len(header)):
+            col = header[pos]
+            m = round_pattern.match(col)
+            if m:
+                supplier, round_tag, metric = m.group(1).strip(), m.group(2), m.group(3)
+            else:
+                m = savings_pattern.match(col)
+                if not m:
+                    continue
+                supplier, round_tag, metric = m.group(1).strip(), NO_ROUND, m.group(2)
+            columns.setdefault(supplier, {}).setdefault(round_tag, {}).setdefault(metric, pos)
+        return cls(header, columns)
+
+    def position(self, supplier, metric, round_tag="R2"):
+        """Column position, or None when the supplier has no such column."""
+        return self.columns.get(supplier, {}).get(round_tag, {}).get(metric)
+
+    def column_name(self, supplier, metric, round_tag="R2"):
+        pos = self.position(supplier, metric, round_tag)
+        return None if pos is None else self.header[pos]
+
+    def suppliers_with(self, metric, round_tag="R2"):
+        return [s for s in self.suppliers if self.position(s, metric, round_tag) is not None]
+
+    def column_names(self, metric, round_tag="R2"):
+        return [self.column_name(s, metric, round_tag) for s in self.suppliers_with(metric, round_tag)]
+
+    def positions(self, metric, round_tag="R2", suppliers=None):
+        """Positions of a metric for each supplier (-1 where the supplier has no column)."""
+        if suppliers is None:
+            suppliers = self.suppliers_with(metric, round_tag)
+        return [
+            -1 if self.position(s, metric, round_tag) is None else self.position(s, metric, round_tag)
+            for s in suppliers
+        ]
+
+    def matches(self, header):
+        return [str(col) for col in header] == self.header
+
+    def to_dict(self):
+        return {"header": self.header, "columns": self.columns}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["header"], data["columns"])
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def for_file(cls, header, data_path):
+        """Load the sidecar schema of data_path if it describes this header, otherwise parse the header."""
+        path = schema_path(data_path)
+        if os.path.exists(path):
+            schema = cls.load(path)
+            if schema.matches(header):
+                return schema
+        return cls.from_columns(header)
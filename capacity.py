@@ -0,0 +1,147 @@
+'''
+Supplier capacity caps.
+
+A cap limits the annual volume ("volume") and / or the landed spend ("spend") moved to a
+supplier, in total or separately per Division or Product Group ("per"). Parts whose incumbent
+is listed in "keep_incumbents" are not moved to the supplier at all.
+
+    caps = {
+        "Manek Metalcraft": {"volume": 6400000, "spend": 3500000, "keep_incumbents": ["Mayank"]},
+        "Pushti Metal": {"volume": 1000000, "per": "Division"},
+    }
+
+allocate_capped admits moves to capped suppliers independently of sheet order: every
+(supplier, group) bucket is filled in order of savings per unit of capacity used (the larger of
+the move's share of the volume cap and of the spend cap), first fit, so a move that does not
+fit does not block smaller ones behind it. Forced moves are admitted in any case and use up
+capacity first, so they alone can take a supplier past its cap; cap_usage reports the volume and
+spend moved to every capped supplier and flags the caps exceeded. Passes that run after the allocation (tail rationalization) take uncapped_mask
+into their allowed mask, so they do not move further parts onto a capped supplier.
+'''
+
+import numpy as np
+
+from allocation_kernel import first_fit
+
+CAP_KEYS = ("volume", "spend", "per", "keep_incumbents")
+CAP_GROUPS = ("Division", "Product Group")
+LIMITS = ("volume", "spend")
+
+
+def check_caps(caps):
+    """Raises ValueError on unknown cap settings."""
+    for supplier, cap in (caps or {}).items():
+        unknown = set(cap) - set(CAP_KEYS)
+        if unknown:
+            raise ValueError(f"unknown cap setting(s) for {supplier}: {', '.join(sorted(unknown))}")
+        if cap.get("per") is not None and cap["per"] not in CAP_GROUPS:
+            raise ValueError(f"cap for {supplier} can be per {' or '.join(CAP_GROUPS)}, not {cap['per']!r}")
+
+
+def kept_by_incumbent(suppliers, incumbents, caps):
+    """Per move, True where the incumbent is one the target supplier's cap keeps its parts with."""
+    suppliers = np.asarray(suppliers, dtype=object)
+    incumbents = np.asarray(incumbents, dtype=object)
+    kept = np.zeros(len(suppliers), dtype=bool)
+    for supplier, cap in (caps or {}).items():
+        if cap.get("keep_incumbents"):
+            kept |= (suppliers == supplier) & np.isin(incumbents, cap["keep_incumbents"])
+    return kept
+
+
+def kept_mask(incumbents, suppliers, caps):
+    """parts x suppliers mask, False where a cap keeps the part with its incumbent (for an allowed mask)."""
+    incumbents = np.asarray(incumbents, dtype=object)
+    mask = np.ones((len(incumbents), len(suppliers)), dtype=bool)
+    for j, supplier in enumerate(suppliers):
+        cap = (caps or {}).get(supplier) or {}
+        if cap.get("keep_incumbents"):
+            mask[np.isin(incumbents, cap["keep_incumbents"]), j] = False
+    return mask
+
+
+def uncapped_mask(incumbents, suppliers, caps):
+    """parts x suppliers mask, False on capped suppliers except for their own incumbent parts (for later passes)."""
+    incumbents = np.asarray(incumbents, dtype=object)
+    mask = np.ones((len(incumbents), len(suppliers)), dtype=bool)
+    for j, supplier in enumerate(suppliers):
+        if supplier in (caps or {}):
+            mask[:, j] = incumbents == supplier
+    return mask
+
+
+def admit_within_caps(usage, limits):
+    """First fit in the given order over several budgets: True for each row of usage that fits all of limits."""
+    return first_fit(usage, limits)
+
+
+def allocate_capped(suppliers, volume, spend, savings, caps, parts=None, forced=None):
+    """
+    Which moves fit the caps. suppliers: target supplier name per move; volume, spend, savings per
+    move; parts: frame with the CAP_GROUPS columns, one row per move (needed for caps with "per");
+    forced: moves admitted in any case. Moves to uncapped suppliers are always admitted.
+    """
+    suppliers = np.asarray(suppliers, dtype=object)
+    usage = np.column_stack([np.nan_to_num(np.asarray(volume, dtype=float)),
+                             np.nan_to_num(np.asarray(spend, dtype=float))])
+    savings = np.nan_to_num(np.asarray(savings, dtype=float))
+    forced = np.zeros(len(suppliers), dtype=bool) if forced is None else np.asarray(forced, dtype=bool)
+    admitted = np.ones(len(suppliers), dtype=bool)
+
+    for supplier, cap in (caps or {}).items():
+        limits = np.array([np.inf if cap.get(key) is None else float(cap[key]) for key in LIMITS])
+        on_supplier = np.flatnonzero(suppliers == supplier)
+        if cap.get("per") is not None:
+            groups = parts[cap["per"]].to_numpy()[on_supplier]
+        else:
+            groups = np.zeros(len(on_supplier))
+        # share of the cap a move uses; priority is savings per unit of it
+        used = np.max(np.where(np.isfinite(limits), usage[on_supplier] / limits, 0.0), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            priority = np.where(used > 0, savings[on_supplier] / used, np.inf)
+        group_keys = groups.astype(str)
+        for group in np.unique(group_keys):
+            in_group = group_keys == group
+            left = limits - usage[on_supplier[in_group & forced[on_supplier]]].sum(axis=0)
+            movable = np.flatnonzero(in_group & ~forced[on_supplier])
+            movable = movable[np.argsort(-priority[movable], kind="stable")]
+            admitted[on_supplier[movable]] = admit_within_caps(usage[on_supplier[movable]], left.tolist())
+    return admitted
+
+
+def cap_usage(suppliers, incumbents, volume, spend, caps, parts=None):
+    """
+    Volume and spend moved to each capped supplier by an award, one dict per (supplier, group):
+    supplier, group (None for a total cap), parts, volume, volume cap, spend, spend cap and
+    exceeded. suppliers / incumbents: awarded and incumbent supplier name per part.
+    """
+    suppliers = np.asarray(suppliers, dtype=object)
+    moved = suppliers != np.asarray(incumbents, dtype=object)
+    volume = np.nan_to_num(np.asarray(volume, dtype=float))
+    spend = np.nan_to_num(np.asarray(spend, dtype=float))
+    usage = []
+    for supplier, cap in (caps or {}).items():
+        on_supplier = np.flatnonzero(moved & (suppliers == supplier))
+        per = cap.get("per")
+        groups = parts[per].to_numpy()[on_supplier].astype(str) if per is not None else np.zeros(len(on_supplier))
+        for group in np.unique(groups) if len(on_supplier) else [None]:
+            rows = on_supplier[groups == group] if group is not None else on_supplier
+            used = {"volume": volume[rows].sum(), "spend": spend[rows].sum()}
+            usage.append({
+                "supplier": supplier, "group": group if per is not None else None, "parts": len(rows),
+                "volume": used["volume"], "volume cap": cap.get("volume"),
+                "spend": used["spend"], "spend cap": cap.get("spend"),
+                "exceeded": any(cap.get(key) is not None and used[key] > cap[key] for key in LIMITS),
+            })
+    return usage
+
+
+def print_cap_usage(usage):
+    """One line per capped supplier (and group), with a warning for each cap exceeded."""
+    for entry in usage:
+        name = entry["supplier"] if entry["group"] is None else f"{entry['supplier']} ({entry['group']})"
+        print(f"{name}: {entry['parts']} parts moved, volume {entry['volume']:,.0f} (cap {entry['volume cap']}), "
+              f"landed spend ${entry['spend']:,.2f} (cap {entry['spend cap']})")
+        if entry["exceeded"]:
+            print(f"Warning: {name} is past its cap; moves the incumbent cannot take back (no bid on the part, "
+                  f"or a rule excludes it) are admitted over it")
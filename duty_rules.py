@@ -0,0 +1,51 @@
+'''
+Duty multiplier rules.
+
+Duty depends on the metal type, and divisions in DUTY_FREE_DIVISIONS pay none. The rates are
+compiled once into a lookup array so duty for a whole column is a single indexed gather over
+categorical metal codes.
+'''
+
+import numpy as np
+import pandas as pd
+
+# metal type -> duty multiplier; any other metal type pays no duty
+DUTY_RATES = {
+    'Steel': 0.05,
+    'Stainless Steel': 0.05,
+    'Brass': 0.03,
+    'Lead-free bronze': 0.03,
+    'Lead-free brass': 0.03,
+}
+
+# divisions that are not charged duty on the WAPP landed cost
+DUTY_FREE_DIVISIONS = ['Buchanan']
+
+DUTY_METALS = list(DUTY_RATES)
+UNKNOWN_METAL = len(DUTY_METALS)  # slot of the lookup array for metals without a rule
+
+
+def compile_duty_table(rates=None):
+    """Lookup array indexed by metal code; the last slot holds unknown metals."""
+    rates = DUTY_RATES if rates is None else rates
+    table = np.zeros(len(rates) + 1)
+    table[:len(rates)] = list(rates.values())
+    return table
+
+
+DUTY_TABLE = compile_duty_table()
+
+
+def metal_codes(metal_types):
+    stripped = pd.Series(metal_types).astype(object).map(lambda m: m.strip() if isinstance(m, str) else None)
+    codes = pd.Categorical(stripped, categories=DUTY_METALS).codes.astype(np.intp)
+    codes[codes < 0] = UNKNOWN_METAL
+    return codes
+
+
+def duty_multipliers(metal_types, divisions=None):
+    """Duty multiplier per row. divisions may be a single value or a column aligned with metal_types."""
+    duty = DUTY_TABLE[metal_codes(metal_types)]
+    if divisions is not None:
+        duty = np.where(np.isin(np.asarray(divisions, dtype=object), DUTY_FREE_DIVISIONS), 0.0, duty)
+    return duty
@@ -1,4 +1,5 @@
 import pandas as pd
+from landed_store import write_landed
 
 # === CONFIGURATION ===
 excel_file_path = "new/Bidsheet Master Consolidate Landed 12052025.xlsx"
@@ -10,5 +11,8 @@ print(f"Reading Excel file: {excel_file_path}")
 df = pd.read_excel(excel_file_path, sheet_name=sheet_name, engine="openpyxl")
 print(f"Saving as CSV: {csv_output_path}")
 df.to_csv(csv_output_path, index=False)
+arrow_output_path = write_landed(df, csv_output_path)
+if arrow_output_path:
+    print(f"Saving Arrow handoff: {arrow_output_path}")
 print("Conversion complete.")
 
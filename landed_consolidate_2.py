@@ -5,7 +5,6 @@ instructions
 # made just for without buchanan tariff calculation
 import pandas as pd
 import numpy as np
-import re
 import os
 import time
 from datetime import datetime
@@ -13,6 +12,11 @@ from tqdm import tqdm
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from part_reference import part_reference
+from bidsheet_schema import BidsheetSchema, FOB_METRIC, LANDED_METRIC, schema_path
+from supplier_normalization import SupplierNormalizer
+from duty_rules import duty_multipliers
+from lookups import PORT_COUNTRY_MAP, remap_part_numbers
+from supplier_rules import DROPPED_INCUMBENTS
 
 # Needs to change
 
@@ -29,38 +33,8 @@ wapp_file = "wapp2.xlsx"
 p21_file = "P21 supplier bid supplier norm 070725v3.xlsx"
 supplier_port_file = "Supplier Port per Part table 070925.csv"
 frieght_file = "Freight cost mutipliers table 071025v2.csv"
-port_country_map = {
-    'DALIAN': 'China', 
-    'NINGBO': 'China', 
-    'QINGDAO': 'China', 
-    'QINGDAO2': 'China', 
-    'SHANGHAI': 'China',
-    'SHENZHEN': 'China', 
-    'TIANJIN': 'China', 
-    'XINGANG': 'China', 
-    'XIAMEN': 'China',
-    'AHMEDABAD': 'India', 
-    'CHENNAI': 'India', 
-    'DADRI': 'India', 
-    'MUMBAI': 'India',
-    'MUNDRA': 'India', 
-    'NHAVA SHEVA': 'India',
-    'SURABAYA': 'Indonesia',
-    'PORT KLANG': 'Malaysia', 
-    'PASIR GUDANG': 'Malaysia', 
-    'TANJUNG PELAPAS': 'Malaysia',
-    'BUSAN': 'South Korea',
-    'KAOHSIUNG': 'Taiwan', 
-    'KEELUNG': 'Taiwan', 
-    'TAICHUNG': 'Taiwan', 
-    'TAIPEI': 'Taiwan',
-    'BANGKOK': 'Thailand',
-    'LAEM CHABANG': 'Thailand',
-    'HO CHI MINH CITY': 'Vietnam', 
-    'VUNG TAU': 'Vietnam', 
-    'HAI PHONG': 'Vietnam',
-    'VIRGINIA': 'India'
-}
+supplier_cache_file = "new/supplier_normalization_cache.json"
+port_country_map = PORT_COUNTRY_MAP
 
 tariff_data = [
 
@@ -266,10 +240,8 @@ bidsheet_df = pd.read_csv(bidsheet_file, encoding='ISO-8859-1')
 # bidsheet_df['ROW ID #'] = bidsheet_df['ROW ID #'].astype(str)
 
 # Update 'Part #' using the in-memory map
-bidsheet_df['Part #'] = bidsheet_df.apply(
-    lambda row: part_map.get(str(row['ROW ID #']), row['Part #']),
-    axis=1
-)
+remapped_parts = remap_part_numbers(bidsheet_df, part_map)
+print(f"Remapped Part # for {remapped_parts} rows")
 
 # Create the mapping
 material_map = row_material_df.set_index('ROW ID #')['Material']
@@ -300,29 +272,6 @@ freight_lookup_df = (
     .merge(freight_long, left_on=['Port', 'Division'], right_on=['Reference', 'Division'], how='left')
     .drop(columns=['Reference'])
 )
-# Add Duty Multiplier column based on type
-def get_duty_multiplier(metal_type, supplier, part = []):
-    
-    if supplier in ['Luxecasting']:
-        return 0
-    else:
-        if isinstance(metal_type, str):
-            t = metal_type.strip()
-            if t == 'Steel':
-                return 0.05
-            if t == 'Stainless Steel':
-                return 0.05
-            elif t == 'Brass':
-                return 0.03
-            elif t == 'Lead-free bronze':
-                return 0.03
-            elif t == 'Lead-free brass':
-                return 0.03
-            
-    return 0
-
-# bidsheet_df['Duty Multiplier'] = bidsheet_df['type'].apply(get_duty_multiplier)
-
 wapp_df['Norm Item ID'] = wapp_df['Norm Item ID'].astype(str).str.strip().str.upper()
 
 def date_to_excel_serial(date_str):
@@ -409,26 +358,18 @@ bidsheet_df.insert(min_bid_idx, "Volume-banded WAPP", volume_wapp)
 bidsheet_df.insert(min_bid_idx+1, "Most common supplier", mcs_list)
 
 p21_df['p21_supplier_lower'] = p21_df['P21 supplier'].astype(str).str.lower().str.strip()
-bidsheet_df['most_common_supplier_lower'] = bidsheet_df['Most common supplier'].astype(str).str.lower().str.strip()
 mapping_dict = dict(zip(p21_df['p21_supplier_lower'], p21_df['Normalized to match bid supplier ']))
-def get_normalized_supplier(mcs):
-    if mcs in mapping_dict:
-        return mapping_dict[mcs].strip() if isinstance(mapping_dict[mcs], str) else mapping_dict[mcs]
-    else:
-        return "-"
-    
-# Apply the mapping
-normalized_incumbent_supplier = bidsheet_df['most_common_supplier_lower'].apply(get_normalized_supplier)
+
+# Exact P21 match first, then trigram fuzzy match; each distinct name is resolved once and cached
+supplier_normalizer = SupplierNormalizer(mapping_dict, cache_path=supplier_cache_file)
+normalized_incumbent_supplier = supplier_normalizer.resolve_series(bidsheet_df['Most common supplier'])
 
 # Insert the new column next to "Most common supplier"
 mcs_col_idx = bidsheet_df.columns.get_loc("Most common supplier")
 bidsheet_df.insert(mcs_col_idx + 1, "Normalized incumbent supplier", normalized_incumbent_supplier)
 
-# Optionally, drop the helper lowercase column if not needed anymore
-bidsheet_df.drop(columns=['most_common_supplier_lower'], inplace=True)
-
-# Drop all rows where Normalized incumbent supplier is "Bugatti Group"
-bidsheet_df = bidsheet_df[bidsheet_df['Normalized incumbent supplier'] != "Bugatti Group"].reset_index(drop=True)
+# Drop all rows whose Normalized incumbent supplier is dropped by the supplier rules (Bugatti Group)
+bidsheet_df = bidsheet_df[~bidsheet_df['Normalized incumbent supplier'].isin(DROPPED_INCUMBENTS)].reset_index(drop=True)
 
 bidsheet_df['Annual Volume (per UOM)'] = pd.to_numeric(bidsheet_df['Annual Volume (per UOM)'], errors='coerce')
 bidsheet_df['Volume-banded WAPP'] = pd.to_numeric(bidsheet_df['Volume-banded WAPP'], errors='coerce')
@@ -614,6 +555,12 @@ bidsheet_df.insert(
 )
 
 volume_banded_wapp_freight_idx = bidsheet_df.columns.get_loc("Volume-banded WAPP")
+tariff_lookup = {(d, c, m): v for d, c, m, v in tariff_data}
+# Duty for the whole column in one gather (Buchanan rows pay no duty)
+wapp_duty_multiplier = pd.Series(
+    duty_multipliers(bidsheet_df['type'], divisions=bidsheet_df['Division']), index=bidsheet_df.index
+)
+
 def calculate_volume_banded_wapp_with_freight(row):
     vol_wapp = row["Volume-banded WAPP"]
     row_id = row['ROW ID #']
@@ -647,13 +594,8 @@ def calculate_volume_banded_wapp_with_freight(row):
         return 'zinc, copper, iron and all other'
     # metal_type = normalize_metal_type(row.get('type', ''))
     metal_type = row.get('type', '')
-    # Build tariff lookup dict if not already
-
-    tariff_lookup = {(d, c, m): v for d, c, m, v in tariff_data}
     tariff_multiplier = tariff_lookup.get((division, country, metal_type), 0)
-
-    if row['Division'] == 'Buchanan': duty_multiplier = 0
-    else: duty_multiplier = get_duty_multiplier(row['type'], '')
+    duty_multiplier = wapp_duty_multiplier.at[row.name]
     
     if pd.isna(vol_wapp) or vol_wapp == 0 or pd.isna(supplier_port) or pd.isna(freight_multiplier):
         return "-"
@@ -675,14 +617,9 @@ pos = bidsheet_df.columns.get_loc("Extended Cost USD")
 bidsheet_df['Volume-banded WAPP Landed Cost'] = pd.to_numeric(bidsheet_df['Volume-banded WAPP Landed Cost'], errors='coerce')
 bidsheet_df.insert(pos + 1, "Landed Extended Cost USD", bidsheet_df["Annual Volume (per UOM)"] * bidsheet_df["Volume-banded WAPP Landed Cost"])
 
-supplier_pattern = re.compile(r"^(.*?) - R([12]) - Total Cost Per UOM FOB Port of Origin/Departure \(USD\)$")
-supplier_r1_map, supplier_r2_map = {}, {}
-
-for col in bidsheet_df.columns[30:]:
-    m = supplier_pattern.match(col)
-    if m:
-        name, round_num = m.group(1), m.group(2)
-        (supplier_r1_map if round_num == '1' else supplier_r2_map)[name] = col
+bid_schema = BidsheetSchema.from_columns(bidsheet_df.columns, start=30)
+supplier_r1_map = {s: bid_schema.column_name(s, FOB_METRIC, 'R1') for s in bid_schema.suppliers_with(FOB_METRIC, 'R1')}
+supplier_r2_map = {s: bid_schema.column_name(s, FOB_METRIC, 'R2') for s in bid_schema.suppliers_with(FOB_METRIC, 'R2')}
 
 suppliers = sorted(set(supplier_r1_map) & set(supplier_r2_map))
 missing_r1 = set(supplier_r2_map) - set(supplier_r1_map)
@@ -721,7 +658,6 @@ for s in tqdm(suppliers, desc='Supplier Calcs'):
         on=['ROW ID #', 'Country', 'Metal Type'],
         how='left'
     )
-    # merged['Duty Multiplier'] = merged['Metal Type'].apply(lambda mt: get_duty_multiplier(mt, supplier=s))
 
     merged['Freight Multiplier'] = merged['Freight Multiplier'].fillna(0)
     merged['Metal Tariff'] = merged['Metal Tariff'].fillna(0)
@@ -848,55 +784,48 @@ def calculate_as_is_final_landed_usd(row):
 # Insert new column next to "As Is R1 %"
 bidsheet_df.insert(as_is_final_pct_idx + 1, "As Is Final Landed USD", bidsheet_df.apply(calculate_as_is_final_landed_usd, axis=1))
 
-# Build supplier to R1/R2 column mapping
-supplier_round_cols = {}
-for col in bidsheet_df.columns[33:]:
-    if col.endswith("Total landed cost per UOM (USD)"):
-        parts = col.split(" - ")
-        if len(parts) >= 3:
-            supplier = parts[0].strip()
-            round_tag = parts[1].strip()
-            if supplier not in supplier_round_cols:
-                supplier_round_cols[supplier] = {}
-            supplier_round_cols[supplier][round_tag] = col
-
-# For each row, build a dict of supplier: value (R2 if present, else R1)
-def get_supplier_values(row):
-    values = {}
-    for supplier, rounds in supplier_round_cols.items():
-        val = None
-        if 'R2' in rounds:
-            v = row[rounds['R2']]
-            if not pd.isna(v) and v != '' and float(v) != 0:
-                val = float(v)
-        if val is None and 'R1' in rounds:
-            v = row[rounds['R1']]
-            if not pd.isna(v) and v != '' and float(v) != 0:
-                val = float(v)
-        if val is not None:
-            values[supplier] = val
+# Landed columns per supplier, addressed by position (R2 if present, else R1)
+landed_schema = BidsheetSchema.from_columns(bidsheet_df.columns, start=33)
+
+def first_landed_position(supplier):
+    positions = [landed_schema.position(supplier, LANDED_METRIC, round_tag) for round_tag in ('R1', 'R2')]
+    positions = [pos for pos in positions if pos is not None]
+    return min(positions) if positions else None
+
+# suppliers in the order of their first landed column, which decides ties between equal bids
+landed_suppliers = sorted(
+    (s for s in landed_schema.suppliers if first_landed_position(s) is not None),
+    key=first_landed_position,
+)
+
+def landed_values(round_tag):
+    positions = landed_schema.positions(LANDED_METRIC, round_tag, suppliers=landed_suppliers)
+    values = np.full((len(bidsheet_df), len(landed_suppliers)), np.nan)
+    for j, pos in enumerate(positions):
+        if pos >= 0:
+            values[:, j] = pd.to_numeric(bidsheet_df.iloc[:, pos], errors='coerce').to_numpy(dtype=float)
+    values[values == 0] = np.nan
     return values
-# === Step 6: Min/2nd Min/Outlier Flag ===
-final_landed_min_bids, final_landed_min_bids_supplier, second_landed_min_bids, second_landed_min_suppliers = [], [], [], []
-for idx, row in bidsheet_df.iterrows():
-    supplier_vals = get_supplier_values(row)
-    for supplier, val in supplier_vals.items():
-        for round_tag in ['R2']:
-            if round_tag in supplier_round_cols[supplier]:
-                col = supplier_round_cols[supplier][round_tag]
-
-    if supplier_vals:
-        sorted_bids = sorted(supplier_vals.items(), key=lambda x: x[1])
-        min_supplier, min_bid = sorted_bids[0]
-        second_min_supplier, second_min_bid = sorted_bids[1] if len(sorted_bids) > 1 else ("-", "-")
-    else:
-        min_bid = min_supplier = second_min_bid = second_min_supplier = "-"
-        
 
-    final_landed_min_bids.append(min_bid)
-    final_landed_min_bids_supplier.append(min_supplier)
-    second_landed_min_bids.append(second_min_bid)
-    second_landed_min_suppliers.append(second_min_supplier)
+# === Step 6: Min/2nd Min/Outlier Flag ===
+supplier_vals = landed_values('R2')
+supplier_vals = np.where(np.isnan(supplier_vals), landed_values('R1'), supplier_vals)
+# stable sort keeps header order between equal bids; NaN (no bid) sorts last
+bid_order = np.argsort(supplier_vals, axis=1, kind='stable')
+bid_count = (~np.isnan(supplier_vals)).sum(axis=1)
+sorted_bids = np.take_along_axis(supplier_vals, bid_order, axis=1)
+supplier_names = np.array(landed_suppliers + ["-"], dtype=object)
+
+def ranked(rank, min_count):
+    if not landed_suppliers:
+        return ["-"] * len(bidsheet_df), ["-"] * len(bidsheet_df)
+    has_rank = bid_count >= min_count
+    bids = np.where(has_rank, sorted_bids[:, min(rank, len(landed_suppliers) - 1)], np.nan)
+    names = supplier_names[np.where(has_rank, bid_order[:, min(rank, len(landed_suppliers) - 1)], len(landed_suppliers))]
+    return [b if h else "-" for b, h in zip(bids, has_rank)], list(names)
+
+final_landed_min_bids, final_landed_min_bids_supplier = ranked(0, 1)
+second_landed_min_bids, second_landed_min_suppliers = ranked(1, 2)
 
 
 pos = bidsheet_df.columns.get_loc("Final 2nd Lowest Bid Supplier")
@@ -962,6 +891,8 @@ cols_to_remove = [col for col in bidsheet_df.columns if 'R1 - Total Cost Per UOM
 bidsheet_df.drop(columns=cols_to_remove, inplace=True)
 
 bidsheet_df.to_excel(output_file, index=False)
+# Column schema next to the output so downstream stages skip re-parsing the header
+BidsheetSchema.from_columns(bidsheet_df.columns).save(schema_path(output_file))
 
 wb = load_workbook(output_file)
 ws = wb.active
@@ -0,0 +1,120 @@
+'''
+Landed cost model for what-if and simulation runs.
+
+A landed bid is FOB x (freight multiplier + tariff + metal tariff), or FOB x freight multiplier
+for Buchanan parts (landed_consolidate_2.py). LandedCostModel lines the SupplierInfoTable
+lookups up with the cells of a BidMatrix once. A tariff or freight change then becomes an
+array update of the landed costs: landed + FOB x (change of the multiplier). The WAPP landed
+cost of an incumbent without a bid, and the baseline, move with the change of the incumbent's
+cell. Cells without port, freight or tariff info keep their landed cost.
+
+    model = LandedCostModel(matrix, supplier_info)
+    shifted = model.shifted(tariff={"India": 0.10}, freight={"China": 1.2})
+
+tariff adds points to the tariff of every cell whose port is in the country ({country: points},
+or {country: {metal type: points}}); freight scales the freight multiplier of the country's ports.
+'''
+
+import numpy as np
+
+from bid_matrix import NO_AWARD, BidMatrix
+
+# divisions whose landed cost carries no tariff
+UNTARIFFED_DIVISIONS = ("Buchanan",)
+
+
+def _coded(values):
+    """(sorted distinct strings, code per value with -1 for a missing value)."""
+    known = np.array([isinstance(v, str) for v in values.ravel()]).reshape(values.shape)
+    labels = sorted(set(values[known]))
+    lookup = {label: code for code, label in enumerate(labels)}
+    codes = np.full(values.shape, -1, dtype=np.intp)
+    codes[known] = [lookup[v] for v in values[known]]
+    return labels, codes
+
+
+def changed_costs(matrix, change):
+    """
+    (landed, incumbent landed, baseline cost) of a BidMatrix under a parts x suppliers multiplier
+    change. change may carry a leading samples axis (samples x parts x suppliers); the results
+    then do too.
+    """
+    m = matrix
+    landed = m.landed + np.nan_to_num(m.fob) * change
+    rows = np.flatnonzero(m.incumbent != NO_AWARD)
+    incumbent = m.incumbent[rows]
+    wapp_change = np.nan_to_num(m.wapp[rows]) * change[..., rows, incumbent]
+    incumbent_landed = np.broadcast_to(m.incumbent_landed, landed.shape[:-1]).copy()
+    incumbent_landed[..., rows] = np.where(np.isnan(m.landed[rows, incumbent]),
+                                           m.incumbent_landed[rows] + wapp_change, landed[..., rows, incumbent])
+    baseline_cost = np.broadcast_to(m.baseline_cost, landed.shape[:-1]).copy()
+    baseline_cost[..., rows] += m.volume[rows] * wapp_change
+    return landed, incumbent_landed, baseline_cost
+
+
+class LandedCostModel:
+    """Country, metal type and freight multiplier of every cell of a BidMatrix, for landed cost changes."""
+
+    def __init__(self, matrix, supplier_info):
+        self.matrix = matrix
+        rows = supplier_info.row_positions(matrix.row_ids)
+        codes = supplier_info.codes(matrix.suppliers)
+        known = (rows >= 0)[:, None] & (codes >= 0)[None, :]
+        r = np.broadcast_to(rows[:, None], known.shape)[known]
+        c = np.broadcast_to(codes[None, :], known.shape)[known]
+
+        country = np.full(matrix.shape, np.nan, dtype=object)
+        country[known] = supplier_info.country[r, c]
+        metal = np.full(matrix.shape, np.nan, dtype=object)
+        metal[known] = supplier_info.metal_type[r, c]
+        self.countries, self.country_code = _coded(country)
+        self.metals, self.metal_code = _coded(metal)
+        self.freight = np.zeros(matrix.shape)
+        self.freight[known] = np.nan_to_num(supplier_info.freight[r, c])
+        if "Division" in matrix.parts:
+            self.tariffed = ~matrix.parts["Division"].isin(UNTARIFFED_DIVISIONS).to_numpy()
+        else:
+            self.tariffed = np.ones(matrix.shape[0], dtype=bool)
+
+    def in_country(self, country):
+        """Cells whose port is in country; raises ValueError for a country no cell has."""
+        if country not in self.countries:
+            raise ValueError(f"no supplier port in {country!r}; countries: {', '.join(self.countries)}")
+        return self.country_code == self.countries.index(country)
+
+    def of_metal(self, metal):
+        """
+        Cells of parts of a metal type, matched ignoring case (brass is Brass); raises ValueError
+        for a metal type no cell has.
+        """
+        matches = [i for i, known in enumerate(self.metals) if str(known).casefold() == str(metal).casefold()]
+        if not matches:
+            raise ValueError(f"no tariff row for metal type {metal!r}; metal types: {', '.join(self.metals)}")
+        return np.isin(self.metal_code, matches)
+
+    def multiplier_change(self, tariff=None, freight=None):
+        """parts x suppliers change of the landed multiplier under tariff point and freight factor changes."""
+        change = np.zeros(self.matrix.shape)
+        for country, points in (tariff or {}).items():
+            cells = self.in_country(country)
+            if isinstance(points, dict):
+                for metal, metal_points in points.items():
+                    change[cells & self.of_metal(metal)] += metal_points
+            else:
+                change[cells] += points
+        change[~self.tariffed] = 0.0
+        for country, factor in (freight or {}).items():
+            cells = self.in_country(country)
+            change[cells] += self.freight[cells] * (factor - 1)
+        return change
+
+    def shifted(self, tariff=None, freight=None):
+        """BidMatrix with the landed costs, incumbent landed costs and baseline under the changes."""
+        return self.with_change(self.multiplier_change(tariff, freight))
+
+    def with_change(self, change):
+        """BidMatrix with a parts x suppliers multiplier change applied."""
+        m = self.matrix
+        landed, incumbent_landed, baseline_cost = changed_costs(m, change)
+        return BidMatrix(m.parts, m.suppliers, landed, m.fob, m.volume, baseline_cost, m.wapp, m.incumbent,
+                         incumbent_landed)
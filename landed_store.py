@@ -0,0 +1,65 @@
+'''
+Arrow (Feather v2) handoff of the landed bidsheet to the scenario stages.
+
+excel_to_csv.py writes an uncompressed .feather file next to the landed CSV. Downstream
+stages open it memory-mapped and only page in the columns they use. Without pyarrow, or
+when the .feather file is missing or older than the CSV, they fall back to the CSV.
+'''
+
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = feather = ipc = None
+
+
+def arrow_path(data_path):
+    return os.path.splitext(data_path)[0] + ".feather"
+
+
+def _arrow_ready(data_path):
+    path = arrow_path(data_path)
+    if feather is None or not os.path.exists(path):
+        return False
+    # never read a handoff file that is older than the CSV it mirrors
+    return not os.path.exists(data_path) or os.path.getmtime(path) >= os.path.getmtime(data_path)
+
+
+def _as_csv_types(df):
+    """Mixed object columns (floats next to '-') become strings, as they would after a CSV round trip."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def write_landed(df, data_path):
+    """Write df to the .feather file next to data_path. Returns its path, or None without pyarrow."""
+    if feather is None:
+        print("pyarrow not installed, skipping Arrow handoff file")
+        return None
+    path = arrow_path(data_path)
+    table = pa.Table.from_pandas(_as_csv_types(df), preserve_index=False)
+    # uncompressed so readers can memory-map it
+    feather.write_feather(table, path, compression="uncompressed")
+    return path
+
+
+def landed_columns(data_path):
+    """Header of the landed bidsheet without reading any data."""
+    if _arrow_ready(data_path):
+        with pa.memory_map(arrow_path(data_path)) as source:
+            return list(ipc.open_file(source).schema.names)
+    return list(pd.read_csv(data_path, nrows=0).columns)
+
+
+def read_landed(data_path, columns=None):
+    """Read the landed bidsheet, only the given columns, from the .feather file when available."""
+    if _arrow_ready(data_path):
+        table = feather.read_table(arrow_path(data_path), columns=columns, memory_map=True)
+        return table.to_pandas()
+    return pd.read_csv(data_path, usecols=columns)
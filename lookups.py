@@ -0,0 +1,223 @@
+'''
+Shared lookup helpers for the landed and scenario stages.
+'''
+
+import numpy as np
+import pandas as pd
+
+# shipping port -> supplier country
+PORT_COUNTRY_MAP = {
+    'DALIAN': 'China',
+    'NINGBO': 'China',
+    'QINGDAO': 'China',
+    'QINGDAO2': 'China',
+    'SHANGHAI': 'China',
+    'SHENZHEN': 'China',
+    'TIANJIN': 'China',
+    'XINGANG': 'China',
+    'XIAMEN': 'China',
+    'AHMEDABAD': 'India',
+    'CHENNAI': 'India',
+    'DADRI': 'India',
+    'MUMBAI': 'India',
+    'MUNDRA': 'India',
+    'NHAVA SHEVA': 'India',
+    'SURABAYA': 'Indonesia',
+    'PORT KLANG': 'Malaysia',
+    'PASIR GUDANG': 'Malaysia',
+    'TANJUNG PELAPAS': 'Malaysia',
+    'BUSAN': 'South Korea',
+    'KAOHSIUNG': 'Taiwan',
+    'KEELUNG': 'Taiwan',
+    'TAICHUNG': 'Taiwan',
+    'TAIPEI': 'Taiwan',
+    'BANGKOK': 'Thailand',
+    'LAEM CHABANG': 'Thailand',
+    'HO CHI MINH CITY': 'Vietnam',
+    'VUNG TAU': 'Vietnam',
+    'HAI PHONG': 'Vietnam',
+    'VIRGINIA': 'India'
+}
+
+
+def remap_part_numbers(df, part_map, key_col='ROW ID #', part_col='Part #'):
+    """
+    Replace part_col with part_map[str(ROW ID)] wherever the map has an entry, in place.
+    Returns the number of rows that were remapped.
+    """
+    keys = df[key_col].astype(str)
+    mapped = keys.map(part_map)
+    remapped = mapped.notna()
+    df[part_col] = mapped.where(remapped, df[part_col])
+    return int(remapped.sum())
+
+
+
+def row_index(df, key_col='ROW ID #'):
+    """
+    key_col value -> row position, built once per stage.
+    Raises ValueError when a key appears more than once, since every lookup assumes one row per part.
+    """
+    keys = df[key_col]
+    duplicated = keys[keys.duplicated()]
+    if len(duplicated):
+        raise ValueError(f"{len(duplicated)} duplicate {key_col} values, e.g. {duplicated.astype(str).unique()[:10].tolist()}")
+    return dict(zip(keys.tolist(), range(len(keys))))
+
+
+def load_reference(path, key_col='Reference'):
+    """Supplier reference attributes (lead time, payment terms, rebates, ...) keyed by supplier; first row wins."""
+    reference = pd.read_csv(path)
+    return reference.drop_duplicates(key_col).set_index(key_col)
+
+
+def attach_reference(df, reference, on='Selected Supplier', missing='-'):
+    """Join the reference attributes onto df in one pass. Suppliers without a reference row get missing."""
+    joined = df.join(reference, on=on)
+    columns = list(reference.columns)
+    joined[columns] = joined[columns].astype(object)
+    joined.loc[~df[on].isin(reference.index), columns] = missing
+    return joined
+
+class SupplierInfoTable:
+    """
+    Port, freight and tariff info for every (part row, supplier) pair, resolved once.
+
+    Built from the supplier port table (indexed by ROW ID #, one port column per supplier
+    plus Division), the freight multiplier table (indexed by port, one column per division)
+    and the part level tariff table (indexed by ROW ID #). The rules are the ones the
+    scenario scripts used per call:
+      - the supplier's port must be in port_country_map and in the freight table
+      - a ROW ID with a single tariff row uses that row whatever its country, otherwise
+        the first tariff row for the port's country is used
+    Pairs that break any rule are flagged invalid instead of raising.
+    """
+
+    def __init__(self, supplier_port_df, freight_df, tariff_df, port_country_map):
+        ports_df = supplier_port_df[~supplier_port_df.index.duplicated()]
+        self.rows = pd.Index(ports_df.index)
+        self.row_lookup = {row_id: pos for pos, row_id in enumerate(self.rows)}
+        self.suppliers = [col for col in ports_df.columns if col != 'Division']
+        self.supplier_codes = {supplier: code for code, supplier in enumerate(self.suppliers)}
+        n_rows, n_suppliers = len(self.rows), len(self.suppliers)
+
+        ports = ports_df[self.suppliers].to_numpy(dtype=object)
+        self.division = ports_df['Division'].to_numpy(dtype=object)
+        self.port = ports
+
+        # country as used for the tariff match (exact port name) and as reported (normalized port name)
+        flat_ports = pd.Series(ports.ravel())
+        self.country = flat_ports.map(lambda p: port_country_map.get(p, np.nan) if isinstance(p, str) else np.nan)
+        self.country = self.country.to_numpy(dtype=object).reshape(n_rows, n_suppliers)
+        self.location_country = flat_ports.map(
+            lambda p: np.nan if pd.isna(p) else port_country_map.get(str(p).strip().upper(), np.nan)
+        ).to_numpy(dtype=object).reshape(n_rows, n_suppliers)
+
+        # freight multiplier: freight_df.loc[port, division]
+        freight_values = freight_df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        port_codes = pd.Index(freight_df.index).get_indexer(flat_ports).reshape(n_rows, n_suppliers)
+        division_codes = np.broadcast_to(
+            pd.Index(freight_df.columns).get_indexer(self.division)[:, None], (n_rows, n_suppliers)
+        )
+        has_freight = (port_codes >= 0) & (division_codes >= 0)
+        self.freight = np.full((n_rows, n_suppliers), np.nan)
+        self.freight[has_freight] = freight_values[port_codes[has_freight], division_codes[has_freight]]
+
+        # tariff row position per pair
+        tariff_ids = pd.Index(tariff_df.index)
+        id_counts = tariff_ids.map(tariff_ids.value_counts()).to_numpy()
+        single = id_counts == 1
+        single_pos = np.flatnonzero(single)
+        found = pd.Index(tariff_ids[single]).get_indexer(self.rows)
+        tariff_pos = np.broadcast_to(np.where(found >= 0, single_pos[found], -1)[:, None], (n_rows, n_suppliers)).copy()
+
+        multi_pos = np.flatnonzero(~single)
+        multi_keys = pd.MultiIndex.from_arrays([tariff_ids[~single], tariff_df['Country'].to_numpy(dtype=object)[~single]])
+        first = ~multi_keys.duplicated()
+        multi_keys, multi_pos = multi_keys[first], multi_pos[first]
+        wanted = pd.MultiIndex.from_arrays([np.repeat(self.rows.to_numpy(), n_suppliers), self.country.ravel()])
+        found = multi_keys.get_indexer(wanted).reshape(n_rows, n_suppliers)
+        matched = found >= 0
+        tariff_pos[matched] = multi_pos[found[matched]]
+
+        has_tariff = tariff_pos >= 0
+        self.tariff_value = np.full((n_rows, n_suppliers), np.nan)
+        self.metal_tariff = np.full((n_rows, n_suppliers), np.nan)
+        self.metal_type = np.full((n_rows, n_suppliers), np.nan, dtype=object)
+        self.tariff_value[has_tariff] = pd.to_numeric(tariff_df['tariff_value'], errors='coerce').to_numpy(dtype=float)[tariff_pos[has_tariff]]
+        self.metal_tariff[has_tariff] = pd.to_numeric(tariff_df['Metal Tariff'], errors='coerce').to_numpy(dtype=float)[tariff_pos[has_tariff]]
+        self.metal_type[has_tariff] = tariff_df['Metal Type'].to_numpy(dtype=object)[tariff_pos[has_tariff]]
+
+        self.valid = pd.notna(self.country) & has_freight & has_tariff
+
+    @classmethod
+    def from_files(cls, supplier_port_file, freight_file, tariff_file, port_country_map):
+        return cls(
+            pd.read_csv(supplier_port_file).set_index('ROW ID #'),
+            pd.read_csv(freight_file).set_index('Reference'),
+            pd.read_csv(tariff_file).set_index('ROW ID #'),
+            port_country_map,
+        )
+
+    def row_positions(self, row_ids):
+        return self.rows.get_indexer(pd.Index(np.asarray(row_ids, dtype=object)))
+
+    def codes(self, suppliers):
+        return np.array([self.supplier_codes.get(s, -1) if isinstance(s, str) else -1 for s in suppliers], dtype=np.intp)
+
+    def gather(self, row_ids, suppliers):
+        """
+        Batched lookup for aligned arrays of row IDs and supplier names. Returns a dict of
+        arrays keyed like get_supplier_info plus 'valid'; values are NaN where not valid.
+        """
+        rows = self.row_positions(row_ids)
+        codes = self.codes(suppliers)
+        known = (rows >= 0) & (codes >= 0)
+        r, c = rows[known], codes[known]
+        valid = np.zeros(len(rows), dtype=bool)
+        valid[known] = self.valid[r, c]
+
+        def take(values, dtype):
+            out = np.full(len(rows), np.nan, dtype=dtype)
+            out[known] = values[r, c]
+            out[~valid] = np.nan
+            return out
+
+        division = np.full(len(rows), np.nan, dtype=object)
+        division[known] = self.division[r]
+        division[~valid] = np.nan
+        return {
+            'valid': valid,
+            'Division': division,
+            'Port': take(self.port, object),
+            'FreightMultiplier': take(self.freight, float),
+            'tariff_value': take(self.tariff_value, float),
+            'Metal Tariff': take(self.metal_tariff, float),
+            'Metal Type': take(self.metal_type, object),
+            'Country': take(self.country, object),
+        }
+
+    def get(self, row_id, supplier):
+        """Info dict for one pair, or None when any piece of it is missing."""
+        r = self.row_lookup.get(row_id)
+        c = self.supplier_codes.get(supplier)
+        if r is None or c is None or not self.valid[r, c]:
+            return None
+        return {
+            'row_id': row_id,
+            'Division': self.division[r],
+            'Port': self.port[r, c],
+            'FreightMultiplier': float(self.freight[r, c]),
+            'tariff_value': float(self.tariff_value[r, c]),
+            'Metal Tariff': float(self.metal_tariff[r, c]),
+            'Metal Type': self.metal_type[r, c],
+            'Country': self.country[r, c],
+        }
+
+    def supplier_country(self, row_id, supplier):
+        """Country of the supplier's port for a part (normalized port name), NaN when unknown."""
+        r = self.row_lookup.get(row_id)
+        c = self.supplier_codes.get(supplier)
+        if r is None or c is None:
+            return np.nan
+        return self.location_country[r, c]
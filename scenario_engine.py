@@ -0,0 +1,288 @@
+'''
+Scenario evaluation over a BidMatrix.
+
+A scenario is a config dict (keys and defaults in DEFAULT_CONFIG). run_scenario turns one into
+an award vector and its summary with array operations only, so the variants of a scenario
+family can all be evaluated against one loaded bid matrix (see scenario_runner.py).
+
+Scenario files (YAML or JSON, see scenarios/) hold the landed input, an output path prefix,
+defaults shared by their scenarios and the list of scenarios:
+
+    input: new/Bidsheet Master Consolidate Landed 12052025.csv
+    output: scenario_outputs/scenario 3 12052025
+    defaults: {caps: {Pushti Metal: {volume: 1000000}}}
+    scenarios:
+      - {name: scenario 3, percent_new: 0.65, tail_threshold: 100000}
+
+The greedy mode is scenario_3.py's award: every part goes to its lowest allowed bid unless the
+incumbent is at least as cheap (part_choices, admission and tail_pass are what scenario_3.py
+calls, and it checks its award against run_scenario). Parts whose incumbent did not bid must move. Moves to capped
+suppliers are admitted by capacity.allocate_capped; the other moves are admitted in order of
+savings while the new-supplier spend fits percent_new of the total landed cost. A scenario with
+sweep_percent_new is evaluated at each of those thresholds from one classification
+(sweep_scenario).
+'''
+
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from allocation_kernel import first_fit_budgets
+from bid_matrix import NO_AWARD, PART_COLUMNS, BidMatrix, lowest_bidders
+from bidsheet_schema import BidsheetSchema, FOB_METRIC, LANDED_METRIC
+from capacity import allocate_capped, cap_usage, check_caps, kept_by_incumbent, kept_mask, uncapped_mask
+from landed_store import landed_columns, read_landed
+from lookups import PORT_COUNTRY_MAP, SupplierInfoTable
+from share_sweep import admit_within_budget, admitted_award, award_summary
+from supplier_rules import SupplierRules, check_rules
+from tail_rationalization import rationalize_tail
+
+LANDED_INPUT = "new/Bidsheet Master Consolidate Landed 12052025.csv"
+SUPPLIER_PORT_FILE = "Supplier Port per Part table 070925.csv"
+FREIGHT_FILE = "Freight cost mutipliers table 071025v2.csv"
+TARIFF_FILE = "tariff_part_level_cleaned.csv"
+
+MODES = ("greedy", "milp")
+
+DEFAULT_CONFIG = {
+    "name": "scenario",
+    "mode": "greedy",
+    # max share of the total landed cost moved to new suppliers, None for no limit
+    "percent_new": None,
+    # whether the greedy award holds the new-supplier spend within percent_new; false only reports the
+    # share against it (scenario 3's own run). A sweep always holds each threshold
+    "enforce_percent_new": True,
+    # {supplier: {"volume": ..., "spend": ..., "per": ..., "keep_incumbents": [...]}}, see capacity.py
+    "caps": {},
+    # supplier exclusion rules in the supplier_rules.py format, None for SUPPLIER_RULES
+    "rules": None,
+    # suppliers awarded less than this in total are rationalized onto the large ones, None for no tail pass
+    "tail_threshold": None,
+    # repeat the tail pass until no part moves
+    "tail_fixed_point": False,
+    # suppliers rationalized as tail suppliers whatever their total
+    "tail_suppliers": [],
+    # new-supplier share thresholds to evaluate the greedy award at (one result per threshold), None for one run
+    "sweep_percent_new": None,
+}
+SCENARIO_FILE_KEYS = ("input", "output", "defaults", "scenarios")
+
+
+def scenario_config(config):
+    """config completed with the defaults; raises ValueError on unknown keys, modes or rule keys."""
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"unknown scenario setting(s): {', '.join(sorted(unknown))}")
+    config = {**DEFAULT_CONFIG, **config}
+    if config["mode"] not in MODES:
+        raise ValueError(f"unknown scenario mode {config['mode']!r}, expected one of {MODES}")
+    check_caps(config["caps"])
+    check_rules(config["rules"])
+    if config["sweep_percent_new"] is not None and config["mode"] != "greedy":
+        raise ValueError("sweep_percent_new needs a greedy scenario")
+    return config
+
+
+def read_settings_file(path):
+    """Content of a YAML (.yaml / .yml) or JSON file."""
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError("YAML scenario files need pyyaml (pip install pyyaml), or use JSON")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_scenario_file(path):
+    """
+    Scenario file as {"input", "output", "scenarios": [complete configs]}; raises ValueError on
+    unknown keys or modes, and when scenario names repeat.
+    """
+    content = read_settings_file(path)
+    unknown = set(content) - set(SCENARIO_FILE_KEYS)
+    if unknown:
+        raise ValueError(f"{path}: unknown key(s): {', '.join(sorted(unknown))}")
+    defaults = content.get("defaults") or {}
+    scenarios = [scenario_config({**defaults, **scenario}) for scenario in content.get("scenarios") or []]
+    names = [scenario["name"] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path}: scenario names must be unique")
+    return {"input": content.get("input", LANDED_INPUT), "output": content.get("output"), "scenarios": scenarios}
+
+
+def load_supplier_info():
+    return SupplierInfoTable.from_files(SUPPLIER_PORT_FILE, FREIGHT_FILE, TARIFF_FILE, PORT_COUNTRY_MAP)
+
+
+def load_bid_matrix(input_path=LANDED_INPUT, supplier_info=None):
+    """BidMatrix of the landed bidsheet, reading only the columns it needs."""
+    header = landed_columns(input_path)
+    header_schema = BidsheetSchema.for_file(header, input_path)
+    used = set(PART_COLUMNS) | {"Normalized incumbent supplier", "Annual Volume (per UOM)", "Volume-banded WAPP",
+                                "Landed Extended Cost USD"}
+    for metric in (LANDED_METRIC, FOB_METRIC):
+        used.update(header_schema.column_names(metric, "R2"))
+    df = read_landed(input_path, columns=[col for col in header if col in used])
+    return BidMatrix.from_frame(df, BidsheetSchema.from_columns(df.columns), supplier_info)
+
+
+def part_choices(matrix, unit_costs, rows=None):
+    """
+    Greedy choice of each part in rows (all parts by default), from unit_costs (see BidMatrix.unit_costs):
+    (proposed supplier, extended cost of its lowest allowed bid, whether the move is forced). Parts
+    whose incumbent did not bid, or may not keep the part, are forced to move. unit_costs may carry
+    a leading samples axis (samples x parts x suppliers); the results then do too.
+    """
+    rows = np.arange(matrix.shape[0]) if rows is None else rows
+    costs = unit_costs[..., rows, :]
+    local = np.arange(len(rows))
+    incumbent = matrix.incumbent[rows]
+    has_incumbent = incumbent != NO_AWARD
+    incumbent_cost = np.full(costs.shape[:-1], np.nan)
+    incumbent_cost[..., has_incumbent] = costs[..., local[has_incumbent], incumbent[has_incumbent]]
+
+    best = lowest_bidders(costs, count=1)[..., 0]
+    best_cost = np.take_along_axis(costs, np.maximum(best, 0)[..., None], axis=-1)[..., 0]
+    best_cost[best == NO_AWARD] = np.nan
+    # parts without an allowed option stay with their incumbent, like "-" in scenario_3.py
+    award = np.where((best == NO_AWARD) | (incumbent_cost <= best_cost), incumbent, best)
+
+    moved = (award != NO_AWARD) & (award != incumbent)
+    incumbent_bid = np.zeros(len(rows), dtype=bool)
+    incumbent_bid[has_incumbent] = ~np.isnan(matrix.landed[rows[has_incumbent], incumbent[has_incumbent]])
+    extended = np.nan_to_num(best_cost * matrix.volume[rows])
+    forced = moved & ~(incumbent_bid & ~np.isnan(incumbent_cost))
+    return award, extended, forced
+
+
+def admission(matrix, award, extended, forced, percent_new=None, caps=None):
+    """
+    The part_choices of every part with the moves that do not fit caps or percent_new handed back to
+    the incumbent, step by step: a dict of the award and the part rows of the moves kept with their
+    incumbent by a cap's keep_incumbents ("kept"), sent to a capped supplier ("capped") and refused
+    by its cap ("over_cap"), and the candidates of the percent_new budget ("candidates") and those
+    over it ("over_share").
+    """
+    award = award.copy()
+    moved = (award != NO_AWARD) & (award != matrix.incumbent)
+    steps = {"kept": np.array([], dtype=np.intp), "capped": np.array([], dtype=np.intp),
+             "over_cap": np.array([], dtype=np.intp), "candidates": np.array([], dtype=np.intp),
+             "over_share": np.array([], dtype=np.intp)}
+    if caps:
+        kept = moved & ~forced & kept_by_incumbent(matrix.names(award), matrix.names(matrix.incumbent), caps)
+        award[kept] = matrix.incumbent[kept]
+        moved &= ~kept
+        capped = np.flatnonzero(moved & np.isin(award, matrix.codes(caps)))
+        admitted = allocate_capped(matrix.names(award[capped]), matrix.volume[capped], extended[capped],
+                                   (matrix.baseline_cost - extended)[capped], caps,
+                                   parts=matrix.parts.iloc[capped], forced=forced[capped])
+        award[capped[~admitted]] = matrix.incumbent[capped[~admitted]]
+        moved[capped[~admitted]] = False
+        steps.update(kept=np.flatnonzero(kept), capped=capped, over_cap=capped[~admitted])
+    if percent_new is not None:
+        candidates = threshold_candidates(matrix, moved, extended, forced)
+        fits = admit_within_budget(extended[candidates], percent_new * matrix.baseline_cost.sum() - extended[forced].sum())
+        award = admitted_award(matrix, award, candidates, fits)
+        steps.update(candidates=candidates, over_share=candidates[~fits])
+    steps["award"] = award
+    return steps
+
+
+def admit_moves(matrix, award, extended, forced, percent_new=None, caps=None):
+    """The part_choices of every part with the moves that do not fit caps or percent_new handed back to the incumbent."""
+    return admission(matrix, award, extended, forced, percent_new, caps)["award"]
+
+
+def share_limit(config):
+    """The percent_new the greedy award of config holds the new-supplier spend within, None for none."""
+    return config["percent_new"] if config["enforce_percent_new"] else None
+
+
+def threshold_candidates(matrix, moved, extended, forced):
+    """Rows of the unforced moves in the order percent_new admits them: largest savings first."""
+    candidates = np.flatnonzero(moved & ~forced)
+    return candidates[np.argsort(-(matrix.baseline_cost - extended)[candidates], kind="stable")]
+
+
+def greedy_award(matrix, allowed=None, percent_new=None, caps=None):
+    """Lowest allowed bid per part, incumbent retained when at least as cheap, moves limited by caps and percent_new."""
+    award, extended, forced = part_choices(matrix, matrix.unit_costs(allowed))
+    return admit_moves(matrix, award, extended, forced, percent_new, caps)
+
+
+def tail_pass(matrix, award, allowed, config, unit_costs=None, valid_count=None, ranking=None):
+    """
+    rationalize_tail result for an award under config; capped suppliers receive no tail parts. The
+    supplier totals count every awarded part at its landed cost, an excluded incumbent's included.
+    """
+    unit_costs = matrix.unit_costs(allowed) if unit_costs is None else unit_costs
+    valid_count = matrix.valid_count() if valid_count is None else valid_count
+    spend = np.nan_to_num(matrix.award_costs(award))
+    tail_allowed = allowed & uncapped_mask(matrix.names(matrix.incumbent), matrix.suppliers, config["caps"])
+    return rationalize_tail(matrix, award, spend, valid_count, allowed=tail_allowed,
+                            threshold=config["tail_threshold"] or 0, fixed_point=config["tail_fixed_point"],
+                            tail_suppliers=matrix.codes(config["tail_suppliers"]), unit_costs=unit_costs,
+                            ranking=ranking)
+
+
+def run_scenario(matrix, config):
+    """Award vector and summary of one scenario config."""
+    start = time.time()
+    config = scenario_config(config)
+    allowed = SupplierRules(matrix.parts, matrix.suppliers, config["rules"]).allowed
+    result = {"name": config["name"]}
+    if config["mode"] == "milp":
+        from award_optimizer import optimize_awards
+
+        kept = kept_mask(matrix.names(matrix.incumbent), matrix.suppliers, config["caps"])
+        optimized = optimize_awards(matrix, percent_new=config["percent_new"], caps=config["caps"], allowed=allowed & kept)
+        award = optimized["award"]
+        award = np.where(award == NO_AWARD, matrix.incumbent, award)
+        result.update(gap=optimized["gap"], violations=optimized["violations"])
+    else:
+        award = greedy_award(matrix, allowed, share_limit(config), config["caps"])
+    return _completed(matrix, config, award, allowed, result, start)
+
+
+def _completed(matrix, config, award, allowed, result, start, unit_costs=None):
+    """result with the award after the tail pass, its cap usage and its summary."""
+    if config["tail_threshold"] is not None or config["tail_suppliers"]:
+        tail = tail_pass(matrix, award, allowed, config, unit_costs)
+        award = tail["award"]
+        result.update(tail_moved=len(tail["moved"]))
+    if config["caps"]:
+        # forced moves are admitted past the caps; the runner warns about the caps exceeded
+        result.update(cap_usage=cap_usage(matrix.names(award), matrix.names(matrix.incumbent), matrix.volume,
+                                          matrix.award_costs(award), config["caps"], parts=matrix.parts))
+    result.update(award=award, summary=award_summary(matrix, award), seconds=time.time() - start)
+    return result
+
+
+def sweep_scenario(matrix, config):
+    """
+    run_scenario of a greedy config at each of its sweep_percent_new thresholds, from one
+    classification: one result per threshold, named "<name> <threshold> new".
+    """
+    start = time.time()
+    config = scenario_config(config)
+    allowed = SupplierRules(matrix.parts, matrix.suppliers, config["rules"]).allowed
+    unit_costs = matrix.unit_costs(allowed)
+    award, extended, forced = part_choices(matrix, unit_costs)
+    award = admit_moves(matrix, award, extended, forced, caps=config["caps"])
+    candidates = threshold_candidates(matrix, (award != NO_AWARD) & (award != matrix.incumbent), extended, forced)
+    thresholds = list(config["sweep_percent_new"])
+    # every threshold's admissions in one pass of the first-fit kernel
+    budgets = [threshold * matrix.baseline_cost.sum() - extended[forced].sum() for threshold in thresholds]
+    results = []
+    for threshold, fits in zip(thresholds, first_fit_budgets(extended[candidates], budgets)):
+        swept = {**config, "name": f"{config['name']} {threshold:.0%} new", "percent_new": threshold}
+        results.append(_completed(matrix, swept, admitted_award(matrix, award, candidates, fits), allowed,
+                                  {"name": swept["name"], "percent_new": threshold}, start, unit_costs))
+    return results
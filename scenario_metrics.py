@@ -0,0 +1,73 @@
+'''
+Summary metrics of a final award.
+
+Every part of an award falls in one group of (is_incumbent, is_existing_supplier, is_no_bid):
+kept with its incumbent, moved to a supplier that is already an incumbent elsewhere, moved to
+a completely new supplier, or not awarded. award_metrics sums parts, landed extended cost,
+volume and savings per group in one groupby and derives every scenario summary figure from
+those sums. scenario_3.py (prints, summary block, header) and share_sweep.award_summary
+both read their figures from it.
+'''
+
+import numpy as np
+import pandas as pd
+
+GROUPS = ["is_incumbent", "is_existing_supplier", "is_no_bid"]
+
+
+def award_metrics(selected, incumbent, existing_suppliers, landed_cost, volume, landed_savings, fob_savings=None,
+                  no_bid="-"):
+    """
+    selected / incumbent: supplier per part (names or codes); existing_suppliers: the incumbent
+    suppliers of the sheet; landed_cost: awarded landed extended cost per part; no_bid: the
+    selected value of a part not awarded. Non-numeric costs and savings count as 0.
+    """
+    selected = np.asarray(selected)
+    frame = pd.DataFrame({
+        "supplier": selected,
+        "is_incumbent": selected == np.asarray(incumbent),
+        "is_existing_supplier": np.isin(selected, np.asarray(list(existing_suppliers))),
+        "is_no_bid": selected == no_bid,
+        "landed_cost": pd.to_numeric(pd.Series(landed_cost), errors="coerce").to_numpy(),
+        "volume": pd.to_numeric(pd.Series(volume), errors="coerce").to_numpy(),
+        "landed_savings": pd.to_numeric(pd.Series(landed_savings), errors="coerce").to_numpy(),
+        "fob_savings": 0.0 if fob_savings is None else pd.to_numeric(pd.Series(fob_savings), errors="coerce").to_numpy(),
+    })
+    groups = frame.groupby(GROUPS).agg(
+        parts=("supplier", "size"),
+        landed_cost=("landed_cost", "sum"),
+        volume=("volume", "sum"),
+        landed_savings=("landed_savings", "sum"),
+        fob_savings=("fob_savings", "sum"),
+        suppliers=("supplier", "unique"),
+    )
+    keys = groups.index.to_frame(index=False)
+    retained = keys["is_incumbent"].to_numpy()
+    no_bid_group = keys["is_no_bid"].to_numpy()
+    existing = keys["is_existing_supplier"].to_numpy()
+    to_existing = ~retained & existing & ~no_bid_group
+    to_new = ~retained & ~existing & ~no_bid_group
+
+    def total(column, where):
+        return groups[column].to_numpy()[where].sum()
+
+    def suppliers(where):
+        return set().union(*(set(names) for names in groups["suppliers"].to_numpy()[where]))
+
+    return {
+        "incumbent_retained": int(total("parts", retained)),
+        "new_supplier_count": int(total("parts", to_existing)),
+        "net_new_supplier_count": int(total("parts", to_new)),
+        "parts_where_no_bids": int(total("parts", no_bid_group)),
+        "total_landed_cost_incumbent": float(total("landed_cost", retained)),
+        "total_landed_cost_new_suppliers": float(total("landed_cost", to_existing)),
+        "total_landed_cost_completely_new_suppliers": float(total("landed_cost", to_new)),
+        "total_cost_no_bids": float(total("landed_cost", no_bid_group)),
+        "total_incumbent_volume": float(total("volume", retained)),
+        "total_new_supplier_volume": float(total("volume", to_existing)),
+        "total_net_new_supplier_volume": float(total("volume", to_new)),
+        "total_landed_savings_usd": float(groups["landed_savings"].sum()),
+        "total_fob_savings_usd": float(groups["fob_savings"].sum()),
+        "unique_suppliers": suppliers(~no_bid_group),
+        "net_new_supplier_list": suppliers(to_new),
+    }
@@ -0,0 +1,136 @@
+'''
+Process-pool runner for scenario variants over one shared bid matrix.
+
+The landed bidsheet is loaded once. The numeric arrays of its BidMatrix are copied into
+multiprocessing.shared_memory blocks, and every worker of the pool attaches to those blocks
+(no copy, whatever the start method) and evaluates configs with scenario_engine.run_scenario.
+Only the configs and the award vectors / summaries travel between processes.
+
+    python scenario_runner.py [scenario file]
+
+runs every scenario of a YAML / JSON scenario file (see scenario_engine.load_scenario_file)
+after loading its landed input and the lookup tables once; without a file it runs VARIANTS. A
+scenario with sweep_percent_new gives one result per threshold.
+'''
+
+import os
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bid_matrix import BidMatrix
+from scenario_engine import (LANDED_INPUT, load_bid_matrix, load_scenario_file, load_supplier_info, run_scenario,
+                             sweep_scenario)
+from share_sweep import awards_frame
+
+# BidMatrix arrays placed in shared memory; parts and supplier names are small and pickled once per worker
+SHARED_ARRAYS = ["landed", "fob", "volume", "baseline_cost", "wapp", "incumbent", "incumbent_landed"]
+
+# Variants run by the command line: the greedy award at 5% steps of the new-supplier share
+VARIANTS = [{"name": f"greedy {share:.0%} new", "percent_new": share} for share in np.round(np.arange(0.05, 1.0001, 0.05), 2)]
+
+output_prefix = "scenario_outputs/scenario variants"
+
+
+class SharedBidMatrix:
+    """Copies the arrays of a BidMatrix into shared memory; unlinks the blocks on close."""
+
+    def __init__(self, matrix):
+        self.parts = matrix.parts
+        self.suppliers = matrix.suppliers
+        self.blocks = []
+        self.spec = {}
+        for name in SHARED_ARRAYS:
+            array = np.ascontiguousarray(getattr(matrix, name))
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec, parts, suppliers):
+    """BidMatrix over the shared blocks in spec, without copying. Returns (matrix, blocks); keep the blocks open."""
+    # pool workers share the owner's resource tracker, so attaching here does not take over the unlink
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in spec.items()}
+    arrays = {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[name].buf)
+        for name, (_, shape, dtype) in spec.items()
+    }
+    return BidMatrix(parts, suppliers, **arrays), blocks
+
+
+_worker = {}
+
+
+def _init_worker(spec, parts, suppliers):
+    _worker["matrix"], _worker["blocks"] = attach(spec, parts, suppliers)
+
+
+def scenario_results(matrix, config):
+    """[run_scenario result] of a config, or one result per threshold when it sets sweep_percent_new."""
+    if config.get("sweep_percent_new") is not None:
+        return sweep_scenario(matrix, config)
+    return [run_scenario(matrix, config)]
+
+
+def _run(config):
+    return scenario_results(_worker["matrix"], config)
+
+
+def run_batch(matrix, configs, processes=None):
+    """Results of every config, in order (a sweep gives one per threshold), evaluated on a process pool."""
+    configs = list(configs)
+    processes = min(processes or os.cpu_count() or 1, len(configs))
+    if processes <= 1:
+        return [result for config in configs for result in scenario_results(matrix, config)]
+    with SharedBidMatrix(matrix) as shared:
+        with Pool(processes, initializer=_init_worker, initargs=(shared.spec, matrix.parts, matrix.suppliers)) as pool:
+            return [result for results in pool.map(_run, configs, chunksize=1) for result in results]
+
+
+def summary_frame(results):
+    return pd.DataFrame([{"Scenario": result["name"], **result["summary"], "Seconds": result["seconds"]}
+                         for result in results])
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    if len(sys.argv) > 1:
+        batch = load_scenario_file(sys.argv[1])
+        input_path, configs = batch["input"], batch["scenarios"]
+        output_prefix = batch["output"] or output_prefix
+    else:
+        input_path, configs = LANDED_INPUT, VARIANTS
+    summary_file, awards_file = f"{output_prefix} summary.csv", f"{output_prefix} awards.csv"
+    print("Reading:", input_path)
+    matrix = load_bid_matrix(input_path, load_supplier_info())
+    print(f"Loaded {matrix.shape[0]} parts x {matrix.shape[1]} suppliers in {time.time() - start_time:.2f} seconds")
+
+    results = run_batch(matrix, configs)
+    summary = summary_frame(results)
+    print(summary.to_string(index=False))
+    for result in results:
+        for entry in result.get("cap_usage", []):
+            if entry["exceeded"]:
+                group = "" if entry["group"] is None else f" ({entry['group']})"
+                print(f"Warning: {result['name']}: {entry['supplier']}{group} is past its cap, volume "
+                      f"{entry['volume']:,.0f} (cap {entry['volume cap']}), spend ${entry['spend']:,.2f} (cap {entry['spend cap']})")
+    summary.to_csv(summary_file, index=False)
+    awards_frame(matrix, {result["name"]: result["award"] for result in results}, label="{}").to_csv(awards_file, index=False)
+    print(f"\n✅ {len(results)} scenarios written to '{summary_file}' and '{awards_file}'")
+    print(f"⏱ Time taken: {time.time() - start_time:.2f} seconds")
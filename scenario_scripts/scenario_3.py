@@ -1,66 +1,81 @@
 
+import os
+import sys
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bidsheet_schema import (BidsheetSchema, FOB_METRIC, LANDED_METRIC, FOB_PCT_SAVINGS, FOB_USD_SAVINGS,
+                             LANDED_PCT_SAVINGS, LANDED_USD_SAVINGS, NO_ROUND)
+from landed_store import landed_columns, read_landed
+from lookups import PORT_COUNTRY_MAP, SupplierInfoTable, attach_reference, load_reference, row_index
+from bid_matrix import NO_AWARD, BidMatrix
+from supplier_rules import SupplierRules
+from supplier_ranking import SupplierRanking
+from capacity import cap_usage, kept_mask, print_cap_usage
+from scenario_metrics import award_metrics
+from award_store import award_path, write_award
+from scenario_engine import (admission, load_scenario_file, part_choices, run_scenario, share_limit, sweep_scenario,
+                             tail_pass)
+from stage_timer import StageTimer
+
 # --- Start timer ---
 start_time = time.time()
 
-# --- Constants ---
-PERCENT_NEW = 0.65
-
-input_path = "new/Bidsheet Master Consolidate Landed 12052025.csv"
-
-output_file = 'scenario_outputs/scenario 3 12052025.xlsx'
+# --- Scenario settings (scenario_engine.load_scenario_file): input, output prefix, share, caps, tail, rules ---
+SCENARIO_FILE = sys.argv[1] if len(sys.argv) > 1 else "scenarios/scenario_3.yaml"
+# Optional second argument: JSON file the stage timings are written to (benchmark.py)
+TIMINGS_FILE = sys.argv[2] if len(sys.argv) > 2 else None
+timer = StageTimer(TIMINGS_FILE)
+scenario_file = load_scenario_file(SCENARIO_FILE)
+scenario = scenario_file["scenarios"][0]
+print(f"Scenario: {scenario['name']} ({SCENARIO_FILE})")
+
+PERCENT_NEW = scenario["percent_new"]
+# Whether the greedy award holds the new-supplier spend within PERCENT_NEW (enforce_percent_new); scenario 3
+# reports the share against it without limiting the award
+ENFORCE_PERCENT_NEW = scenario["enforce_percent_new"]
+
+# "greedy" runs the rule-based allocation below; "milp" awards parts with award_optimizer
+# (needs scipy) under the PERCENT_NEW share and SUPPLIER_CAPS, and prints both results
+AWARD_MODE = scenario["mode"]
+
+# Caps on volume / landed spend moved to a supplier
+SUPPLIER_CAPS = scenario["caps"]
+
+# Exclusion rules, None for supplier_rules.SUPPLIER_RULES
+SCENARIO_RULES = scenario["rules"]
+
+# New-supplier share thresholds to sweep (sweep_percent_new, e.g. [0.0, 0.05, ..., 1.0]). When set, the greedy
+# award is evaluated at every threshold from one classification, the savings frontier and the award vectors
+# are written to sweep_frontier_file / sweep_awards_file, and the script stops there
+SWEEP_PERCENT_NEW = scenario["sweep_percent_new"]
+
+# Suppliers awarded less than this in total are tail suppliers whose parts are moved to large suppliers
+# (None skips the tail pass); with TAIL_FIXED_POINT the pass repeats on the new totals until no part moves
+TAIL_SPEND_THRESHOLD = scenario["tail_threshold"]
+TAIL_FIXED_POINT = scenario["tail_fixed_point"]
+# Suppliers rationalized as tail suppliers whatever their total
+TAIL_SUPPLIERS = scenario["tail_suppliers"]
+
+input_path = scenario_file["input"]
+
+output_prefix = scenario_file["output"] or "scenario_outputs/scenario 3 12052025"
+output_file = f"{output_prefix}.xlsx"
+sweep_frontier_file = f"{output_prefix} share frontier.csv"
+sweep_awards_file = f"{output_prefix} share awards.csv"
 
 incumbent_col = "Normalized incumbent supplier"
 valid_supplier_col = "Valid Supplier"
 volume_col = "Annual Volume (per UOM)"
 supplier_port_file = "Supplier Port per Part table 070925.csv"
 freight_file = "Freight cost mutipliers table 071025v2.csv"
-port_country_map = {
-    'DALIAN': 'China', 
-    'NINGBO': 'China', 
-    'QINGDAO': 'China', 
-    'QINGDAO2': 'China', 
-    'SHANGHAI': 'China',
-    'SHENZHEN': 'China', 
-    'TIANJIN': 'China', 
-    'XINGANG': 'China', 
-    'XIAMEN': 'China',
-    'AHMEDABAD': 'India', 
-    'CHENNAI': 'India', 
-    'DADRI': 'India', 
-    'MUMBAI': 'India',
-    'MUNDRA': 'India', 
-    'NHAVA SHEVA': 'India',
-    'SURABAYA': 'Indonesia',
-    'PORT KLANG': 'Malaysia', 
-    'PASIR GUDANG': 'Malaysia', 
-    'TANJUNG PELAPAS': 'Malaysia',
-    'BUSAN': 'South Korea',
-    'KAOHSIUNG': 'Taiwan', 
-    'KEELUNG': 'Taiwan', 
-    'TAICHUNG': 'Taiwan', 
-    'TAIPEI': 'Taiwan',
-    'BANGKOK': 'Thailand',
-    'LAEM CHABANG': 'Thailand',
-    'HO CHI MINH CITY': 'Vietnam', 
-    'VUNG TAU': 'Vietnam', 
-    'HAI PHONG': 'Vietnam',
-    'VIRGINIA': 'India'
-}
-
-freight_df = pd.read_csv(freight_file) 
-supplier_port_df = pd.read_csv(supplier_port_file)
-tariff_df_2 = pd.read_csv("tariff_part_level_cleaned.csv")
-
-
-# Set indices for fast lookup
-tariff_df_2.set_index('ROW ID #', inplace=True)
-supplier_port_df.set_index('ROW ID #', inplace=True)
-freight_df.set_index('Reference', inplace=True)
+port_country_map = PORT_COUNTRY_MAP
 
+# Port / freight / tariff info for every (part, supplier) pair, resolved once
+supplier_info = SupplierInfoTable.from_files(supplier_port_file, freight_file, "tariff_part_level_cleaned.csv", port_country_map)
 
 
 def get_supplier_info(row_id, supplier):
@@ -73,52 +88,31 @@ def get_supplier_info(row_id, supplier):
     
     Returns None if any info is missing.
     """
-    try:
-        # 1️⃣ Get supplier port and division from supplier_port_df
-        supplier_row = supplier_port_df.loc[row_id]
-        division = supplier_row['Division']
-        port = supplier_row[supplier]
-        country = port_country_map[port]
-        # 2️⃣ Get freight multiplier from freight_df
-        freight_multiplier = freight_df.loc[port, division]
-
-        # 3️⃣ Get tariff info from tariff_df_2
-        tariff_rows = tariff_df_2.loc[row_id]
-        if isinstance(tariff_rows, pd.Series):
-            tariff_row = tariff_rows
-        else:
-            # Filter to match the country
-            tariff_row = tariff_rows[tariff_rows['Country'] == country]
-            if tariff_row.empty:
-                return None
-            tariff_row = tariff_row.iloc[0]
-
-        tariff_value = float(tariff_row['tariff_value'])
-        metal_tariff = float(tariff_row['Metal Tariff'])
-        metal_type = tariff_row['Metal Type']
-        
-        return {
-            'row_id': row_id,
-            'Division': division,
-            'Port': port,
-            'FreightMultiplier': float(freight_multiplier),
-            'tariff_value': float(tariff_value),
-            'Metal Tariff': float(metal_tariff),
-            'Metal Type': metal_type,
-            'Country': country
-        }
-
-    except KeyError:
-        # Any missing row or column returns None
-        return None
+    return supplier_info.get(row_id, supplier)
 
 
 # --- Load files ---
 output_reference_file_path = "new/outout-reference.csv"
 
+# Only the bidsheet columns this scenario reads are paged in
+bidsheet_columns = [
+    "ROW ID #", "Division", "Part #", "Item Description", "Product Group", "Part Family",
+    incumbent_col, valid_supplier_col, volume_col, "Volume-banded WAPP", "Volume-banded WAPP Landed Cost",
+    "Landed Extended Cost USD", "Final Minimum Bid Landed Supplier",
+]
+supplier_metrics = [
+    (LANDED_METRIC, "R2"), (FOB_METRIC, "R2"), (FOB_PCT_SAVINGS, NO_ROUND), (FOB_USD_SAVINGS, NO_ROUND),
+    (LANDED_PCT_SAVINGS, NO_ROUND), (LANDED_USD_SAVINGS, NO_ROUND),
+]
+
 print("Reading:", input_path)
-df = pd.read_csv(input_path)
-output_reference_df = pd.read_csv(output_reference_file_path)
+landed_header = landed_columns(input_path)
+header_schema = BidsheetSchema.for_file(landed_header, input_path)
+used_columns = set(bidsheet_columns)
+for metric, round_tag in supplier_metrics:
+    used_columns.update(header_schema.column_names(metric, round_tag))
+df = read_landed(input_path, columns=[col for col in landed_header if col in used_columns])
+supplier_reference = load_reference(output_reference_file_path)
 print(f"Loaded {len(df)} rows\n")
 # Calculate TOTAL_COST from actual data
 TOTAL_COST = df['Landed Extended Cost USD'].sum()
@@ -127,422 +121,273 @@ THRESHOLD_COST = TOTAL_COST * PERCENT_NEW
 print(TOTAL_COST)
 print(f"Calculated TOTAL_COST from input data: ${TOTAL_COST:,.2f}")
 print(f"THRESHOLD_COST ({PERCENT_NEW*100}%): ${THRESHOLD_COST:,.2f}")
+timer.mark("load")
+
+# --- Supplier column schema (parsed once from the header) ---
+schema = BidsheetSchema.from_columns(df.columns)
+
+# Column names of each supplier's metrics, looked up once (None where the supplier has no such column)
+def metric_columns(supplier):
+    return {
+        "landed": schema.column_name(supplier, LANDED_METRIC, "R2"),
+        "fob": schema.column_name(supplier, FOB_METRIC, "R2"),
+        "pct": schema.column_name(supplier, FOB_PCT_SAVINGS, NO_ROUND),
+        "usd": schema.column_name(supplier, FOB_USD_SAVINGS, NO_ROUND),
+        "landed_pct": schema.column_name(supplier, LANDED_PCT_SAVINGS, NO_ROUND),
+        "landed_usd": schema.column_name(supplier, LANDED_USD_SAVINGS, NO_ROUND),
+    }
 
-# --- Identify R2 landed cost columns ---
-r2_fob_cols = [col for col in df.columns if col.endswith("R2 - Total landed cost per UOM (USD)")]
+supplier_columns = {supplier: metric_columns(supplier) for supplier in schema.suppliers}
+NO_COLUMNS = metric_columns(None)
 
 # --- Prepare suppliers ---
 incumbent_suppliers = df[incumbent_col].unique()
-suppliers = [col.split(" - R2")[0] for col in r2_fob_cols]
+suppliers = schema.suppliers_with(LANDED_METRIC, "R2")
 
 # --- PART ASSIGNMENT LOGIC (HEAVILY COMMENTED) ---
-# We process all rows and classify them into:
-#   1. No valid suppliers: Not awarded.
-#   2. Incumbent did not bid, but minimum bid exists: Assign to min bid (contributes to 65% threshold).
+# Every part's choice and its admission come from scenario_engine (part_choices, admission), the same path
+# scenario_runner.py and the what-if tools evaluate; this script adds the reasons and the output rows.
+# Parts are grouped, for their reasons and the order of the output rows, into:
+#   1. No valid suppliers: no allowed bid, the part stays with its incumbent.
+#   2. Incumbent has no bid column: kept when its WAPP landed cost is lower than the lowest allowed bid,
+#      otherwise assigned to the lowest bid (contributes to the PERCENT_NEW share).
 #   3. Incumbent bid:
-#       a. Incumbent is the minimum: Retain incumbent (does NOT contribute to 65% threshold).
-#       b. Incumbent is NOT the minimum: Assign to min bid (contributes to 65% threshold).
-
-no_valid_supplier_parts = []
-must_assign_min_bid_parts = []  # Forced to min bid, always contributes to threshold
-incumbent_retained_parts = []
-candidate_new_supplier_parts = []  # Eligible for threshold assignment
-net_new_supplier_list = set()
-total_cost_not_awarded = 0
-
-MANEK_EXTRA_VOLUME = 0
-PUSHTI_EXTRA_VOLUME = 0
-
-PARTS_NOT_TO_ASSIGN_TO_MANEK = ['619', '13908', '618', '13907', '620', '13909', '621', '13910', '13911', '622', '13912', '13913', '5574', '623', '13914', '5575', '5576', '624', '5577', '5578', '5579', '5634', '596', '13889', '13893', '13895', '594', '13887', '595', '13888', '599', '13892', '13894', '600', '13896', '593', '5562', '597', '13890', '598', '13891', '7902', '12297', '5564', '12298', '603', '5565', '584', '5554', '585', '13870', '586', '13871', '13872', '587', '13873', '13875', '13876', '13877', '5556', '588', '5557', '5548', '581', '13867', '582', '13868', '5550', '583', '5551', '5552', '628', '5589', '5590', '629', '5591', '630', '5592', '5593', '631', '5594', '12326', '5596', '5597', '5598', '5599', '5600', '5601', '5602', '5603', '5604', '13915', '13916', '5580', '13917', '5581', '625', '5582', '626', '5583', '5584', '627', '5585', '5586', '5588', '632', '5605', '5606', '633', '5607', '634', '5608', '635', '5609', '636', '5610', '637', '5611', '5612', '13515', '639', '5613', '640', '5614', '5615', '641', '5616', '642', '5617', '643', '5618', '5619', '644', '5620', '5621', '5635', '645', '5622', '5623', '5624', '5626', '646', '5627', '647', '5628', '648', '5629', '5630', '5631', '5632', '612', '13904', '605', '13897', '606', '13898', '604', '5566', '607', '13899', '608', '13900', '609', '13901', '610', '13902', '611', '13903', '613', '13905', '614', '13906', '5567', '615', '5568', '5569', '13279', '617', '5570', '5571', '5572', '13878', '13879', '13880', '590', '13881', '591', '13883', '13884', '13885', '592', '13886', '589', '5560', '13882', '5633', '12518', '9839']
-
-SPEND_ON_MANEK = 0
-
-# for idx, row in df.iterrows():
-#     if str(row['ROW ID #']) in PARTS_NOT_TO_ASSIGN_TO_MANEK:
-#         df.at[idx, 'Manek Metalcraft - R2 - Total landed cost per UOM (USD)'] = 0
-
-for idx, row in df.iterrows():
-    incumbent = row.get(incumbent_col)
-    min_supplier = row.get("Final Minimum Bid Landed Supplier")
-    second_min_supplier = row.get("2nd Lowest Bid Landed Supplier")
-    valid_supplier_count = row.get(valid_supplier_col, 0)
-
-    # forced incumbents:
-    # if row["ROW ID #"] in [9704, 11781, 8462]:
-    #     incumbent_retained_parts.append({
-    #         "index": idx,
-    #         "row": row,
-    #         "incumbent": incumbent,
-    #         "reason": "Force to incumbent at WAPP"
-    #     })
-    #     continue
-
-    # 1. No valid suppliers
-    if valid_supplier_count == 0 or pd.isna(min_supplier):
-        no_valid_supplier_parts.append({
-            "index": idx,
-            "row": row,
-            "reason": "No valid suppliers"
-        })
-        total_cost_not_awarded += row.get('Landed Extended Cost USD', 0)
-        continue
-
-    # 2. Incumbent did not bid, but minimum bid exists
-    if incumbent not in suppliers and pd.notna(min_supplier):
-        landed_cost = row.get(f"{min_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        volume = pd.to_numeric(row.get(volume_col), errors='coerce')
-        extended_cost = landed_cost * volume
-        savings_usd = row.get(f"{min_supplier} - Final Landed USD savings vs baseline", 0)
-
-        wapp_price = row.get('Volume-banded WAPP')
-        row_id = row.get('ROW ID #')
-        multiplier_info = get_supplier_info(row_id, incumbent)
-
-        if not multiplier_info:
-            print(f"No info found for {row_id}, {incumbent}")
-            wapp_landed_cost = 999999
-        else:
-            if incumbent == 'KG Machinery':
-                is_kg = True
-            wapp_landed_cost = wapp_price * multiplier_info['FreightMultiplier'] + wapp_price * (multiplier_info['tariff_value'] + multiplier_info['Metal Tariff'])
-
-        try:
-            savings_usd = float(savings_usd)
-        except:
-            savings_usd = 0
-
-        if wapp_landed_cost < landed_cost and incumbent != '-':
-            incumbent_retained_parts.append({
-                "index": idx,
-                "row": row,
-                "incumbent": incumbent,
-                "reason": "Incumbent did not bid, but its WAPP landed is lower than Lowest Bid."
-            })
-        
-        else:
-            must_assign_min_bid_parts.append({
-                "index": idx,
-                "row": row,
-                "extended_cost": extended_cost,
-                "savings_usd": savings_usd,
-                "min_supplier": min_supplier,
-                "incumbent": incumbent,
-                "reason": "Incumbent did not bid, using Final Minimum Bid Landed Supplier"
-            })
-        continue
+#       a. Incumbent is the minimum: Retain incumbent (does NOT contribute to the share).
+#       b. Incumbent is NOT the minimum: Assign to min bid (contributes to the share).
+#   4. Incumbent has a bid column but no bid on the part: its WAPP landed cost against the lowest bid, as in 2.
+# A move the incumbent cannot take back (no bid on the part, or a rule excludes it) is forced: the capacity
+# caps and the share admit it in any case.
+
+NO_VALID, MUST_ASSIGN, RETAINED, CANDIDATE, UNCLASSIFIED = 0, 1, 2, 3, -1
+
+# One dict per row, built once; used wherever a whole row is needed
+row_records = df.to_dict("records")
+row_positions = row_index(df)
+
+def df_row_for(row_id):
+    """Bidsheet row (dict) for a ROW ID #, or None."""
+    pos = row_positions.get(row_id)
+    return None if pos is None else row_records[pos]
+
+supplier_codes = {supplier: j for j, supplier in enumerate(suppliers)}
+
+def supplier_matrix(metric, round_tag):
+    """Numeric (rows x suppliers) matrix of one supplier metric, NaN where the supplier has no column."""
+    matrix = np.full((len(df), len(suppliers)), np.nan)
+    for j, pos in enumerate(schema.positions(metric, round_tag, suppliers=suppliers)):
+        if pos >= 0:
+            matrix[:, j] = pd.to_numeric(df.iloc[:, pos], errors="coerce").to_numpy(dtype=float)
+    return matrix
+
+def gather(matrix, supplier_series, default=0.0):
+    """Per-row value of matrix for the supplier named in supplier_series (default when it has no column)."""
+    codes = supplier_series.map(supplier_codes).fillna(-1).astype(int).to_numpy()
+    out = np.full(len(codes), default, dtype=float)
+    has_column = codes >= 0
+    out[has_column] = matrix[np.flatnonzero(has_column), codes[has_column]]
+    return out
+
+landed_matrix = supplier_matrix(LANDED_METRIC, "R2")
+landed_savings_matrix = supplier_matrix(LANDED_USD_SAVINGS, NO_ROUND)
+
+incumbents = df[incumbent_col]
+timer.mark("classification")
+
+# Bid matrix over the bidders (the columns of landed_matrix) and the incumbents without a bid, built once
+bids = BidMatrix.from_frame(df, schema, supplier_info, incumbent_col, volume_col)
+
+# --- Supplier exclusion rules (supplier_rules.py), compiled into a mask over the bids before ranking ---
+supplier_rules = SupplierRules(df, bids.suppliers, SCENARIO_RULES)
+for rule_supplier, action, covered in supplier_rules.summary():
+    print(f"Rule: {action} {rule_supplier} on {covered} parts")
+
+# Every part's allowed bids ranked once (supplier_ranking.py); the tail rationalization looks the next best
+# supplier of a part up here
+ranking = SupplierRanking(bids.landed, supplier_rules.allowed)
+
+# Parts whose sheet lowest bidder a rule blocks go to their lowest allowed bid instead
+min_rule = supplier_rules.blocking_rule(df["Final Minimum Bid Landed Supplier"])
+incumbent_allowed = supplier_rules.allows(incumbents)
+# rule named in the reason of parts it moved: the one blocking the sheet's lowest bidder, else the incumbent
+applied_rule = np.where(min_rule >= 0, min_rule, supplier_rules.blocking_rule(incumbents))
+print(f"Re-ranked {(min_rule >= 0).sum()} parts whose lowest bidder is excluded\n")
+timer.mark("exclusions")
+
+# --- Greedy choice of every part (scenario_engine.part_choices): its lowest allowed bid, unless the incumbent
+# is at least as cheap (at its WAPP landed cost where it has no bid) ---
+unit_costs = bids.unit_costs(supplier_rules.allowed)
+choice, extended_costs, forced = part_choices(bids, unit_costs)
+choice_suppliers = bids.names(choice)
+moved = (choice != NO_AWARD) & (choice != bids.incumbent)
+
+has_bid_column = incumbents.isin(suppliers).to_numpy()
+incumbent_bid = gather(landed_matrix, incumbents) > 0
+
+category = np.full(len(df), UNCLASSIFIED, dtype=np.int8)
+reasons = np.full(len(df), "", dtype=object)
+
+# 1. No valid suppliers
+no_valid = ~((bids.landed > 0) & supplier_rules.allowed).any(axis=1)
+category[no_valid] = NO_VALID
+reasons[no_valid] = "No valid suppliers"
+total_cost_not_awarded = df.loc[no_valid, 'Landed Extended Cost USD'].sum()
+
+# 2. Incumbent did not bid: kept when its WAPP landed cost is lower than the lowest bid
+incumbent_not_bidder = ~no_valid & ~has_bid_column
+for idx in np.flatnonzero(incumbent_not_bidder & (incumbents != '-').to_numpy() & np.isnan(bids.incumbent_landed)):
+    print(f"No info found for {row_records[idx].get('ROW ID #')}, {row_records[idx].get(incumbent_col)}")
+category[incumbent_not_bidder & ~moved] = RETAINED
+reasons[incumbent_not_bidder & ~moved] = "Incumbent did not bid, but its WAPP landed is lower than Lowest Bid."
+category[incumbent_not_bidder & moved] = MUST_ASSIGN
+reasons[incumbent_not_bidder & moved] = "Incumbent did not bid, using Final Minimum Bid Landed Supplier"
+
+# 3. Incumbent bid (rows where the incumbent column is empty/zero fall through to Step 4)
+incumbent_bid_rows = ~no_valid & has_bid_column & incumbent_bid
+
+#   a. Incumbent is the minimum
+category[incumbent_bid_rows & ~moved] = RETAINED
+reasons[incumbent_bid_rows & ~moved] = "Incumbent retained (lowest bid)"
+
+#   b. Incumbent is NOT the minimum
+category[incumbent_bid_rows & moved] = CANDIDATE
+reasons[incumbent_bid_rows & moved] = "Incumbent bid, but not lowest; eligible for new supplier assignment"
+
+# 4. Incumbent has a bid column but no bid on the part: kept when its WAPP landed cost is lower, as in 2.
+fallback = category == UNCLASSIFIED
+reasons[fallback & ~moved] = "Incumbent did not bid, but its WAPP landed is lower than Lowest Bid."
+reasons[fallback & moved] = np.where(incumbent_allowed[fallback & moved], "Forced to Lowest Bidder",
+                                     "Incumbent did not bid, using Final Minimum Bid Landed Supplier")
+
+print(f"Classified {len(df)} parts: "
+      f"{(category == MUST_ASSIGN).sum()} must-assign, {(category == CANDIDATE).sum()} candidates, "
+      f"{(category == RETAINED).sum()} incumbent retained, {(category == NO_VALID).sum()} no valid supplier, "
+      f"{(category == UNCLASSIFIED).sum()} left for fallback")
+timer.mark("classification")
+
+def category_rows(code):
+    return np.flatnonzero(category == code)
+
+# --- Sort candidate new supplier parts by savings descending (stable, so ties keep sheet order) ---
+savings_usd = np.nan_to_num(gather(landed_savings_matrix, pd.Series(choice_suppliers)))
+candidate_rows = category_rows(CANDIDATE)
+candidate_rows = candidate_rows[np.argsort(-savings_usd[candidate_rows], kind="stable")]
 
-    # 3. Incumbent bid
-    incumbent_bid_val = row.get(f"{incumbent} - R2 - Total landed cost per UOM (USD)", 0)
-    if incumbent_bid_val > 0:
-        # a. Incumbent is the minimum
-        if min_supplier == incumbent:
-            incumbent_retained_parts.append({
-                "index": idx,
-                "row": row,
-                "incumbent": incumbent,
-                "reason": "Incumbent retained (lowest bid)"
-            })
-        # b. Incumbent is NOT the minimum
-        else:
-
-            if str(row.get("ROW ID #")) in PARTS_NOT_TO_ASSIGN_TO_MANEK and min_supplier == "Manek Metalcraft":
-                if second_min_supplier == incumbent:
-                    incumbent_retained_parts.append({
-                        "index": idx,
-                        "row": row,
-                        "incumbent": incumbent,
-                        "reason": "Incumbent Supplier retained over Manek MetalCraft (part restriction)"
-                    })
-                    continue
-                else:
-                    min_supplier = second_min_supplier
-                    reason = "Avoid assigning to Manek MetalCraft (part restriction) for red brass; assigned to 2nd lowest bidder"
-
-            elif min_supplier == "Manek Metalcraft" and SPEND_ON_MANEK > 3500000:
-                if second_min_supplier == incumbent:
-                    incumbent_retained_parts.append({
-                        "index": idx,
-                        "row": row,
-                        "incumbent": incumbent,
-                        "reason": "Incumbent Supplier retained over Manek MetalCraft (part restriction)"
-                    })
-                else:
-                    min_supplier = second_min_supplier
-                    reason = "Avoid assigning to Manek MetalCraft (part restriction) for red brass; assigned to 2nd lowest bidder"
-
-                continue
-
-            landed_cost = row.get(f"{min_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-            fob_cost = row.get(f"{min_supplier} - R2 - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)", 0)
-            volume = pd.to_numeric(row.get(volume_col), errors='coerce')
-            extended_cost = landed_cost * volume
-            fob_extended_cost = fob_cost * volume
-            savings_usd = row.get(f"{min_supplier} - Final Landed USD savings vs baseline", 0)
-
-            has_incumbent_bid = pd.notna(incumbent_bid_val) and incumbent_bid_val > 0
-
-            if ((min_supplier == 'Pushti Metal' and PUSHTI_EXTRA_VOLUME <= 1000000) or (min_supplier == 'Manek Metalcraft' and MANEK_EXTRA_VOLUME <= 6400000)) and incumbent in ['Mayank', 'Brass Pro Industrial'] :
-
-                if min_supplier in ['Manek Metalcraft', 'Pushti Metal']:
-                    if incumbent == 'Mayank':
-                        if min_supplier == 'Manek Metalcraft':
-                            reason = "Incumbent Supplier Mayank prefered over Manek MetalCraft"
-                        elif min_supplier == 'Pushti Metal':
-                            reason = "Incumbent Supplier Mayank prefered over Pushti Metal"
-                        incumbent_retained_parts.append({
-                            "index": idx,
-                            "row": row,
-                            "incumbent": incumbent,
-                            "reason": reason
-                        })
-                        if min_supplier == 'Manek Metalcraft':
-                            MANEK_EXTRA_VOLUME += row.get('Annual Volume (per UOM)')
-                        elif min_supplier == 'Pushti Metal':
-                            PUSHTI_EXTRA_VOLUME += row.get('Annual Volume (per UOM)')
-                    else:
-                        try:
-                            savings_usd = float(savings_usd)
-                        except:
-                            savings_usd = 0
-                        if min_supplier == 'Manek Metalcraft':
-                            MANEK_EXTRA_VOLUME += row.get('Annual Volume (per UOM)')
-                            SPEND_ON_MANEK += fob_extended_cost
-
-                        candidate_new_supplier_parts.append({
-                            "index": idx,
-                            "row": row,
-                            "extended_cost": extended_cost,
-                            "savings_usd": savings_usd,
-                            "min_supplier": min_supplier,
-                            "incumbent": incumbent,
-                            "reason": "Incumbent bid, but not lowest; eligible for new supplier assignment"
-                        })
-                
-                else:
-                    try:
-                        savings_usd = float(savings_usd)
-                    except:
-                        savings_usd = 0
-                    
-                    if min_supplier == 'Manek Metalcraft':
-                        SPEND_ON_MANEK += fob_extended_cost
-                    candidate_new_supplier_parts.append({
-                        "index": idx,
-                        "row": row,
-                        "extended_cost": extended_cost,
-                        "savings_usd": savings_usd,
-                        "min_supplier": min_supplier,
-                        "incumbent": incumbent,
-                        "reason": "Incumbent bid, but not lowest; eligible for new supplier assignment"
-                    })
-            else:
-                try:
-                    savings_usd = float(savings_usd)
-                except:
-                    savings_usd = 0
-                candidate_new_supplier_parts.append({
-                    "index": idx,
-                    "row": row,
-                    "extended_cost": extended_cost,
-                    "savings_usd": savings_usd,
-                    "min_supplier": min_supplier,
-                    "incumbent": incumbent,
-                    "reason": "Incumbent bid, but not lowest; eligible for new supplier assignment"
-                })
-
-    else:
-        # Incumbent did not bid, but minimum bid exists (should already be handled above)
-        pass
-
-# --- Sort candidate new supplier parts by savings descending ---
-candidate_new_supplier_parts.sort(key=lambda x: x["savings_usd"], reverse=True)
-
-# --- Assign must-assign-min-bid parts first (these are forced, contribute to threshold) ---
 decision_rows = []
-new_supplier_spent = 0
-selected_new_rows = set()
-
-for part in must_assign_min_bid_parts:
-    # if new_supplier_spent + part["extended_cost"] <= THRESHOLD_COST:
-    #     decision_rows.append({
-    #         "index": part["index"],
-    #         "row": part["row"],
-    #         "new_supplier": part["min_supplier"],
-    #         "extended_cost": part["extended_cost"],
-    #         "incumbent": part["incumbent"],
-    #         "reason": part["reason"]
-    #     })
-    #     new_supplier_spent += part["extended_cost"]
-    #     selected_new_rows.add(part["index"])
-    # else:
-    #     # If threshold exceeded, assign to incumbent (if possible)
-    #     decision_rows.append({
-    #         "index": part["index"],
-    #         "row": part["row"],
-    #         "new_supplier": part["incumbent"],
-    #         "extended_cost": 0,
-    #         "incumbent": part["incumbent"],
-    #         "reason": "Threshold exceeded, retaining incumbent"
-    #     })
-    #     selected_new_rows.add(part["index"])
-    decision_rows.append({
-        "index": part["index"],
-        "row": part["row"],
-        "new_supplier": part["min_supplier"],
-        "extended_cost": part["extended_cost"],
-        "incumbent": part["incumbent"],
-        "reason": part["reason"]
-    })
-    new_supplier_spent += part["extended_cost"]
-    selected_new_rows.add(part["index"])
-
-# --- Assign candidate new supplier parts until threshold hit ---
-for part in candidate_new_supplier_parts:
-    if part["index"] in selected_new_rows:
-        continue
-    # if new_supplier_spent + part["extended_cost"] <= THRESHOLD_COST:
-    #     decision_rows.append({
-    #         "index": part["index"],
-    #         "row": part["row"],
-    #         "new_supplier": part["min_supplier"],
-    #         "extended_cost": part["extended_cost"],
-    #         "incumbent": part["incumbent"],
-    #         "reason": part["reason"] + f" (within {PERCENT_NEW*100}% threshold)"
-    #     })
-    #     new_supplier_spent += part["extended_cost"]
-    #     selected_new_rows.add(part["index"])
-    # else:
-    #     # Threshold exceeded, retain incumbent
-    #     decision_rows.append({
-    #         "index": part["index"],
-    #         "row": part["row"],
-    #         "new_supplier": part["incumbent"],
-    #         "extended_cost": 0,
-    #         "incumbent": part["incumbent"],
-    #         "reason": "Threshold exceeded, retaining incumbent"
-    #     })
-    #     selected_new_rows.add(part["index"])
 
+def decide(idx, new_supplier, extended_cost):
+    reason = reasons[idx]
+    if applied_rule[idx] >= 0 and new_supplier != "-":
+        reason = f"{supplier_rules.reason(applied_rule[idx])}: {reason}"
     decision_rows.append({
-        "index": part["index"],
-        "row": part["row"],
-        "new_supplier": part["min_supplier"],
-        "extended_cost": part["extended_cost"],
-        "incumbent": part["incumbent"],
-        "reason": part["reason"]
+        "index": idx,
+        "row": row_records[idx],
+        "new_supplier": new_supplier,
+        "extended_cost": extended_cost,
+        "incumbent": row_records[idx].get(incumbent_col),
+        "reason": reason
     })
-    new_supplier_spent += part["extended_cost"]
-    selected_new_rows.add(part["index"])
-
-# --- Assign all incumbent retained parts ---
-for part in incumbent_retained_parts:
-    if part["index"] in selected_new_rows:
-        continue
-    decision_rows.append({
-        "index": part["index"],
-        "row": part["row"],
-        "new_supplier": part["incumbent"],
-        "extended_cost": 0,
-        "incumbent": part["incumbent"],
-        "reason": part["reason"]
-    })
-    selected_new_rows.add(part["index"])
-
-# --- Assign all no valid supplier parts ---
-for part in no_valid_supplier_parts:
-    if part["index"] in selected_new_rows:
-        continue
-    decision_rows.append({
-        "index": part["index"],
-        "row": part["row"],
-        "new_supplier": "-",
-        "extended_cost": 0,
-        "incumbent": part["row"].get(incumbent_col),
-        "reason": part["reason"]
-    })
-    selected_new_rows.add(part["index"])
-
-
-# --- Step 4: Assign rest (fallback to incumbent or final bid supplier) ---
-for idx, row in df.iterrows():
-    if idx in selected_new_rows:
-        continue
-
-    incumbent = row.get(incumbent_col)
-    min_supplier = row.get("Final Minimum Bid Landed Supplier")
-    valid_supplier_count = row.get(valid_supplier_col, 0)
-
-    if valid_supplier_count == 0:
-        decision_rows.append({
-            "index": idx,
-            "row": row,
-            "new_supplier": "-",
-            "extended_cost": 0,
-            "incumbent": incumbent,
-            "reason": "No valid suppliers"
-        })
-    elif incumbent in suppliers:
-        incumbent_bid_val = row.get(f"{incumbent} - R2 - Total landed cost per UOM (USD)", 0)
-        if incumbent_bid_val == 0:
-            wapp_price = row.get('Volume-banded WAPP')
-            multiplier_info = get_supplier_info(row.get('ROW ID #'), incumbent)
-
-            incumbent_bid_val = wapp_price * multiplier_info['FreightMultiplier'] + wapp_price * (multiplier_info['tariff_value'] + multiplier_info['Metal Tariff'])
-
-        if incumbent_bid_val > 0 and incumbent_bid_val < row.get(f"{min_supplier} - R2 - Total landed cost per UOM (USD)", 0):
-            decision_rows.append({
-                "index": idx,
-                "row": row,
-                "new_supplier": incumbent,
-                "extended_cost": 0,
-                "incumbent": incumbent,
-                "reason": f"Incumbent did not bid, but its WAPP landed is lower than Lowest Bid."
-            })
-        else:
-            decision_rows.append({
-                "index": idx,
-                "row": row,
-                "new_supplier": min_supplier,
-                "extended_cost": 0,
-                "incumbent": incumbent,
-                "reason": f"Forced to Lowest Bidder"
-            })
-    elif pd.notna(min_supplier):
-        decision_rows.append({
-            "index": idx,
-            "row": row,
-            "new_supplier": min_supplier,
-            "extended_cost": 0,
-            "incumbent": incumbent,
-            "reason": "Incumbent did not bid, using Final Minimum Bid Landed Supplier"
-        })
-    else:
-        decision_rows.append({
-            "index": idx,
-            "row": row,
-            "new_supplier": "-",
-            "extended_cost": 0,
-            "incumbent": incumbent,
-            "reason": "No valid bids"
-        })
 
+# --- Admission (scenario_engine.admission) of the moves chosen above ---
+# A capped supplier's keep_incumbents stay on their parts. The other moves to capped suppliers are admitted by
+# savings per unit of capacity, whatever their sheet order, forced moves first; with ENFORCE_PERCENT_NEW the
+# candidate moves are then admitted in order of savings within THRESHOLD_COST. Moves refused keep the incumbent.
+steps = admission(bids, choice, extended_costs, forced, share_limit(scenario), SUPPLIER_CAPS)
+award = steps["award"]
+award_suppliers = np.where(no_valid, "-", bids.names(award))
+admitted_moves = (award != NO_AWARD) & (award != bids.incumbent)
+
+# --- Must-assign parts first, then candidate new supplier parts, incumbent retained, no valid supplier and
+# the fallback parts ---
+for idx in np.concatenate([category_rows(MUST_ASSIGN), candidate_rows, category_rows(RETAINED),
+                           category_rows(NO_VALID), category_rows(UNCLASSIFIED)]):
+    decide(idx, award_suppliers[idx], extended_costs[idx] if admitted_moves[idx] else 0)
+new_supplier_spent = extended_costs[admitted_moves].sum()
+
+decided = np.array([decision["index"] for decision in decision_rows], dtype=np.intp)
+decision_position = np.empty(len(df), dtype=np.intp)
+decision_position[decided] = np.arange(len(decided))
+
+def keep_incumbent_decision(idx, reason):
+    decision_rows[decision_position[idx]]["reason"] = reason
+
+for idx in steps["kept"]:
+    keep_incumbent_decision(idx, f"Incumbent Supplier {incumbents.iat[idx]} prefered over {choice_suppliers[idx]}")
+for idx in steps["over_cap"]:
+    keep_incumbent_decision(idx, f"Incumbent retained, {choice_suppliers[idx]} capacity cap reached")
+for idx in steps["over_share"]:
+    keep_incumbent_decision(idx, "Incumbent retained, new supplier share threshold reached")
+print(f"Capacity caps: {len(steps['capped']) - len(steps['over_cap'])} of {len(steps['capped'])} moves to capped "
+      f"suppliers admitted, {len(steps['kept'])} parts kept with their incumbent")
+if ENFORCE_PERCENT_NEW:
+    print(f"New supplier share: {len(steps['candidates']) - len(steps['over_share'])} of {len(steps['candidates'])} "
+          f"candidate moves admitted within {PERCENT_NEW:.0%} of the total landed cost")
+
+timer.mark("threshold assignment")
+
+# --- Sweep mode: the award at each new-supplier share threshold (scenario_engine.sweep_scenario), each one
+# held within its threshold and followed by the tail pass ---
+if SWEEP_PERCENT_NEW is not None:
+    from share_sweep import awards_frame
+
+    swept = sweep_scenario(bids, scenario)
+    frontier = pd.DataFrame([
+        {"New share threshold": result["percent_new"], **result["summary"],
+         "New supplier share": result["summary"]["New supplier spend USD"] / TOTAL_COST}
+        for result in swept
+    ])
+    print(frontier.to_string(index=False))
+    print("(each threshold is enforced; the single run holds percent_new only with enforce_percent_new)")
+    frontier.to_csv(sweep_frontier_file, index=False)
+    awards_frame(bids, {result["percent_new"]: result["award"] for result in swept}).to_csv(sweep_awards_file, index=False)
+    print(f"\n✅ Swept {len(SWEEP_PERCENT_NEW)} thresholds in {time.time() - start_time:.2f} seconds. "
+          f"Frontier written to '{sweep_frontier_file}', award vectors to '{sweep_awards_file}'")
+    sys.exit(0)
+
+# --- Optimizer mode: award with the MILP instead, and compare it with the greedy award ---
+if AWARD_MODE == "milp":
+    from award_optimizer import optimize_awards
+
+    milp_unit_costs = bids.unit_costs()
+    optimized = optimize_awards(bids, percent_new=PERCENT_NEW, caps=SUPPLIER_CAPS,
+                                allowed=supplier_rules.allowed & kept_mask(incumbents, bids.suppliers, SUPPLIER_CAPS))
+    milp_award = optimized["award"]
+    greedy_award = award
+
+    print(f"\nOptimizer solved in {optimized['seconds']:.1f}s "
+          f"(gap to lower bound ${optimized['gap']:,.2f}, {optimized['exact_parts']} parts solved exactly)")
+    for name, excess in optimized["violations"].items():
+        print(f"  Constraint '{name}' could not be met, exceeded by {excess:,.2f}")
+    print(f"{'':32}{'greedy':>20}{'milp':>20}")
+    for label, measure in [
+        ("Landed savings USD", lambda award: f"${bids.landed_savings(award, milp_unit_costs):,.2f}"),
+        ("New supplier share", lambda award: f"{bids.new_supplier_spend(award, milp_unit_costs) / TOTAL_COST:.2%}"),
+        ("Parts switched", lambda award: f"{((award != NO_AWARD) & (award != bids.incumbent)).sum()}"),
+    ]:
+        print(f"{label:32}{measure(greedy_award):>20}{measure(milp_award):>20}")
+    print(f"(new supplier share limit {PERCENT_NEW:.0%}; "
+          f"{'enforced' if ENFORCE_PERCENT_NEW else 'not enforced'} in the greedy award)\n")
+
+    milp_costs = np.nan_to_num(bids.award_costs(milp_award, milp_unit_costs))
+    retained = (milp_award != NO_AWARD) & (milp_award == bids.incumbent)
+    switched = (milp_award != NO_AWARD) & ~retained
+    reasons[retained] = "Optimizer: incumbent retained"
+    reasons[switched] = "Optimizer: awarded to lowest-cost supplier within share and caps"
+    reasons[milp_award == NO_AWARD] = "No valid suppliers"
+
+    decision_rows = []
+    switched_rows = np.flatnonzero(switched)
+    switched_rows = switched_rows[np.argsort(-(bids.baseline_cost - milp_costs)[switched_rows], kind="stable")]
+    for idx in switched_rows:
+        decide(idx, bids.suppliers[milp_award[idx]], milp_costs[idx])
+    for idx in np.flatnonzero(retained):
+        decide(idx, bids.suppliers[milp_award[idx]], 0)
+    for idx in np.flatnonzero(milp_award == NO_AWARD):
+        decide(idx, "-", 0)
+    new_supplier_spent = milp_costs[switched].sum()
+    timer.mark("optimizer")
 
 output_data = []
-total_fob_savings_usd = 0
-total_landed_savings_usd = 0
 total_annual_revenue_discount = 0
-incumbent_retained = 0
-new_supplier_count = 0
-unique_suppliers = set()
-total_landed_cost_incumbent = 0
-total_landed_cost_new_suppliers = 0
-total_landed_cost_completely_new_suppliers = 0
-total_incumbent_volume = 0
-total_net_new_supplier_volume = 0
-total_new_supplier_volume = 0
-
-net_new_supplier_count = 0  
-parts_where_no_bids = 0
 def calculate_wapp_landed_savings(row, p_u):
     incumbent = row.get(incumbent_col)
     if incumbent == '-':
@@ -574,34 +419,15 @@ for decision in tqdm(decision_rows, total=len(decision_rows), desc="Finalizing")
     incumbent = decision["incumbent"]
 
     # Get savings columns
-    pct_col = f"{selected_supplier} - Final % savings vs baseline"
-    usd_col = f"{selected_supplier} - Final USD savings vs baseline"
-    landed_pct_col = f"{selected_supplier} - Final Landed % savings vs baseline"
-    landed_usd_col = f"{selected_supplier} - Final Landed USD savings vs baseline"
-
-    # Reference supplier metadata
-    ref_row = output_reference_df[output_reference_df['Reference'] == selected_supplier]
-    def get_ref_value(col):
-        return ref_row[col].values[0] if not ref_row.empty else "-"
-    
-    try:
-        fob_savings_usd = float(row.get(usd_col)) if pd.notna(row.get(usd_col)) else 0
-    except (ValueError, TypeError):
-        fob_savings_usd = 0
-    
-    total_fob_savings_usd += fob_savings_usd 
-        
-    try:
-        lcs = float(row.get(landed_usd_col)) if pd.notna(landed_usd_col) else 0
-    except (ValueError, TypeError): 
-        lcs = 0
-
-    total_landed_savings_usd  += lcs
-    if row.get("ROW ID #") == 66:
-        stop = True
-        
-    landed_cost_key = f"{selected_supplier} - R2 - Total landed cost per UOM (USD)"
-    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
+    selected_columns = supplier_columns.get(selected_supplier, NO_COLUMNS)
+    incumbent_columns = supplier_columns.get(incumbent, NO_COLUMNS)
+    pct_col = selected_columns["pct"]
+    usd_col = selected_columns["usd"]
+    landed_pct_col = selected_columns["landed_pct"]
+    landed_usd_col = selected_columns["landed_usd"]
+
+    landed_cost_key = selected_columns["landed"]
+    incumbent_key = incumbent_columns["landed"]
 
     if selected_supplier == '-': selected_supplier = incumbent
 
@@ -627,7 +453,7 @@ for decision in tqdm(decision_rows, total=len(decision_rows), desc="Finalizing")
             "Incumbent Supplier": incumbent,
             "Selected Supplier": incumbent,
             "Annual Volume (per UOM)": row.get("Annual Volume (per UOM)"),
-            "Final quote per each FOB Port of Departure (USD)": row.get(f"{incumbent} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)", row.get('Volume-banded WAPP')),
+            "Final quote per each FOB Port of Departure (USD)": row.get(incumbent_columns["fob"], row.get('Volume-banded WAPP')),
             "FOB Savings %": "-",
             "FOB Savings USD": "-",
             "Landed Cost Savings %": row[landed_pct_col] if (landed_pct_col in row and row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(row, 'pct'),
@@ -658,7 +484,7 @@ for decision in tqdm(decision_rows, total=len(decision_rows), desc="Finalizing")
         "Incumbent Supplier": row.get("Normalized incumbent supplier"),
         "Selected Supplier": selected_supplier,
         "Annual Volume (per UOM)": row.get('Annual Volume (per UOM)'),
-        "Final quote per each FOB Port of Departure (USD)": row.get(f"{selected_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)", 0) if selected_supplier!=incumbent else row.get(f"{incumbent} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)", row.get('Volume-banded WAPP')),
+        "Final quote per each FOB Port of Departure (USD)": row.get(supplier_columns.get(selected_supplier, NO_COLUMNS)["fob"], 0) if selected_supplier!=incumbent else row.get(incumbent_columns["fob"], row.get('Volume-banded WAPP')),
         "FOB Savings %": row.get(pct_col, 0),
         "FOB Savings USD": row.get(usd_col, 0),
         "Landed Cost Savings %": row[landed_pct_col] if (landed_pct_col in row and row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(row, 'pct'),
@@ -676,682 +502,84 @@ for decision in tqdm(decision_rows, total=len(decision_rows), desc="Finalizing")
     if result_extended_cost == 0:
         stop=True
     output_data.append(output_row)
-
-# --- BINZHOU ZELI1 REMOVAL LOGIC (BEFORE RATIONALIZATION) ---
-print("\nApplying Binzhou Zeli removal logic for specific parts...")
-
-binzhou_zeli_supplier = "Binzhou Zeli"
-binzhou_reassignments = 0
-binzhou_zeli_exclusion_parts = [
-    "CGBSL-200-A1","CGDSL-200-A1","CGCSL-200CR-A1","CDCSL-200-A1", "CDCSL-300-A1","CGBSL-300-A1","CGDSL-300-A1","CGCSL-300CR-A1", "CGBSL-400-A1","CGDSL-400-A1","CDCSL-400-A1","CDCSL-200-SS1", "CGCSL-400CR-A1","CGBSL-200-SS1","CGCSL-200CR-SS1","CGDSL-200-SS1", "CDCSL-600-A1","CDCSL-300-SS1","CGDSL-600-A1","CGBSL-300-SS1", "CGCSL-600CR-A1","CGDSL-300-SS1","CGCSL-300CR-SS1","CDCSL-400-SS1", "CGBSL-400-SS1","CGDSL-400-SS1","CGCSL-400CR-SS1","CDCSL-600-SS1", "CGBSL-600-SS1","CGDSL-600-SS1","CGCSL-600CR-SS1"
-]
-
-print(f"Binzhou Zeli exclusion applies to {len(binzhou_zeli_exclusion_parts)} specific part numbers")
-def find_best_alternative_to_binzhou(row, all_suppliers):
-    """Find the best alternative supplier excluding Binzhou Zeli"""
-
-    return 'Luxecasting', "Defaulted to Luxecasting"
-
-    # incumbent = row.get("Incumbent Supplier", "")
-    # valid_supplier_count = row.get("Valid Supplier", 0)
-    
-    # # If only one valid supplier and it's Binzhou Zeli, we have no choice
-    #     # Check if Binzhou Zeli is the only bidder
-    # binzhou_landed_cost = row.get(f"{binzhou_zeli_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-
-    # # Count other valid bidders
-    # other_valid_bidders = 0
-    # for supplier in all_suppliers:
-    #     if supplier != binzhou_zeli_supplier:
-    #         landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-    #         if pd.notna(landed_cost) and landed_cost > 0:
-    #             other_valid_bidders += 1
-        
-    #     if other_valid_bidders == 0:
-    #         return binzhou_zeli_supplier, "Only valid supplier available"
-    
-    # # # First preference: incumbent (if not Binzhou Zeli and has valid bid)
-    # # if incumbent != binzhou_zeli_supplier and incumbent in all_suppliers:
-    # #     incumbent_landed_cost = row.get(f"{incumbent} - R2 - Total landed cost per UOM (USD)", 0)
-    # #     if pd.notna(incumbent_landed_cost) and incumbent_landed_cost > 0:
-    # #         return incumbent, "Reassigned to incumbent (avoiding Binzhou Zeli)"
-    
-    # # Second preference: find lowest bidder excluding Binzhou Zeli
-    # best_supplier = None
-    # best_cost = float('inf')
-    
-    # for supplier in all_suppliers:
-    #     if supplier == binzhou_zeli_supplier:
-    #         continue
-            
-    #     landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-    #     if pd.notna(landed_cost) and landed_cost > 0 and landed_cost < best_cost:
-    #         best_cost = landed_cost
-    #         best_supplier = supplier
-    
-    # if best_supplier:
-    #     return best_supplier, f"Reassigned to lowest bidder excluding Binzhou Zeli (${best_cost:.2f})"
-    
-    # # Fallback: if no other valid bidders, keep Binzhou Zeli
-    # return binzhou_zeli_supplier, "No alternative suppliers available"
-
-# Get all R2 landed cost columns for finding alternatives
-r2_landed_cols = [col for col in df.columns if col.endswith("R2 - Total landed cost per UOM (USD)")]
-all_suppliers = [col.split(" - R2")[0] for col in r2_landed_cols]
-all_suppliers = ['Luxecasting']
-
-# Create a lookup dictionary for faster DataFrame access (highly optimized)
-print("Creating DataFrame lookup for performance optimization...")
-df_lookup = {}
-for idx, row in df.iterrows():
-    row_id = row.get("ROW ID #")
-    if row_id is not None:
-        df_lookup[row_id] = row
-print(f"DataFrame lookup created with {len(df_lookup)} entries")
-
-# Apply Binzhou Zeli removal logic to output_data (only for specific parts)
-for i, row in enumerate(output_data):
-    current_supplier = row["Selected Supplier"]
-    part_number = row.get("Part #", "")
-    
-    # Only apply Binzhou Zeli removal logic to specific part numbers
-    if current_supplier == binzhou_zeli_supplier and part_number in binzhou_zeli_exclusion_parts:
-        # Find corresponding row in original dataframe using lookup
-        row_id = row.get("ROW ID #")
-        df_row = df_lookup.get(row_id)
-        
-        if df_row is not None:
-            new_supplier, reason = find_best_alternative_to_binzhou(df_row, all_suppliers)
-            print(calculate_wapp_landed_savings(df_row, 'pct'))
-            if new_supplier != current_supplier:
-                # Update the supplier assignment
-                output_data[i]["Selected Supplier"] = new_supplier
-                output_data[i]["Reason"] = f"Binzhou Zeli avoided: {reason}"
-                
-                # Update other relevant fields
-                if new_supplier != "-":
-                    # Update savings columns
-                    pct_col = f"{new_supplier} - Final % savings vs baseline"
-                    usd_col = f"{new_supplier} - Final USD savings vs baseline"
-                    landed_pct_col = f"{new_supplier} - Final Landed % savings vs baseline"
-                    landed_usd_col = f"{new_supplier} - Final Landed USD savings vs baseline"
-                    fob_col = f"{new_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)"
-                    
-                    
-                    output_data[i]["Final quote per each FOB Port of Departure (USD)"] = df_row.get(fob_col, df_row.get('Volume-banded WAPP'))
-                    output_data[i]["FOB Savings %"] = df_row.get(pct_col, "-")
-                    output_data[i]["FOB Savings USD"] = df_row.get(usd_col, "-")
-                    output_data[i]["Landed Cost Savings %"] = df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct')
-                    output_data[i]["Landed Cost Savings USD"] = df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd')
-                    
-                    # Update landed extended cost
-                    volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-                    if pd.isna(volume):
-                        volume = 0
-                    
-                    landed_cost_key = f"{new_supplier} - R2 - Total landed cost per UOM (USD)"
-                    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
-
-                    if new_supplier != incumbent:
-                        landed_cost = df_row.get(landed_cost_key)
-                        if not landed_cost:  # catches 0, None, '', False
-                            landed_cost = 0
-                    else:
-                        landed_cost = df_row.get(incumbent_key)
-                        if not landed_cost:
-                            landed_cost = calculate_wapp_landed_savings(df_row, 'new_landed_cost')
-                    result_extended_cost = landed_cost * df_row.get(volume_col, 0)
-
-                    output_data[i]["Landed Extended Cost USD"] = result_extended_cost
-                    
-                    # Update supplier classification
-                    incumbent = df_row.get("Normalized incumbent supplier")
-                    output_data[i]["Is Totally New Supplier"] = "Yes" if new_supplier not in incumbent_suppliers else "No"
-                    output_data[i]["Part Switched"] = "Yes" if new_supplier != incumbent else "No"
-                    
-                    # Update reference data
-                    ref_row = output_reference_df[output_reference_df['Reference'] == new_supplier]
-                    def get_ref_value(col):
-                        return ref_row[col].values[0] if not ref_row.empty else "-"
-                
-                binzhou_reassignments += 1
-
-print(f"Binzhou Zeli removal complete: {binzhou_reassignments} parts reassigned")
-
-### West Legend-MTD re-allocation logic starts here
-# --- West Legend-MTD REMOVAL LOGIC (BEFORE RATIONALIZATION) ---
-print("\nApplying West Legend-MTD removal logic for specific parts...")
-
-west_legend_mtd_supplier = "West Legend-MTD"
-west_legend_mtd_reassignments = 0
-west_legend_mtd_exclusion_rows = [
-    row['ROW ID #'] for row in df.itertuples() if getattr(row, "Selected Supplier", "") == west_legend_mtd_supplier
-]
-
-def find_best_alternative_to_west_legend_mtd(row, all_suppliers):
-    """Find the best alternative supplier excluding West Legend-MTD"""
-    incumbent = row.get("Incumbent Supplier", "")
-    valid_supplier_count = row.get("Valid Supplier", 0)
-    
-    # If only one valid supplier and it's West Legend-MTD, we have no choice
-    if valid_supplier_count != 1:
-        # Check if West Legend-MTD is the only bidder
-        west_legend_mtd_landed_cost = row.get(f"{west_legend_mtd_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        
-        other_valid_bidders = 0
-        for supplier in all_suppliers:
-            if supplier != west_legend_mtd_supplier:
-                landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-                if pd.notna(landed_cost) and landed_cost > 0:
-                    other_valid_bidders += 1
-        
-        if other_valid_bidders == 0:
-            return west_legend_mtd_supplier, "Only valid supplier available"
-        
-    # find lowest bidder excluding West Legend-MTD
-    best_supplier = None
-    best_cost = float('inf')
-    
-    for supplier in all_suppliers:
-        if supplier == west_legend_mtd_supplier:
-            continue
-            
-        landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        if pd.notna(landed_cost) and landed_cost > 0 and landed_cost < best_cost:
-            best_cost = landed_cost
-            best_supplier = supplier
-    
-    if best_supplier:
-        return best_supplier, f"Reassigned to lowest bidder excluding West Legend-MTD (${best_cost:.2f})"
-    
-    # Fallback: if no other valid bidders, keep West Legend-MTD
-
-    return west_legend_mtd_supplier, "No alternative suppliers available"
-
-
-# Get all R2 landed cost columns for finding alternatives
-r2_landed_cols = [col for col in df.columns if col.endswith("R2 - Total landed cost per UOM (USD)")]
-all_suppliers = [col.split(" - R2")[0] for col in r2_landed_cols]
-
-# Create a lookup dictionary for faster DataFrame access (highly optimized)
-print("Creating DataFrame lookup for performance optimization...")
-df_lookup = {}
-for idx, row in df.iterrows():
-    row_id = row.get("ROW ID #")
-    if row_id is not None:
-        df_lookup[row_id] = row
-print(f"DataFrame lookup created with {len(df_lookup)} entries")
-
-# Apply  West Legend-MTD removal logic to output_data (only for specific parts)
-for i, row in enumerate(output_data):
-    current_supplier = row["Selected Supplier"]
-    row_id = row.get("ROW ID #", "")
-    
-    # Only apply West Legend-MTD removal logic to specific part numbers
-    if current_supplier == west_legend_mtd_supplier:
-        # Find corresponding row in original dataframe using lookup
-        row_id = row.get("ROW ID #")
-        df_row = df_lookup.get(row_id)
-        
-        if df_row is not None:
-            new_supplier, reason = find_best_alternative_to_west_legend_mtd(df_row, all_suppliers)
-            
-            if new_supplier != current_supplier:
-                # Update the supplier assignment
-                output_data[i]["Selected Supplier"] = new_supplier
-                output_data[i]["Reason"] = f"West Legend-MTD avoided: {reason}"
-                
-                # Update other relevant fields
-                if new_supplier != "-":
-                    # Update savings columns
-                    pct_col = f"{new_supplier} - Final % savings vs baseline"
-                    usd_col = f"{new_supplier} - Final USD savings vs baseline"
-                    landed_pct_col = f"{new_supplier} - Final Landed % savings vs baseline"
-                    landed_usd_col = f"{new_supplier} - Final Landed USD savings vs baseline"
-                    fob_col = f"{new_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)"
-                    
-                    
-                    output_data[i]["Final quote per each FOB Port of Departure (USD)"] = df_row.get(fob_col, df_row.get('Volume-banded WAPP'))
-                    output_data[i]["FOB Savings %"] = df_row.get(pct_col, "-")
-                    output_data[i]["FOB Savings USD"] = df_row.get(usd_col, "-")
-                    output_data[i]["Landed Cost Savings %"] = df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct')
-                    output_data[i]["Landed Cost Savings USD"] = df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd')
-                    
-                    # Update landed extended cost
-                    volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-                    if pd.isna(volume):
-                        volume = 0
-                    
-                    landed_cost_key = f"{new_supplier} - R2 - Total landed cost per UOM (USD)"
-                    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
-
-                    if new_supplier != incumbent:
-                        landed_cost = df_row.get(landed_cost_key)
-                        if not landed_cost:  # catches 0, None, '', False
-                            landed_cost = 0
-                    else:
-                        landed_cost = df_row.get(incumbent_key)
-                        if not landed_cost:
-                            landed_cost = calculate_wapp_landed_savings(df_row, 'new_landed_cost')
-                    result_extended_cost = landed_cost * df_row.get(volume_col, 0)
-
-                    output_data[i]["Landed Extended Cost USD"] = result_extended_cost
-                    
-                    # Update supplier classification
-                    incumbent = df_row.get("Normalized incumbent supplier")
-                    output_data[i]["Is Totally New Supplier"] = "Yes" if new_supplier not in incumbent_suppliers else "No"
-                    output_data[i]["Part Switched"] = "Yes" if new_supplier != incumbent else "No"
-                    
-                    # Update reference data
-                    ref_row = output_reference_df[output_reference_df['Reference'] == new_supplier]
-                    def get_ref_value(col):
-                        return ref_row[col].values[0] if not ref_row.empty else "-"
-                
-                west_legend_mtd_reassignments += 1
-
-print(f"West Legend-MTD removal complete: {west_legend_mtd_reassignments} parts reassigned")
-
-
-# --------- Removing Manek for red brass
-manek_supplier= "Manek Metalcraft"
-manek_reassignments = 0
-def find_best_alternative_to_manek(row, all_suppliers):
-    """Find the best alternative supplier excluding Manek Metalcraft"""
-    incumbent = row.get("Incumbent Supplier", "")
-    valid_supplier_count = row.get("Valid Supplier", 0)
-    
-    # If only one valid supplier and it's West Legend-MTD, we have no choice
-    if valid_supplier_count != 1:
-        # Check if Manek Metalcraft is the only bidder
-        manek_landed_cost = row.get(f"{manek_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-
-        other_valid_bidders = 0
-        for supplier in all_suppliers:
-            if supplier != manek_supplier:
-                landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-                if pd.notna(landed_cost) and landed_cost > 0:
-                    other_valid_bidders += 1
-        
-        if other_valid_bidders == 0:
-            return manek_supplier, "Only valid supplier available"
-        
-    # find lowest bidder excluding West Legend-MTD
-    best_supplier = None
-    best_cost = float('inf')
-    
-    for supplier in all_suppliers:
-        if supplier == manek_supplier:
-            continue
-            
-        landed_cost = row.get(f"{supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        if pd.notna(landed_cost) and landed_cost > 0 and landed_cost < best_cost:
-            best_cost = landed_cost
-            best_supplier = supplier
-    
-    if best_supplier:
-        return best_supplier, f"Reassigned to lowest bidder excluding Manek Metalcraft (${best_cost:.2f})"
-
-    # Fallback: if no other valid bidders, keep Manek Metalcraft
-
-    return manek_supplier, "No alternative suppliers available"
-
-
-# Get all R2 landed cost columns for finding alternatives
-r2_landed_cols = [col for col in df.columns if col.endswith("R2 - Total landed cost per UOM (USD)")]
-all_suppliers = [col.split(" - R2")[0] for col in r2_landed_cols]
-
-# Create a lookup dictionary for faster DataFrame access (highly optimized)
-print("Creating DataFrame lookup for performance optimization...")
-df_lookup = {}
-for idx, row in df.iterrows():
-    row_id = row.get("ROW ID #")
-    if row_id is not None:
-        df_lookup[row_id] = row
-print(f"DataFrame lookup created with {len(df_lookup)} entries")
-
-# Apply  Manek Metalcraft removal logic to output_data (only for specific parts)
-for i, row in enumerate(output_data):
-    current_supplier = row["Selected Supplier"]
-    row_id = row.get("ROW ID #", "")
-    
-    if not str(row_id) in PARTS_NOT_TO_ASSIGN_TO_MANEK:
-        continue
-    
-    # Only apply Manek Metalcraft removal logic to specific part numbers
-    if current_supplier == manek_supplier:
-        # Find corresponding row in original dataframe using lookup
-        row_id = row.get("ROW ID #")
-        df_row = df_lookup.get(row_id)
-        
-        if df_row is not None:
-            new_supplier, reason = find_best_alternative_to_manek(df_row, all_suppliers)
-            
-            if new_supplier != current_supplier:
-                # Update the supplier assignment
-                output_data[i]["Selected Supplier"] = new_supplier
-                output_data[i]["Reason"] = f"Manek Metalcraft avoided for red_brass: {reason}"
-                
-                # Update other relevant fields
-                if new_supplier != "-":
-                    # Update savings columns
-                    pct_col = f"{new_supplier} - Final % savings vs baseline"
-                    usd_col = f"{new_supplier} - Final USD savings vs baseline"
-                    landed_pct_col = f"{new_supplier} - Final Landed % savings vs baseline"
-                    landed_usd_col = f"{new_supplier} - Final Landed USD savings vs baseline"
-                    fob_col = f"{new_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)"
-                    
-                    
-                    output_data[i]["Final quote per each FOB Port of Departure (USD)"] = df_row.get(fob_col, df_row.get('Volume-banded WAPP'))
-                    output_data[i]["FOB Savings %"] = df_row.get(pct_col, "-")
-                    output_data[i]["FOB Savings USD"] = df_row.get(usd_col, "-")
-                    output_data[i]["Landed Cost Savings %"] = df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct')
-                    output_data[i]["Landed Cost Savings USD"] = df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd')
-                    
-                    # Update landed extended cost
-                    volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-                    if pd.isna(volume):
-                        volume = 0
-                    
-                    landed_cost_key = f"{new_supplier} - R2 - Total landed cost per UOM (USD)"
-                    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
-
-                    if new_supplier != incumbent:
-                        landed_cost = df_row.get(landed_cost_key)
-                        if not landed_cost:  # catches 0, None, '', False
-                            landed_cost = 0
-                    else:
-                        landed_cost = df_row.get(incumbent_key)
-                        if not landed_cost:
-                            landed_cost = calculate_wapp_landed_savings(df_row, 'new_landed_cost')
-                    result_extended_cost = landed_cost * df_row.get(volume_col, 0)
-
-                    output_data[i]["Landed Extended Cost USD"] = result_extended_cost
-                    
-                    # Update supplier classification
-                    incumbent = df_row.get("Normalized incumbent supplier")
-                    output_data[i]["Is Totally New Supplier"] = "Yes" if new_supplier not in incumbent_suppliers else "No"
-                    output_data[i]["Part Switched"] = "Yes" if new_supplier != incumbent else "No"
-                    
-                    # Update reference data
-                    ref_row = output_reference_df[output_reference_df['Reference'] == new_supplier]
-                    def get_ref_value(col):
-                        return ref_row[col].values[0] if not ref_row.empty else "-"
-                
-                manek_reassignments += 1
-
-print(f"Manek Metalcraft removal complete: {manek_reassignments} parts reassigned")
-
-
-# LOGIC TO Change suppliers for selected suppliers that do not supply anymore.
-
-
-def find_next_best_supplier(row, current_supplier, all_suppliers):
-    """Find the next best bidder among large suppliers for a given part"""
-
-    incumbent = row.get("Normalized incumbent supplier", "")
-    valid_supplier = row.get('Valid Supplier')
-    if valid_supplier == 1:
-        if incumbent == current_supplier:
-            return current_supplier, "Has to stay with it."
-        else:
-            return incumbent, 'Forced to incumbent because no other bid on it.'
-    else:
-
-        part_bids = []
-       
-        # Get all bids for this part and sort by landed cost
-        for supplier in all_suppliers:
-            if supplier == current_supplier:
-                continue  # Skip current supplier
-                
-            landed_cost_col = f"{supplier} - R2 - Total landed cost per UOM (USD)"
-            landed_cost = row.get(landed_cost_col, 0)
-            
-            if pd.notna(landed_cost) and landed_cost > 0:
-                part_bids.append((supplier, landed_cost))
-        
-        # Sort by landed cost (ascending - lowest cost first)
-        part_bids.sort(key=lambda x: x[1])
-        
-        # Find first large supplier in sorted list
-        for supplier, cost in part_bids:
-            return supplier, f"Lowest bidder other than {current_supplier}"
-
-        print('Nahi hua bhai return')       
-    
-for i, row in enumerate(output_data):
-    row_id = row.get("ROW ID #", "")
-    current_supplier = row["Selected Supplier"]
-    if (str(row_id) in ["11", "15", "276", "277", "4703", "4704", "4937", "9619", "9709", "11151" ] and current_supplier in ['Oston Industrial']) or ( current_supplier in ['ZHEJIANG WANDEKAI'] and str(row_id) in ["1578","1793","1794","1896","1899","3005","4377","4381","4382","4383","4406","4407","4408","4413","4414","4415","4416","4417","4421","4423","4425","4454","4455","4456","4458","4744","4749","4754","4787","4797","4800","4809","4810","4821","5853","5854","7904","8411","8412","8413","8432","8433","8434","8435","8521","8522","8539","8540","8541","9448","9695","13160","13161","13162",] ) or (current_supplier in ['Coda'] and str(row_id) in ["1163", "1164", "1165", "1166", "1167", "1173", "1176", "1177", "1178", "1179", "1180", "1181", "1182", "1183", "1184", "1185", "1186", "1187", "1188", "1190", "1213", "1277", "1288", "1289", "1290", "1305", "1306", "1308", "1309", "1310", "1311", "1312", "1318", "1319", "1320", "1321", "1322", "1323", "1327", "1328", "1333", "1335", "1341", "1342", "1346", "1347", "1348", "1352", "1358", "1359", "1360", "1361", "1362", "1364", "1365", "1366", "1367", "1368", "1369", "1370", "1372", "1374", "1379", "1386", "1387", "1388", "1389", "1390", "1393", "1394", "1395", "1396", "1397", "1398", "1399", "1400", "1405", "1406", "1407", "1408", "1409", "1410", "1411", "1412", "1413", "1414", "1415", "1416", "1417", "1418", "1425", "1429", "1430", "1439", "1441", "1445", "1446", "1448", "1489", "1490", "1498", "1499", "1510", "1511", "1516", "1520", "6813", "6815", "6825", "6838", "6839", "6844", "6851", "6852", "6864", "6866", "6890", "6893", "6909", "6910", "6911", "6912", "6917", "6918", "6919", "6927", "6928", "6929", "6930", "6932", "6933", "6934", "6939", "7060", "7071", "7072", "7073", "7076", "7089", "7090", "7102", "7111", "7117", "7119", "7125", "7126", "7136", "7145", "7185", "7186", "7187", "7188", "7189", "7197", "7207", "7209", "7210", "7211", "7212", "7213", "7214", "7215", "7254", "7256", "7300", "7301", "7306", "7331", "7332", "7826", "7919", "8742", "8772", "8915", "9994", "13613"]): 
-        if current_supplier not in ['Coda', 'ZHEJIANG WANDEKAI', 'Oston Industrial']:
-            continue  # Only reassign if current supplier is in the list
-        # Find corresponding row in original dataframe
-        row_id = row.get("ROW ID #")
-        df_row = df[df["ROW ID #"] == row_id].iloc[0] if not df[df["ROW ID #"] == row_id].empty else None
-        
-        if df_row is not None and df_row['Valid Supplier'] >= 1:
-
-            new_supplier, reason = find_next_best_supplier(df_row, current_supplier, all_suppliers)
-            
-            if new_supplier != current_supplier:
-                # Update the supplier assignment
-                old_supplier = current_supplier
-                output_data[i]["Selected Supplier"] = new_supplier
-                output_data[i]["Reason"] = f"{old_supplier} no longer supplies: {reason}"
-                
-                # Update other relevant fields
-                if new_supplier != "-":
-                    # Update savings columns
-                    pct_col = f"{new_supplier} - Final % savings vs baseline"
-                    usd_col = f"{new_supplier} - Final USD savings vs baseline"
-                    landed_pct_col = f"{new_supplier} - Final Landed % savings vs baseline"
-                    landed_usd_col = f"{new_supplier} - Final Landed USD savings vs baseline"
-                    fob_col = f"{new_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)"
-                    
-                    
-                    output_data[i]["Final quote per each FOB Port of Departure (USD)"] = df_row.get(fob_col, df_row.get('Volume-banded WAPP'))
-                    output_data[i]["FOB Savings %"] = df_row.get(pct_col, "-")
-                    output_data[i]["FOB Savings USD"] = df_row.get(usd_col, "-")
-                    output_data[i]["Landed Cost Savings %"] = df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct')
-                    output_data[i]["Landed Cost Savings USD"] = df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd')
-                    
-                    # Update landed extended cost
-                    volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-                    if pd.isna(volume):
-                        volume = 0
-                    
-                    landed_cost_key = f"{new_supplier} - R2 - Total landed cost per UOM (USD)"
-                    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
-
-                    if new_supplier != incumbent:
-                        landed_cost = df_row.get(landed_cost_key)
-                        if not landed_cost:  # catches 0, None, '', False
-                            landed_cost = 0
-                    else:
-                        landed_cost = df_row.get(incumbent_key)
-                        if not landed_cost:
-                            landed_cost = calculate_wapp_landed_savings(df_row, 'new_landed_cost')
-                    result_extended_cost = landed_cost * df_row.get(volume_col, 0)
-
-                    output_data[i]["Landed Extended Cost USD"] = result_extended_cost
-                    
-                    # Update supplier classification
-                    incumbent = df_row.get("Normalized incumbent supplier")
-                    output_data[i]["Is Totally New Supplier"] = "Yes" if new_supplier not in incumbent_suppliers else "No"
-                    output_data[i]["Part Switched"] = "Yes" if new_supplier != incumbent else "No"
-
+timer.mark("finalizing")
 
 # --- TAIL SUPPLIER RATIONALIZATION LOGIC ---
 
-print("\nApplying tail supplier rationalization logic...\n")
+def reassign_output_row(output_row, df_row, new_supplier, reason):
+    """Point an output row at new_supplier, with that supplier's quote, savings and landed extended cost."""
+    incumbent = df_row.get(incumbent_col)
+    columns = supplier_columns.get(new_supplier, NO_COLUMNS)
+    landed_pct_col = columns["landed_pct"]
+    landed_usd_col = columns["landed_usd"]
 
-# Calculate total awarded amount per supplier
-supplier_awarded_amounts = {}
-for row in output_data:
-    supplier = row["Selected Supplier"]
-    valid_supplier_count = row["valid_supplier_count"]
-    # print(valid_supplier_count)
-    if valid_supplier_count != 0:
-        awarded_amount = row.get("Landed Extended Cost USD", 0)
-        if supplier not in supplier_awarded_amounts:
-            supplier_awarded_amounts[supplier] = 0
-        supplier_awarded_amounts[supplier] += awarded_amount
-
-
-# Update decision_rows with Binzhou Zeli changes (optimized)
-output_row_lookup = {row.get("ROW ID #"): row for row in output_data}
-for i, decision in enumerate(decision_rows):
-    row_id = decision["row"].get("ROW ID #")
-    if row_id in output_row_lookup:
-        output_row = output_row_lookup[row_id]
-        decision_rows[i]["new_supplier"] = output_row["Selected Supplier"]
-        if "Binzhou Zeli avoided" in output_row["Reason"]:
-            decision_rows[i]["reason"] = output_row["Reason"]
-
-
-tail_suppliers_to_rationalize = ['Giraffe Stainless', 'Union Metal Products', 'WEFLO', 'Tianjin Outshine', 'Sichuan Y&J', 'Guangzhou Hopetrol', 'Swati Enterprise']
-
-large_suppliers = {supplier: amount for supplier, amount in supplier_awarded_amounts.items() 
-                  if amount >= 100000}
-
-print(f"Large suppliers (≥$100k): {len(large_suppliers)}")
-for supplier, amount in sorted(large_suppliers.items(), key=lambda x: x[1], reverse=True):
-    print(f"  - {supplier}: ${amount:,.2f}")
-
-print(f"\nTail suppliers (<$100k) to rationalize: {len(tail_suppliers_to_rationalize)}")
-for supplier, amount in sorted([(s, supplier_awarded_amounts[s]) for s in tail_suppliers_to_rationalize], 
-                              key=lambda x: x[1], reverse=True):
-    print(f"  - {supplier}: ${amount:,.2f}")
-
-# Get all R2 landed cost columns for finding next best bidders
-r2_landed_cols = [col for col in df.columns if col.endswith("R2 - Total landed cost per UOM (USD)")]
-all_suppliers = [col.split(" - R2")[0] for col in r2_landed_cols]
-
-def find_next_best_large_supplier(row, current_supplier, large_suppliers, all_suppliers):
-    """Find the next best bidder among large suppliers for a given part"""
-
-    incumbent = row.get("Normalized incumbent supplier", "")
-    valid_supplier = row.get('Valid Supplier')
-    if valid_supplier == 1:
-        if incumbent == current_supplier:
-            return current_supplier, "Has to stay with it."
-        else:
-            return incumbent, 'Forced to incumbent because no other bid on it.'
+    if new_supplier != incumbent:
+        landed_cost = df_row.get(columns["landed"]) or 0
     else:
+        landed_cost = df_row.get(supplier_columns.get(incumbent, NO_COLUMNS)["landed"]) or calculate_wapp_landed_savings(df_row, 'new_landed_cost')
 
-        incumb_bid_col = f'{incumbent} - R2 - Total landed cost per UOM (USD)'
-        incum_bid = row.get(incumb_bid_col, 0)
-        
-        part_bids = []
-        # First check if incumbent is a large supplier
-        if incumbent in large_suppliers:
-            if pd.notna(incum_bid) and incum_bid > 0:
-                part_bids.append((incumbent, incum_bid))
-                return incumbent, "Rationalized to other bidder than than bidder based on logic"
-        
-        # Get all bids for this part and sort by landed cost
-        for supplier in all_suppliers:
-            if supplier == current_supplier:
-                continue  # Skip current tail supplier
-                
-            landed_cost_col = f"{supplier} - R2 - Total landed cost per UOM (USD)"
-            landed_cost = row.get(landed_cost_col, 0)
-            
-            if pd.notna(landed_cost) and landed_cost > 0:
-                part_bids.append((supplier, landed_cost))
-        
-        # Sort by landed cost (ascending - lowest cost first)
-        part_bids.sort(key=lambda x: x[1])
-        
-        # Find first large supplier in sorted list
-        for supplier, cost in part_bids:
-            if supplier in large_suppliers:
-                return supplier, f"Rationalized to other bidder than than bidder based on logic"
-        
-        # If no large supplier found, return the incumbent anyway
-        return incumbent, "incumbent anyway"
-
-# Apply rationalization
+    output_row.update({
+        "Selected Supplier": new_supplier,
+        "Reason": reason,
+        "Final quote per each FOB Port of Departure (USD)": df_row.get(columns["fob"], df_row.get('Volume-banded WAPP')),
+        "FOB Savings %": df_row.get(columns["pct"], "-"),
+        "FOB Savings USD": df_row.get(columns["usd"], "-"),
+        "Landed Cost Savings %": df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct'),
+        "Landed Cost Savings USD": df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd'),
+        "Landed Extended Cost USD": landed_cost * df_row.get(volume_col, 0),
+        "Is Totally New Supplier": "Yes" if new_supplier not in incumbent_suppliers else "No",
+        "Part Switched": "Yes" if new_supplier != incumbent else "No",
+    })
 
-rationalization_changes = 0
-for i, row in enumerate(output_data):
-    current_supplier = row["Selected Supplier"]
-    
-    if current_supplier in tail_suppliers_to_rationalize:
-        # Find corresponding row in original dataframe
-        row_id = row.get("ROW ID #")
-        df_row = df[df["ROW ID #"] == row_id].iloc[0] if not df[df["ROW ID #"] == row_id].empty else None
-        incumbent = row.get("Incumbent Supplier", "")
-        if df_row is not None and df_row['Valid Supplier'] >= 1:
-
-            new_supplier, reason = find_next_best_large_supplier(df_row, current_supplier, large_suppliers, all_suppliers)
-            
-            if new_supplier != current_supplier:
-                # Update the supplier assignment
-                old_supplier = current_supplier
-                output_data[i]["Selected Supplier"] = new_supplier
-                output_data[i]["Reason"] = f"Rationalized from {old_supplier}: {reason}"
-                
-                # Update other relevant fields
-                if new_supplier != "-":
-                    # Update savings columns
-                    pct_col = f"{new_supplier} - Final % savings vs baseline"
-                    usd_col = f"{new_supplier} - Final USD savings vs baseline"
-                    landed_pct_col = f"{new_supplier} - Final Landed % savings vs baseline"
-                    landed_usd_col = f"{new_supplier} - Final Landed USD savings vs baseline"
-                    fob_col = f"{new_supplier} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)"
-                    
-                    output_data[i]["Final quote per each FOB Port of Departure (USD)"] = df_row.get(fob_col, df_row.get('Volume-banded WAPP'))
-
-                    output_data[i]["FOB Savings %"] = df_row.get(pct_col, "-")
-                    output_data[i]["FOB Savings USD"] = df_row.get(usd_col, "-")
-                    output_data[i]["Landed Cost Savings %"] = df_row[landed_pct_col] if (landed_pct_col in df_row and df_row[landed_pct_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'pct')
-                    output_data[i]["Landed Cost Savings USD"] = df_row[landed_usd_col] if (landed_usd_col in df_row and df_row[landed_usd_col] not in [0, '-']) else calculate_wapp_landed_savings(df_row, 'usd')
-                    
-                    # Update landed extended cost
-                    volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-                    if pd.isna(volume):
-                        volume = 0
-                    
-                    landed_cost_key = f"{new_supplier} - R2 - Total landed cost per UOM (USD)"
-                    incumbent_key = f"{incumbent} - R2 - Total landed cost per UOM (USD)"
-
-                    if new_supplier != incumbent:
-                        landed_cost = df_row.get(landed_cost_key)
-                        if not landed_cost:  # catches 0, None, '', False
-                            landed_cost = 0
-                    else:
-                        landed_cost = df_row.get(incumbent_key)
-                        if not landed_cost:
-                            landed_cost = calculate_wapp_landed_savings(df_row, 'new_landed_cost')
-                    result_extended_cost = landed_cost * df_row.get(volume_col, 0)
-
-                    output_data[i]["Landed Extended Cost USD"] = result_extended_cost
-                    
-                    # Update supplier classification
-                    incumbent = df_row.get("Normalized incumbent supplier")
-                    output_data[i]["Is Totally New Supplier"] = "Yes" if new_supplier not in incumbent_suppliers else "No"
-                    output_data[i]["Part Switched"] = "Yes" if new_supplier != incumbent else "No"
-                    
-                    # Update reference data
-                    ref_row = output_reference_df[output_reference_df['Reference'] == new_supplier]
-                    def get_ref_value(col):
-                        return ref_row[col].values[0] if not ref_row.empty else "-"
-                
-                rationalization_changes += 1
-
-print(f"Rationalization complete: {rationalization_changes} parts reassigned from tail suppliers")
-
-# Update decision_rows with rationalized assignments
-for i, decision in enumerate(decision_rows):
-    row_id = decision["row"].get("ROW ID #")
-    # Find corresponding output row
-    for output_row in output_data:
-        if output_row.get("ROW ID #") == row_id:
-            decision_rows[i]["new_supplier"] = output_row["Selected Supplier"]
-            if "Rationalized from" in output_row["Reason"]:
-                decision_rows[i]["reason"] = output_row["Reason"]
-            break
+# output_data follows decision_rows, one row each
+output_positions = np.array([decision["index"] for decision in decision_rows], dtype=np.intp)
+
+def output_award():
+    """The output rows' Selected Supplier as an award vector of supplier codes over the bid matrix."""
+    award = np.full(len(df), NO_AWARD, dtype=np.intp)
+    award[output_positions] = bids.codes([row["Selected Supplier"] for row in output_data])
+    return award
+
+if TAIL_SPEND_THRESHOLD is None and not TAIL_SUPPLIERS:
+    print("No tail spend threshold set, tail supplier rationalization skipped")
+else:
+    print("\nApplying tail supplier rationalization logic...\n")
+    tail_threshold = TAIL_SPEND_THRESHOLD or 0
+
+    # The tail pass of scenario_engine.tail_pass on the current award; capped suppliers receive no tail parts
+    rationalized = tail_pass(bids, output_award(), supplier_rules.allowed, scenario, unit_costs, ranking=ranking)
+    supplier_totals = rationalized["totals"]
+    tail_codes = rationalized["tail"]
+    large_codes = np.setdiff1d(np.flatnonzero((supplier_totals >= tail_threshold) & (supplier_totals > 0)), tail_codes)
+
+    print(f"Large suppliers (≥${tail_threshold:,}): {len(large_codes)}")
+    for code in large_codes[np.argsort(-supplier_totals[large_codes], kind="stable")]:
+        print(f"  - {bids.suppliers[code]}: ${supplier_totals[code]:,.2f}")
+
+    print(f"\nTail suppliers (<${tail_threshold:,} or in TAIL_SUPPLIERS) to rationalize: {len(tail_codes)}")
+    for code in tail_codes[np.argsort(-supplier_totals[tail_codes], kind="stable")]:
+        print(f"  - {bids.suppliers[code]}: ${supplier_totals[code]:,.2f}")
+
+    output_index = np.full(len(df), -1, dtype=np.intp)
+    output_index[output_positions] = np.arange(len(output_positions))
+    for idx, old_code, reason in zip(rationalized["moved"], rationalized["moved_from"], rationalized["reasons"]):
+        new_supplier = bids.suppliers[rationalized["award"][idx]]
+        reassign_output_row(output_data[output_index[idx]], row_records[idx], new_supplier,
+                            f"Rationalized from {bids.suppliers[old_code]}: {reason}")
+
+    print(f"Rationalization complete: {len(rationalized['moved'])} parts reassigned from tail suppliers "
+          f"({rationalized['rounds']} round{'s' if rationalized['rounds'] > 1 else ''})")
+
+timer.mark("rationalization")
+
+# --- Equivalence check: the award written out is the one scenario_engine.run_scenario gives for this scenario ---
+if AWARD_MODE == "greedy":
+    differ = np.flatnonzero(output_award() != run_scenario(bids, scenario)["award"])
+    if len(differ):
+        print(f"Warning: {len(differ)} parts awarded differently from scenario_engine.run_scenario, "
+              f"ROW IDs {bids.row_ids[differ][:10].tolist()}")
+    else:
+        print("✅ Award matches scenario_engine.run_scenario")
 
 output_df = pd.DataFrame(output_data)
 
@@ -1368,9 +596,8 @@ for idx, row in output_df.iterrows():
         cost_col = f'{incumbent} - R2 - Total Cost Per UOM FOB Port of Origin/Departure (USD)'
 
         # Check if row exists in df
-        matching_row = df[df['ROW ID #'] == row_id]
-        if not matching_row.empty:
-            matching_row = matching_row.iloc[0]  # take first matching row
+        matching_row = df_row_for(row_id)
+        if matching_row is not None:
             # Check if cost_col exists and has valid value
             if cost_col in matching_row and pd.notna(matching_row[cost_col]) and matching_row[cost_col] not in [0, '-', '']:
                 output_df.at[idx, 'Final quote per each FOB Port of Departure (USD)'] = matching_row[cost_col]
@@ -1380,192 +607,11 @@ for idx, row in output_df.iterrows():
 
 
 
-# Reset all metrics
-incumbent_retained = 0
-new_supplier_count = 0
-net_new_supplier_count = 0
-unique_suppliers = set()
-total_landed_cost_incumbent = 0
-total_landed_cost_new_suppliers = 0
-total_landed_cost_completely_new_suppliers = 0
-total_incumbent_volume = 0
-total_net_new_supplier_volume = 0
-total_new_supplier_volume = 0
-net_new_supplier_list = set()
-total_landed_savings_usd = 0
-total_fob_savings_usd = 0
-# parts_where_no_bids = 0
-
-# Recalculate all metrics based on final supplier assignments
-for row in output_data:
-    selected_supplier = row["Selected Supplier"]
-    incumbent = row["Incumbent Supplier"]
-    
-    # Handle parts with no bids
-    if selected_supplier == "-":
-        parts_where_no_bids += 1
-        # Add to total cost not awarded (use original landed extended cost from output_data)
-        total_cost_not_awarded += row.get("Landed Extended Cost USD", 0)
-        continue
-    
-    # Get volume and costs for calculations
-    row_id = row.get("ROW ID #")
-    df_row = df[df["ROW ID #"] == row_id].iloc[0] if not df[df["ROW ID #"] == row_id].empty else None
-    
-    if df_row is not None:
-        volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-        if pd.isna(volume):
-            volume = 0
-        
-        landed_cost = df_row.get(f"{selected_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        if pd.isna(landed_cost):
-            landed_cost = 0
-        
-        extended_cost = landed_cost * volume
-        
-        # Calculate savings
-        fob_usd_col = f"{selected_supplier} - Final USD savings vs baseline"
-        landed_usd_col = f"{selected_supplier} - Final Landed USD savings vs baseline"
-        
-        try:
-            fob_savings = float(df_row.get(fob_usd_col, 0)) if pd.notna(df_row.get(fob_usd_col)) else 0
-        except (ValueError, TypeError):
-            fob_savings = 0
-        
-        try:
-            landed_savings = float(df_row.get(landed_usd_col, 0)) if pd.notna(df_row.get(landed_usd_col)) else 0
-        except (ValueError, TypeError):
-            landed_savings = 0
-        
-        total_fob_savings_usd += fob_savings
-        total_landed_savings_usd += landed_savings
-        
-        # Classify supplier and update metrics
-        if selected_supplier == incumbent:
-            incumbent_retained += 1
-            total_incumbent_volume += volume
-            total_landed_cost_incumbent += extended_cost
-        else:
-            if selected_supplier in incumbent_suppliers:
-                new_supplier_count += 1
-                total_new_supplier_volume += volume
-                total_landed_cost_new_suppliers += extended_cost
-            else:
-                net_new_supplier_count += 1
-                net_new_supplier_list.add(selected_supplier)
-                total_net_new_supplier_volume += volume
-                total_landed_cost_completely_new_suppliers += extended_cost
-        
-        unique_suppliers.add(selected_supplier)
-
-
-print('*************************************************')
-print((output_df.loc[output_df['Selected Supplier'] == 'Manek Metalcraft', 'Final quote per each FOB Port of Departure (USD)'] * 
-       output_df.loc[output_df['Selected Supplier'] == 'Manek Metalcraft', 'Annual Volume (per UOM)']).sum())
-
-print('*************************************************')
-
-
-print(f"All metrics recalculated after rationalization:")
-print(f"  - Total landed savings USD: ${total_landed_savings_usd:,.2f}")
-print(f"  - Total FOB savings USD: ${total_fob_savings_usd:,.2f}")
-print(f"  - Total cost not awarded: ${total_cost_not_awarded:,.2f}")
-print(f"  - Total landed cost incumbent: ${total_landed_cost_incumbent:,.2f}")
-print(f"  - Total landed cost new suppliers: ${total_landed_cost_new_suppliers:,.2f}")
-print(f"  - Total landed cost completely new suppliers: ${total_landed_cost_completely_new_suppliers:,.2f}")
-print(f"  - Incumbent retained: {incumbent_retained}")
-print(f"  - New suppliers: {new_supplier_count}")
-print(f"  - Net new suppliers: {net_new_supplier_count}")
-print(f"  - Parts with no bids: {parts_where_no_bids}")
-print(f"  - Unique suppliers: {len(unique_suppliers)}")
-
-# Final metrics recalculation after Binzhou Zeli removal
-print("Final metrics recalculation after Rationalization...")
-
-# Reset all metrics again
-incumbent_retained = 0
-new_supplier_count = 0
-net_new_supplier_count = 0
-unique_suppliers = set()
-total_landed_cost_incumbent = 0
-total_landed_cost_new_suppliers = 0
-total_landed_cost_completely_new_suppliers = 0
-total_incumbent_volume = 0
-total_net_new_supplier_volume = 0
-total_new_supplier_volume = 0
-net_new_supplier_list = set()
-total_landed_savings_usd = 0
-total_fob_savings_usd = 0
-
-# Final recalculation
-for row in output_data:
-    selected_supplier = row["Selected Supplier"]
-    incumbent = row["Incumbent Supplier"]
-    
-    # Handle parts with no bids
-    # if selected_supplier == "-":
-    #     parts_where_no_bids += 1
-    #     total_cost_not_awarded += row.get("Landed Extended Cost USD", 0)
-    #     continue
-    
-    # Get volume and costs for calculations
-    row_id = row.get("ROW ID #")
-    df_row = df[df["ROW ID #"] == row_id].iloc[0] if not df[df["ROW ID #"] == row_id].empty else None
-    
-    if df_row is not None:
-        volume = pd.to_numeric(df_row.get(volume_col), errors='coerce')
-        if pd.isna(volume):
-            volume = 0
-        
-        landed_cost = df_row.get(f"{selected_supplier} - R2 - Total landed cost per UOM (USD)", 0)
-        if pd.isna(landed_cost):
-            landed_cost = 0
-        
-        extended_cost = landed_cost * volume
-        
-        # Calculate savings
-        fob_usd_col = f"{selected_supplier} - Final USD savings vs baseline"
-        landed_usd_col = f"{selected_supplier} - Final Landed USD savings vs baseline"
-        
-        try:
-            fob_savings = float(df_row.get(fob_usd_col, 0)) if pd.notna(df_row.get(fob_usd_col)) else 0
-        except (ValueError, TypeError):
-            fob_savings = 0
-        
-        try:
-            landed_savings = float(df_row.get(landed_usd_col, 0)) if pd.notna(df_row.get(landed_usd_col)) else 0
-        except (ValueError, TypeError):
-            landed_savings = 0
-        
-        total_fob_savings_usd += fob_savings
-        total_landed_savings_usd += landed_savings
-        
-        # Classify supplier and update metrics
-        if selected_supplier == incumbent:
-            incumbent_retained += 1
-            total_incumbent_volume += volume
-            total_landed_cost_incumbent += extended_cost
-        else:
-            if selected_supplier != '-':
-                if selected_supplier in incumbent_suppliers:
-                    new_supplier_count += 1
-                    total_new_supplier_volume += volume
-                    total_landed_cost_new_suppliers += extended_cost
-                else:
-                    net_new_supplier_count += 1
-                    net_new_supplier_list.add(selected_supplier)
-                    total_net_new_supplier_volume += volume
-                    total_landed_cost_completely_new_suppliers += extended_cost
-        
-        unique_suppliers.add(selected_supplier)
-
-print(f"Final metrics after all processing:")
-print(f"  - Total annual revenue discount: ${total_annual_revenue_discount:,.2f}")
-print(f"  - Total landed savings USD: ${total_landed_savings_usd:,.2f}")
-print(f"  - Incumbent retained: {incumbent_retained}")
-print(f"  - New suppliers: {new_supplier_count}")
-print(f"  - Net new suppliers: {net_new_supplier_count}")
-print(f"  - Unique suppliers: {len(unique_suppliers)}")
+# Capacity used on the capped suppliers by the parts moved to them; forced moves can take a supplier past its cap
+print_cap_usage(cap_usage(output_df['Selected Supplier'], output_df['Incumbent Supplier'],
+                          pd.to_numeric(output_df['Annual Volume (per UOM)'], errors='coerce'),
+                          pd.to_numeric(output_df['Landed Extended Cost USD'], errors='coerce'),
+                          SUPPLIER_CAPS, parts=output_df))
 
 # In output data want to add new column Redundant Suppliers per Product Family.
 '''
@@ -1601,117 +647,78 @@ if "Redundant Suppliers per Product Group" in output_df.columns:
     redundancy_col = output_df.pop("Redundant Suppliers per Product Group")
     output_df.insert(14, "Redundant Suppliers per Product Group", redundancy_col)
 
-all_incumbents = set(output_df["Incumbent Supplier"].dropna().unique())
-
-incumbent_rows = output_df[output_df["Selected Supplier"] == output_df["Incumbent Supplier"]]
-incumbent_suppliers_unique = set(incumbent_rows["Selected Supplier"].dropna().unique())
-
-new_rows = output_df[output_df["Selected Supplier"] != output_df["Incumbent Supplier"]]
-new_suppliers = set(new_rows["Selected Supplier"].dropna().unique())
-
-new_rows = output_df[output_df["Selected Supplier"] != output_df["Incumbent Supplier"]]
-new_suppliers_existing = set(
-    new_rows["Selected Supplier"].dropna().unique()
-).intersection(all_incumbents)
-
-net_new_suppliers = new_suppliers - all_incumbents
 import numpy as np
 # # --- Add country column from country_supplier_mapping.csv ---
 # Helper to get supplier country from port mapping
-# Load supplier port file and port-country mapping
-supplier_port_file = "Supplier Port per Part table 070925.csv"
-port_country_map = {
-    'DALIAN': 'China', 
-    'NINGBO': 'China', 
-    'QINGDAO': 'China', 
-    'QINGDAO2': 'China', 
-    'SHANGHAI': 'China',
-    'SHENZHEN': 'China', 
-    'TIANJIN': 'China', 
-    'XINGANG': 'China', 
-    'XIAMEN': 'China',
-    'AHMEDABAD': 'India', 
-    'CHENNAI': 'India', 
-    'DADRI': 'India', 
-    'MUMBAI': 'India',
-    'MUNDRA': 'India', 
-    'NHAVA SHEVA': 'India',
-    'SURABAYA': 'Indonesia',
-    'PORT KLANG': 'Malaysia', 
-    'PASIR GUDANG': 'Malaysia', 
-    'TANJUNG PELAPAS': 'Malaysia',
-    'BUSAN': 'South Korea',
-    'KAOHSIUNG': 'Taiwan', 
-    'KEELUNG': 'Taiwan', 
-    'TAICHUNG': 'Taiwan', 
-    'TAIPEI': 'Taiwan',
-    'BANGKOK': 'Thailand',
-    'LAEM CHABANG': 'Thailand',
-    'HO CHI MINH CITY': 'Vietnam', 
-    'VUNG TAU': 'Vietnam', 
-    'HAI PHONG': 'Vietnam',
-    'VIRGINIA': 'India'
-}
-supplier_port_df = pd.read_csv(supplier_port_file)
-supplier_port_df = supplier_port_df.set_index('ROW ID #')
-
 def get_supplier_country(row_id, supplier_name):
-    try:
-        port = supplier_port_df.loc[row_id, supplier_name] if supplier_name in supplier_port_df.columns else np.nan
-        if pd.isna(port):
-            return np.nan
-        return port_country_map.get(str(port).strip().upper(), np.nan)
-    except Exception:
-        return np.nan
+    return supplier_info.supplier_country(row_id, supplier_name)
 
 
 output_df['Country'] = output_df.apply(
     lambda row: get_supplier_country(row["ROW ID #"], row["Selected Supplier"]), axis=1
 )
 
-total_landed_savings_usd = pd.to_numeric(output_df['Landed Cost Savings USD'], errors='coerce').sum()
+# Supplier reference metadata, joined once on the final assignment
+output_df = attach_reference(output_df, supplier_reference)
+timer.mark("finalizing")
 
+# --- Summary metrics: one aggregation over the final award ---
+metrics = award_metrics(output_df["Selected Supplier"], output_df["Incumbent Supplier"], incumbent_suppliers,
+                        output_df["Landed Extended Cost USD"], output_df["Annual Volume (per UOM)"],
+                        output_df["Landed Cost Savings USD"], output_df["FOB Savings USD"])
 
-total_landed_cost_incumbent = output_df.loc[
-    output_df["Incumbent Supplier"] == output_df["Selected Supplier"],
-    "Landed Extended Cost USD"
-].sum()
-
-total_landed_cost_completely_new_suppliers = output_df.loc[
-    ~output_df["Selected Supplier"].isin(incumbent_suppliers),
-    "Landed Extended Cost USD"
-].sum()
+print(f"Final metrics after all processing:")
+print(f"  - Total annual revenue discount: ${total_annual_revenue_discount:,.2f}")
+print(f"  - Total landed savings USD: ${metrics['total_landed_savings_usd']:,.2f}")
+print(f"  - Total FOB savings USD: ${metrics['total_fob_savings_usd']:,.2f}")
+print(f"  - Total cost not awarded: ${total_cost_not_awarded + metrics['total_cost_no_bids']:,.2f}")
+print(f"  - Total landed cost incumbent: ${metrics['total_landed_cost_incumbent']:,.2f}")
+print(f"  - Total landed cost new suppliers: ${metrics['total_landed_cost_new_suppliers']:,.2f}")
+print(f"  - Total landed cost completely new suppliers: ${metrics['total_landed_cost_completely_new_suppliers']:,.2f}")
+print(f"  - Incumbent retained: {metrics['incumbent_retained']}")
+print(f"  - New suppliers: {metrics['new_supplier_count']}")
+print(f"  - Net new suppliers: {metrics['net_new_supplier_count']}")
+print(f"  - Parts with no bids: {metrics['parts_where_no_bids']}")
+print(f"  - Unique suppliers: {len(metrics['unique_suppliers'])}")
 
-total_landed_cost_new_suppliers = output_df.loc[
-    (output_df["Incumbent Supplier"] != output_df["Selected Supplier"]) &
-    (output_df["Selected Supplier"].isin(incumbent_suppliers)),
-    "Landed Extended Cost USD"
-].sum()
 summary_data = [
     # ["Total FOB Savings USD", total_fob_savings_usd],
-    ["Total Landed Cost Savings USD", total_landed_savings_usd],
+    ["Total Landed Cost Savings USD", metrics["total_landed_savings_usd"]],
     # ["Total Annual Revenue Discount USD", total_annual_revenue_discount],
     # ["Total Cost of no valid suppliers", total_cost_not_awarded],
 
-    ["Total Landed Cost where Incumbent Suppliers Retained", total_landed_cost_incumbent],
+    ["Total Landed Cost where Incumbent Suppliers Retained", metrics["total_landed_cost_incumbent"]],
     
-    ["Total Landed Cost where bid is awarded to New Suppliers", total_landed_cost_new_suppliers],
+    ["Total Landed Cost where bid is awarded to New Suppliers", metrics["total_landed_cost_new_suppliers"]],
     
-    ["Total Landed Cost where bid is awarded to Completely New Suppliers", total_landed_cost_completely_new_suppliers],
+    ["Total Landed Cost where bid is awarded to Completely New Suppliers", metrics["total_landed_cost_completely_new_suppliers"]],
     
-    ["Total parts where Incumbent Suppliers Retained", incumbent_retained],
+    ["Total parts where Incumbent Suppliers Retained", metrics["incumbent_retained"]],
     
-    ["Total parts where bid is awarded to New Suppliers", new_supplier_count],
-    ["Total parts where bid is awarded to Net New Suppliers", net_new_supplier_count],
+    ["Total parts where bid is awarded to New Suppliers", metrics["new_supplier_count"]],
+    ["Total parts where bid is awarded to Net New Suppliers", metrics["net_new_supplier_count"]],
 
 
-    ["Parts not awarded to any supplier", parts_where_no_bids],
+    ["Parts not awarded to any supplier", metrics["parts_where_no_bids"]],
     ["", ""],
-    ["Totally New Suppliers", len(net_new_supplier_list)],
-    ["Total Unique Suppliers", len(unique_suppliers)],
+    ["Totally New Suppliers", len(metrics["net_new_supplier_list"])],
+    ["Total Unique Suppliers", len(metrics["unique_suppliers"])],
 
 ]
 
+timer.mark("metrics")
+
+# --- Award store: the final award with the run settings, for diffing runs (award_store.py) ---
+award_file = write_award(output_df, award_path(output_file), {
+    "scenario": os.path.basename(output_file),
+    "input": input_path,
+    "settings": scenario,
+    "summary": {name: value for name, value in metrics.items() if not isinstance(value, set)},
+})
+if award_file:
+    print(f"Award written to '{award_file}'")
+timer.mark("award store")
+
 # --- Write to Excel ---
 with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
     workbook = writer.book
@@ -1719,7 +726,7 @@ with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
     writer.sheets["Sheet1"] = worksheet
 
     # Scenario header
-    scenario_header = f"Scenario: {round(incumbent_retained/14077*100, 2)}% New Supplier, {round((net_new_supplier_count+new_supplier_count)/14077*100, 2)}% Incumbent"
+    scenario_header = f"Scenario: {round(metrics['incumbent_retained']/14077*100, 2)}% New Supplier, {round((metrics['net_new_supplier_count']+metrics['new_supplier_count'])/14077*100, 2)}% Incumbent"
     header_format = workbook.add_format({'bold': True, 'font_size': 14, 'align': 'left'})
     worksheet.merge_range(0, 0, 0, len(list(output_data[0].keys()))-1, scenario_header, header_format)
 
@@ -1751,14 +758,17 @@ with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
 
     # Formula for summing cost values (adjust B3:B8 if more/less than 6 rows of cost)
 
-    total_cost =  total_landed_savings_usd + total_landed_cost_incumbent + total_landed_cost_new_suppliers + total_landed_cost_completely_new_suppliers
+    total_cost = (metrics["total_landed_savings_usd"] + metrics["total_landed_cost_incumbent"]
+                  + metrics["total_landed_cost_new_suppliers"] + metrics["total_landed_cost_completely_new_suppliers"])
     worksheet.write(total_label_row, 1, total_cost, usd_format)
 
     # Write output table
     df_output = output_df
     df_output.to_excel(writer, sheet_name="Sheet1", startrow=13, index=False)
+timer.mark("excel write")
 
 # --- Timer ---
 elapsed_time = time.time() - start_time
+timer.report()
 print(f"\n✅ Done. Output written to '{output_file}'")
 print(f"⏱ Time taken: {elapsed_time:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,127 @@
+'''
+Incremental re-evaluation of a greedy scenario when its rules change.
+
+ScenarioState evaluates a scenario config once, like scenario_engine.run_scenario, and keeps
+what the award is built from: the allowed mask, the unit costs and every part's greedy choice
+(proposed supplier, extended cost, forced move). A few ROW IDs added to a supplier's exclusion
+list only change the allowed bids of the parts the new rules cover, so only those parts are
+re-ranked. The caps, the percent_new threshold, the tail supplier totals and the summary are
+then recomputed from the kept per-part vectors.
+
+    state = ScenarioState(matrix, {"percent_new": 0.65, "tail_threshold": 100000})
+    state.apply({"rules": [{"supplier": "Coda", "action": "exclude", "row_ids": ["1163", "1164"]}]})
+    state.apply({"tail_suppliers": ["Oston Industrial"]})
+
+    python scenario_state.py <scenario file> <delta file>
+
+evaluates the first scenario of a scenario file, then applies the deltas of a YAML / JSON delta
+file (a list of deltas) one after the other and prints the summary after each.
+'''
+
+import copy
+import sys
+import time
+
+import numpy as np
+
+from scenario_engine import (admit_moves, load_bid_matrix, load_scenario_file, load_supplier_info, part_choices,
+                             read_settings_file, scenario_config, share_limit, tail_pass)
+from share_sweep import award_summary
+from supplier_rules import SUPPLIER_RULES, SupplierRules, rule_parts
+
+# settings a delta replaces; "rules" and "tail_suppliers" are added to the current ones
+DELTA_SETTINGS = ("percent_new", "enforce_percent_new", "caps", "tail_threshold", "tail_fixed_point")
+DELTA_KEYS = ("name", "rules", "tail_suppliers") + DELTA_SETTINGS
+
+
+class ScenarioState:
+    """A greedy scenario evaluated over one BidMatrix; result holds the latest award and summary."""
+
+    def __init__(self, matrix, config):
+        start = time.time()
+        config = scenario_config(config)
+        if config["mode"] != "greedy":
+            raise ValueError("incremental re-evaluation needs a greedy scenario")
+        config["rules"] = list(SUPPLIER_RULES if config["rules"] is None else config["rules"])
+        self.matrix = matrix
+        self.config = config
+        self.keys = {}
+        self.base_costs = matrix.unit_costs()
+        self.valid_count = matrix.valid_count()
+        self.allowed = SupplierRules(matrix.parts, matrix.suppliers, config["rules"]).allowed
+        self.unit_costs = np.where(self.allowed, self.base_costs, np.nan)
+        self.choice, self.extended, self.forced = part_choices(matrix, self.unit_costs)
+        self.result = self._evaluate(start, matrix.shape[0])
+
+    def branch(self):
+        """Copy to apply deltas to, leaving this state as it is; the bid matrix and base costs are shared."""
+        branch = copy.copy(self)
+        branch.config = dict(self.config)
+        for name in ("allowed", "unit_costs", "choice", "extended", "forced"):
+            setattr(branch, name, getattr(self, name).copy())
+        return branch
+
+    def apply(self, delta):
+        """
+        Apply a delta (keys in DELTA_KEYS) and return the new result. Raises ValueError on unknown
+        keys or settings, leaving the state as it was.
+        """
+        start = time.time()
+        unknown = set(delta) - set(DELTA_KEYS)
+        if unknown:
+            raise ValueError(f"unknown delta key(s): {', '.join(sorted(unknown))}")
+        config = {**self.config, **{key: delta[key] for key in DELTA_SETTINGS if key in delta}}
+        config["name"] = delta.get("name", self.config["name"])
+        added = list(delta.get("rules") or [])
+        config["rules"] = self.config["rules"] + added
+        config["tail_suppliers"] = list(self.config["tail_suppliers"]) + [
+            supplier for supplier in delta.get("tail_suppliers") or [] if supplier not in self.config["tail_suppliers"]]
+        config = scenario_config(config)
+
+        parts = self.matrix.parts
+        covered = np.zeros(len(parts), dtype=bool)
+        for rule in added:
+            covered |= rule_parts(rule, parts, self.keys)
+        rows = np.flatnonzero(covered)
+        allowed = SupplierRules(parts.iloc[rows], self.matrix.suppliers, config["rules"]).allowed
+
+        self.config = config
+        self.allowed[rows] = allowed
+        self.unit_costs[rows] = np.where(allowed, self.base_costs[rows], np.nan)
+        self.choice[rows], self.extended[rows], self.forced[rows] = part_choices(self.matrix, self.unit_costs, rows)
+        self.result = self._evaluate(start, len(rows))
+        return self.result
+
+    def _evaluate(self, start, reranked):
+        """Result of the kept part choices under the current caps, threshold and tail settings."""
+        config = self.config
+        award = admit_moves(self.matrix, self.choice, self.extended, self.forced, share_limit(config), config["caps"])
+        result = {"name": config["name"]}
+        if config["tail_threshold"] is not None or config["tail_suppliers"]:
+            tail = tail_pass(self.matrix, award, self.allowed, config, self.unit_costs, self.valid_count)
+            award = tail["award"]
+            result.update(tail_moved=len(tail["moved"]))
+        result.update(award=award, summary=award_summary(self.matrix, award, self.base_costs),
+                      parts_reranked=reranked, seconds=time.time() - start)
+        return result
+
+
+def print_result(result):
+    summary = result["summary"]
+    print(f"{result['name']}: landed savings ${summary['Landed savings USD']:,.2f}, "
+          f"{summary['Parts switched']} parts switched, {summary['Unique suppliers']} suppliers "
+          f"({result['parts_reranked']} parts re-ranked, {result['seconds'] * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python scenario_state.py <scenario file> <delta file>")
+    batch = load_scenario_file(sys.argv[1])
+    deltas = read_settings_file(sys.argv[2])
+    matrix = load_bid_matrix(batch["input"], load_supplier_info())
+    state = ScenarioState(matrix, batch["scenarios"][0])
+    print_result(state.result)
+    for delta in deltas:
+        previous = state.result["award"]
+        print_result(state.apply(delta))
+        print(f"  {int((state.result['award'] != previous).sum())} parts changed supplier")
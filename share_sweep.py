@@ -0,0 +1,77 @@
+'''
+New-supplier share sweep for the greedy award.
+
+The greedy award moves parts to their lowest bidder: must-assign parts always, candidate parts
+in order of savings as long as the new-supplier spend stays within PERCENT_NEW of the total
+landed cost; a candidate that does not fit keeps its incumbent. The ranking and the candidate
+order do not depend on the threshold, so a grid of thresholds is evaluated from one
+classification, giving a frontier of landed savings against new-supplier share.
+'''
+
+import numpy as np
+import pandas as pd
+
+from allocation_kernel import first_fit, first_fit_budgets
+from bid_matrix import NO_AWARD
+from scenario_metrics import award_metrics
+
+
+def admit_within_budget(costs, budget):
+    """First fit in the given order: True for each cost admitted while the running total stays within budget."""
+    return first_fit(np.asarray(costs, dtype=float)[:, None], [budget])
+
+
+def admitted_award(matrix, award, candidates, admitted):
+    """award with every candidate part that was not admitted handed back to its incumbent."""
+    award = award.copy()
+    kept = candidates[~admitted]
+    award[kept] = matrix.incumbent[kept]
+    return award
+
+
+def threshold_award(matrix, award, candidates, candidate_costs, forced_spend, budget):
+    """award with every candidate part that does not fit the budget handed back to its incumbent."""
+    return admitted_award(matrix, award, candidates, admit_within_budget(candidate_costs, budget - forced_spend))
+
+
+def award_summary(matrix, award, unit_costs=None):
+    """Frontier figures of one award vector, from scenario_metrics.award_metrics."""
+    costs = matrix.award_costs(award, unit_costs)
+    metrics = award_metrics(award, matrix.incumbent, np.unique(matrix.incumbent[matrix.incumbent != NO_AWARD]),
+                            costs, matrix.volume, np.where(np.isnan(costs), 0.0, matrix.baseline_cost - costs),
+                            no_bid=NO_AWARD)
+    return {
+        "Landed savings USD": metrics["total_landed_savings_usd"],
+        "New supplier spend USD": metrics["total_landed_cost_new_suppliers"] + metrics["total_landed_cost_completely_new_suppliers"],
+        "Parts switched": metrics["new_supplier_count"] + metrics["net_new_supplier_count"],
+        "Unique suppliers": len(metrics["unique_suppliers"]),
+        "Net new suppliers": len(metrics["net_new_supplier_list"]),
+    }
+
+
+def sweep_new_share(matrix, award, candidates, candidate_costs, forced_spend, total_cost, thresholds):
+    """
+    Evaluate the greedy award at each new-supplier share threshold.
+
+    award: the award with every candidate moved (supplier codes); candidates: candidate part rows in
+    admission order, with their extended costs; forced_spend: new-supplier spend of the must-assign parts.
+    Returns (frontier DataFrame with one row per threshold, {threshold: award vector}).
+    """
+    unit_costs = matrix.unit_costs()
+    # every threshold's admissions in one pass of the first-fit kernel
+    admitted = first_fit_budgets(candidate_costs, [threshold * total_cost - forced_spend for threshold in thresholds])
+    rows, awards = [], {}
+    for threshold, fits in zip(thresholds, admitted):
+        awards[threshold] = admitted_award(matrix, award, candidates, fits)
+        summary = award_summary(matrix, awards[threshold], unit_costs)
+        rows.append({"New share threshold": threshold, **summary,
+                     "New supplier share": summary["New supplier spend USD"] / total_cost})
+    return pd.DataFrame(rows), awards
+
+
+def awards_frame(matrix, awards, label="New share {:.0%}"):
+    """Award vectors as supplier names, one column per threshold, keyed by ROW ID #."""
+    columns = {"ROW ID #": matrix.row_ids}
+    for threshold, award in awards.items():
+        columns[label.format(threshold)] = matrix.names(award)
+    return pd.DataFrame(columns)
@@ -0,0 +1,33 @@
+'''
+Wall-clock time per stage of a scenario run.
+
+scenario_3.py marks the end of each of its stages and prints the stage table at the end of the
+run. Given a timings file, the timer rewrites it as JSON after every mark, so the stages that
+finished are on disk even when a later stage fails (benchmark.py reads it).
+'''
+
+import json
+import time
+
+
+class StageTimer:
+    """Seconds per stage name; marking the same stage again adds to it."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.started = self.last = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        """Time since the previous mark (or the start) counted to stage."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"stages": self.stages, "total": self.last - self.started}, f, indent=2)
+
+    def report(self):
+        print("Stage timings:")
+        for stage, seconds in self.stages.items():
+            print(f"  - {stage}: {seconds:.2f}s")
@@ -0,0 +1,136 @@
+'''
+Supplier exit stress test.
+
+Suppliers drop out (see the Binzhou Zeli, West Legend-MTD, Coda, Oston and Wandekai rules in
+supplier_rules.py). For a scenario's award, this measures what happens when a supplier, or a set
+of suppliers, exits: every part awarded to it moves to its next best remaining allowed bid, and a
+part with no bid left is orphaned. Caps and the new-share threshold are not re-applied.
+
+The allowed bids of every part are ranked once (supplier_ranking.SupplierRanking, top count
+suppliers by landed cost). The next best remaining supplier is then the first ranked one that has
+not exited, so every supplier's exit is evaluated at once from the ranking, and a set exit is one
+pass over it.
+
+    python supplier_exit.py [scenario file] [exit file]
+
+awards the first scenario of the scenario file (scenarios/scenario_3.yaml by default), writes the
+impact of each single supplier exit to "<output> supplier exit.csv" and, with an exit file (a
+YAML / JSON list of supplier sets, see scenarios/supplier_exits.yaml), the impact of each set to
+"<output> supplier exit sets.csv".
+'''
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bid_matrix import NO_AWARD
+from scenario_engine import (load_bid_matrix, load_scenario_file, load_supplier_info, read_settings_file, run_scenario,
+                             scenario_config)
+from supplier_ranking import TOP_K, SupplierRanking
+from supplier_rules import SupplierRules
+
+
+class ExitRanking:
+    """Top count allowed suppliers per part by landed cost, with the award they are measured against."""
+
+    def __init__(self, matrix, award, allowed=None, count=TOP_K):
+        self.matrix = matrix
+        self.award = award
+        self.unit_costs = matrix.unit_costs(allowed)
+        self.ranking = SupplierRanking(self.unit_costs, count=count)
+        self.costs = np.nan_to_num(matrix.award_costs(award, self.unit_costs))
+
+    def _replacement_costs(self, replacement):
+        rows = np.flatnonzero(replacement != NO_AWARD)
+        costs = np.zeros(len(replacement))
+        costs[rows] = np.nan_to_num(self.unit_costs[rows, replacement[rows]] * self.matrix.volume[rows])
+        return costs
+
+    def single_exits(self):
+        """One row per awarded supplier: the impact of that supplier exiting alone."""
+        m, award = self.matrix, self.award
+        n_suppliers = len(m.suppliers)
+        replacement = self.ranking.next_best_rows(excluding=award)
+        awarded = award != NO_AWARD
+        reassigned = awarded & (replacement != NO_AWARD)
+        orphaned = awarded & (replacement == NO_AWARD)
+        delta = self._replacement_costs(replacement) - self.costs
+
+        def per_supplier(where, weights=None):
+            return np.bincount(award[where], weights=None if weights is None else weights[where], minlength=n_suppliers)
+
+        # spend moved from each exited supplier to each replacement
+        moved_spend = np.zeros((n_suppliers, n_suppliers))
+        np.add.at(moved_spend, (award[reassigned], replacement[reassigned]), self.costs[reassigned])
+        main = np.argmax(moved_spend, axis=1)
+        spend = per_supplier(awarded, self.costs)
+        frame = pd.DataFrame({
+            "Exited": m.suppliers,
+            "Parts awarded": per_supplier(awarded),
+            "Awarded spend USD": spend,
+            "Parts reassigned": per_supplier(reassigned),
+            "Orphaned parts": per_supplier(orphaned),
+            "Orphaned spend USD": per_supplier(orphaned, self.costs),
+            "Landed cost impact USD": per_supplier(reassigned, delta),
+            "Main replacement": np.where(moved_spend.max(axis=1) > 0, np.array(m.suppliers, dtype=object)[main], "-"),
+        })
+        frame["Impact %"] = frame["Landed cost impact USD"] / frame["Awarded spend USD"].where(frame["Awarded spend USD"] > 0)
+        frame = frame[frame["Parts awarded"] > 0]
+        return frame.sort_values("Landed cost impact USD", ascending=False, kind="stable").reset_index(drop=True)
+
+    def set_exit(self, suppliers, name=None):
+        """Impact of a set of suppliers exiting together, as one row dict; raises ValueError for unknown names."""
+        codes = self.matrix.codes(suppliers)
+        if (codes == NO_AWARD).any():
+            unknown = [s for s, code in zip(suppliers, codes) if code == NO_AWARD]
+            raise ValueError(f"unknown supplier(s): {', '.join(unknown)}")
+        affected = np.isin(self.award, codes)
+        replacement = self.ranking.next_best_rows(among=~np.isin(np.arange(len(self.matrix.suppliers)), codes))
+        reassigned = affected & (replacement != NO_AWARD)
+        orphaned = affected & (replacement == NO_AWARD)
+        delta = self._replacement_costs(replacement) - self.costs
+        spend = float(self.costs[affected].sum())
+        return {
+            "Exited": name or ", ".join(suppliers),
+            "Parts awarded": int(affected.sum()),
+            "Awarded spend USD": spend,
+            "Parts reassigned": int(reassigned.sum()),
+            "Orphaned parts": int(orphaned.sum()),
+            "Orphaned spend USD": float(self.costs[orphaned].sum()),
+            "Landed cost impact USD": float(delta[reassigned].sum()),
+            "Impact %": float(delta[reassigned].sum()) / spend if spend > 0 else np.nan,
+        }
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    scenario_path = sys.argv[1] if len(sys.argv) > 1 else "scenarios/scenario_3.yaml"
+    batch = load_scenario_file(scenario_path)
+    config = scenario_config(batch["scenarios"][0])
+    output_prefix = batch["output"] or "scenario_outputs/scenario 3 12052025"
+    exit_sets = read_settings_file(sys.argv[2]) if len(sys.argv) > 2 else []
+    exit_sets = [entry if isinstance(entry, dict) else {"suppliers": entry} for entry in exit_sets]
+
+    matrix = load_bid_matrix(batch["input"], load_supplier_info())
+    award = run_scenario(matrix, config)["award"]
+    allowed = SupplierRules(matrix.parts, matrix.suppliers, config["rules"]).allowed
+    exits = ExitRanking(matrix, award, allowed)
+    print(f"Ranked {matrix.shape[0]} parts x {matrix.shape[1]} suppliers (top {TOP_K}) in {time.time() - start_time:.2f} seconds")
+
+    singles = exits.single_exits()
+    print(f"\nSingle supplier exits ({len(singles)} awarded suppliers), largest landed cost impact first:")
+    print(singles.head(20).to_string(index=False))
+    singles_file = f"{output_prefix} supplier exit.csv"
+    singles.to_csv(singles_file, index=False)
+    print(f"\n✅ Written to '{singles_file}'")
+
+    if exit_sets:
+        sets = pd.DataFrame([exits.set_exit(entry["suppliers"], entry.get("name")) for entry in exit_sets])
+        print("\nSupplier set exits:")
+        print(sets.to_string(index=False))
+        sets_file = f"{output_prefix} supplier exit sets.csv"
+        sets.to_csv(sets_file, index=False)
+        print(f"✅ Written to '{sets_file}'")
+    print(f"⏱ Time taken: {time.time() - start_time:.2f} seconds")
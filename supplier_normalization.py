@@ -0,0 +1,116 @@
+'''
+P21 supplier -> bid supplier normalization.
+
+Names are resolved with an exact lookup on the lower-cased, stripped P21 name first. Names
+that miss are matched against a character trigram index of the P21 names (punctuation
+ignored), and accepted when the Dice similarity of the best candidate reaches min_score.
+Every resolution is memoized in a JSON cache that is discarded when the P21 mapping changes.
+'''
+
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+NO_MATCH = "-"
+BLANK_KEYS = ("", "nan", "none")
+
+
+def normalize_key(name):
+    return str(name).lower().strip()
+
+
+def trigrams(key):
+    # punctuation and repeated spaces do not count towards similarity ("co., ltd" ~ "co ltd")
+    padded = "  " + " ".join(re.sub(r"[^a-z0-9]+", " ", key).split()) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SupplierNormalizer:
+
+    def __init__(self, mapping, cache_path=None, min_score=0.85):
+        self.mapping = {normalize_key(k): v for k, v in mapping.items()}
+        self.cache_path = cache_path
+        self.min_score = min_score
+        self.keys = sorted(self.mapping)
+        self.key_trigrams = [trigrams(k) for k in self.keys]
+        self.index = defaultdict(list)
+        for key_id, grams in enumerate(self.key_trigrams):
+            for gram in grams:
+                self.index[gram].append(key_id)
+        self.mapping_hash = hashlib.sha1(
+            json.dumps(sorted((k, str(v)) for k, v in self.mapping.items())).encode("utf-8")
+        ).hexdigest()
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("mapping_hash") != self.mapping_hash or data.get("min_score") != self.min_score:
+            return {}
+        return data.get("resolved", {})
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"mapping_hash": self.mapping_hash, "min_score": self.min_score, "resolved": self.cache}, f, indent=1)
+
+    def _value(self, key):
+        value = self.mapping[key]
+        return value.strip() if isinstance(value, str) else value
+
+    def best_candidate(self, key):
+        """(P21 key, Dice score) of the closest P21 name, or (None, 0)."""
+        grams = trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for key_id in self.index.get(gram, ()):
+                shared[key_id] += 1
+        best_id, best_score = None, 0.0
+        # keys are sorted, so ties go to the alphabetically first name
+        for key_id in sorted(shared):
+            score = 2.0 * shared[key_id] / (len(grams) + len(self.key_trigrams[key_id]))
+            if score > best_score:
+                best_id, best_score = key_id, score
+        return (None, 0.0) if best_id is None else (self.keys[best_id], best_score)
+
+    def resolve(self, name):
+        """Returns (normalized supplier, method) where method is 'exact', 'fuzzy' or 'miss'."""
+        key = normalize_key(name)
+        if key in self.cache:
+            entry = self.cache[key]
+            return (float("nan") if entry["supplier"] is None else entry["supplier"]), entry["method"]
+
+        if key in self.mapping:
+            supplier, method = self._value(key), "exact"
+        else:
+            candidate, score = self.best_candidate(key) if key not in BLANK_KEYS else (None, 0.0)
+            if candidate is not None and score >= self.min_score:
+                supplier, method = self._value(candidate), "fuzzy"
+            else:
+                supplier, method = NO_MATCH, "miss"
+
+        self.cache[key] = {"supplier": None if pd.isna(supplier) else supplier, "method": method}
+        return supplier, method
+
+    def resolve_series(self, names):
+        """Resolve every distinct name once and map the result back onto the series."""
+        keys = names.map(normalize_key)
+        resolved = {key: self.resolve(key) for key in keys.unique()}
+
+        fuzzy = {key: s for key, (s, method) in resolved.items() if method == "fuzzy"}
+        misses = [key for key, (s, method) in resolved.items() if method == "miss" and key not in BLANK_KEYS]
+        if fuzzy:
+            print(f"Fuzzy-matched {len(fuzzy)} supplier names: {fuzzy}")
+        if misses:
+            print(f"No P21 normalization for {len(misses)} supplier names: {misses}")
+
+        self.save_cache()
+        return keys.map({key: s for key, (s, method) in resolved.items()})
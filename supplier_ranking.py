@@ -0,0 +1,105 @@
+'''
+Per-part ranking of suppliers by landed cost, for the passes that reassign parts.
+
+A part leaves its supplier when a rule excludes the supplier (scenario_3.py re-ranks the sheet's
+lowest and 2nd lowest bidders), when the supplier is a tail supplier (tail_rationalization.py) or
+when it exits (supplier_exit.py). Each pass asks for the part's next best supplier, leaving some
+suppliers out or choosing only among some. SupplierRanking sorts the allowed bids of every part
+once and keeps the count lowest, so a query reads at most count entries of the part.
+
+A part whose ranked suppliers are all left out but that has more bids than the ranking holds is
+re-ranked in full, so the answer does not depend on count. A part with no supplier left gets
+NO_AWARD, and equal bids keep column order.
+
+    ranking = SupplierRanking(matrix.landed, allowed)
+    ranking.next_best(part, excluding={current}, among=large_suppliers)
+'''
+
+import numpy as np
+
+from bid_matrix import NO_AWARD, lowest_bidders
+
+TOP_K = 5
+
+
+def _first_kept(codes, excluding, among):
+    for code in codes:
+        if code == NO_AWARD:
+            break
+        if code not in excluding and (among is None or code in among):
+            return code
+    return NO_AWARD
+
+
+class SupplierRanking:
+    """
+    The count lowest allowed bids of the parts of a parts x suppliers bid array, as supplier codes,
+    lowest first. rows ranks only those parts; queries still take part positions in bids.
+    """
+
+    def __init__(self, bids, allowed=None, count=TOP_K, rows=None):
+        self.bids = bids
+        self.allowed = allowed
+        rows = np.arange(len(bids)) if rows is None else np.asarray(rows, dtype=np.intp)
+        self.position = np.full(len(bids), -1, dtype=np.intp)
+        self.position[rows] = np.arange(len(rows))
+        ranked_allowed = None if allowed is None else allowed[rows]
+        self.order = lowest_bidders(bids[rows], ranked_allowed, count=min(count, bids.shape[1]))
+        valid = bids[rows] > 0
+        if ranked_allowed is not None:
+            valid &= ranked_allowed
+        # parts with more allowed bids than the ranking holds
+        self.deep = valid.sum(axis=1) > self.order.shape[1]
+
+    def _positions(self, parts):
+        positions = self.position[parts]
+        if (positions < 0).any():
+            raise ValueError(f"part(s) not ranked: {np.asarray(parts)[positions < 0][:10].tolist()}")
+        return positions
+
+    def next_best(self, part, excluding=(), among=None):
+        """
+        Code of the lowest allowed bidder of part that is not in excluding and, with among, is in
+        among (sets of supplier codes); NO_AWARD when there is none.
+        """
+        position = self._positions(np.array([part]))[0]
+        best = _first_kept(self.order[position].tolist(), excluding, among)
+        if best == NO_AWARD and self.deep[position]:
+            allowed = None if self.allowed is None else self.allowed[part]
+            best = _first_kept(lowest_bidders(self.bids[part], allowed, count=self.bids.shape[1]).tolist(),
+                               excluding, among)
+        return best
+
+    def next_best_rows(self, rows=None, excluding=None, among=None):
+        """
+        next_best of many parts in one pass. rows: part positions (every ranked part by default);
+        excluding: one supplier code per row (NO_AWARD for none) or a rows x suppliers mask;
+        among: a suppliers or rows x suppliers mask.
+        """
+        rows = np.flatnonzero(self.position >= 0) if rows is None else np.asarray(rows, dtype=np.intp)
+        order = self.order[self._positions(rows)]
+        n_suppliers = self.bids.shape[1]
+        if excluding is None:
+            blocked = np.zeros((len(rows), n_suppliers), dtype=bool)
+        elif np.asarray(excluding).dtype == bool:
+            blocked = np.array(excluding, dtype=bool)
+        else:
+            excluding = np.asarray(excluding, dtype=np.intp)
+            blocked = np.zeros((len(rows), n_suppliers), dtype=bool)
+            has = np.flatnonzero(excluding != NO_AWARD)
+            blocked[has, excluding[has]] = True
+        if among is not None:
+            blocked |= ~np.broadcast_to(among, blocked.shape)
+
+        ranked = order != NO_AWARD
+        kept = ranked & ~np.take_along_axis(blocked, np.where(ranked, order, 0), axis=1)
+        best = np.where(kept.any(axis=1), order[np.arange(len(rows)), np.argmax(kept, axis=1)], NO_AWARD)
+
+        # every ranked supplier was left out, but the part has more bids: rank those parts in full
+        deeper = np.flatnonzero((best == NO_AWARD) & self.deep[self.position[rows]])
+        if len(deeper):
+            allowed = ~blocked[deeper]
+            if self.allowed is not None:
+                allowed &= self.allowed[rows[deeper]]
+            best[deeper] = lowest_bidders(self.bids[rows[deeper]], allowed, count=1)[:, 0]
+        return best
@@ -0,0 +1,192 @@
+'''
+Supplier exclusion rules.
+
+Each rule names a supplier, an action and the parts it covers:
+    - "exclude": the supplier may not be awarded the parts
+    - "force": only the supplier may be awarded the parts
+Parts are selected by Part # ("parts"), ROW ID # ("row_ids"), material ("materials") or
+division ("divisions"); a rule with several selectors covers the parts matching all of them,
+a rule with none covers every part. SupplierRules compiles the rules into a boolean mask over
+the parts x suppliers bid matrix, so a single ranking over the allowed bids gives the best and
+next-best supplier a part can actually be awarded to.
+'''
+
+import numpy as np
+import pandas as pd
+
+EXCLUDE = "exclude"
+FORCE = "force"
+
+# rule selector -> bidsheet column it matches against
+PART_SELECTORS = {
+    "parts": "Part #",
+    "row_ids": "ROW ID #",
+    "materials": "type",
+    "divisions": "Division",
+}
+
+SUPPLIER_RULES = [
+    {
+        "supplier": "Binzhou Zeli",
+        "action": EXCLUDE,
+        "reason": "Binzhou Zeli avoided",
+        "parts": [
+        "CGBSL-200-A1", "CGDSL-200-A1", "CGCSL-200CR-A1", "CDCSL-200-A1", "CDCSL-300-A1", "CGBSL-300-A1",
+        "CGDSL-300-A1", "CGCSL-300CR-A1", "CGBSL-400-A1", "CGDSL-400-A1", "CDCSL-400-A1", "CDCSL-200-SS1",
+        "CGCSL-400CR-A1", "CGBSL-200-SS1", "CGCSL-200CR-SS1", "CGDSL-200-SS1", "CDCSL-600-A1", "CDCSL-300-SS1",
+        "CGDSL-600-A1", "CGBSL-300-SS1", "CGCSL-600CR-A1", "CGDSL-300-SS1", "CGCSL-300CR-SS1", "CDCSL-400-SS1",
+        "CGBSL-400-SS1", "CGDSL-400-SS1", "CGCSL-400CR-SS1", "CDCSL-600-SS1", "CGBSL-600-SS1", "CGDSL-600-SS1",
+        "CGCSL-600CR-SS1",
+        ],
+    },
+    {
+        "supplier": "West Legend-MTD",
+        "action": EXCLUDE,
+        "reason": "West Legend-MTD avoided",
+    },
+    {
+        "supplier": "Manek Metalcraft",
+        "action": EXCLUDE,
+        "reason": "Manek Metalcraft avoided for red_brass",
+        "row_ids": [
+        "619", "13908", "618", "13907", "620", "13909", "621", "13910", "13911", "622", "13912", "13913", "5574", "623",
+        "13914", "5575", "5576", "624", "5577", "5578", "5579", "5634", "596", "13889", "13893", "13895", "594", "13887",
+        "595", "13888", "599", "13892", "13894", "600", "13896", "593", "5562", "597", "13890", "598", "13891", "7902",
+        "12297", "5564", "12298", "603", "5565", "584", "5554", "585", "13870", "586", "13871", "13872", "587", "13873",
+        "13875", "13876", "13877", "5556", "588", "5557", "5548", "581", "13867", "582", "13868", "5550", "583", "5551",
+        "5552", "628", "5589", "5590", "629", "5591", "630", "5592", "5593", "631", "5594", "12326", "5596", "5597",
+        "5598", "5599", "5600", "5601", "5602", "5603", "5604", "13915", "13916", "5580", "13917", "5581", "625", "5582",
+        "626", "5583", "5584", "627", "5585", "5586", "5588", "632", "5605", "5606", "633", "5607", "634", "5608",
+        "635", "5609", "636", "5610", "637", "5611", "5612", "13515", "639", "5613", "640", "5614", "5615", "641",
+        "5616", "642", "5617", "643", "5618", "5619", "644", "5620", "5621", "5635", "645", "5622", "5623", "5624",
+        "5626", "646", "5627", "647", "5628", "648", "5629", "5630", "5631", "5632", "612", "13904", "605", "13897",
+        "606", "13898", "604", "5566", "607", "13899", "608", "13900", "609", "13901", "610", "13902", "611", "13903",
+        "613", "13905", "614", "13906", "5567", "615", "5568", "5569", "13279", "617", "5570", "5571", "5572", "13878",
+        "13879", "13880", "590", "13881", "591", "13883", "13884", "13885", "592", "13886", "589", "5560", "13882", "5633",
+        "12518", "9839",
+        ],
+    },
+    {
+        "supplier": "Oston Industrial",
+        "action": EXCLUDE,
+        "reason": "Oston Industrial no longer supplies",
+        "row_ids": [
+        "11", "15", "276", "277", "4703", "4704", "4937", "9619", "9709", "11151",
+        ],
+    },
+    {
+        "supplier": "ZHEJIANG WANDEKAI",
+        "action": EXCLUDE,
+        "reason": "ZHEJIANG WANDEKAI no longer supplies",
+        "row_ids": [
+        "1578", "1793", "1794", "1896", "1899", "3005", "4377", "4381", "4382", "4383", "4406", "4407", "4408", "4413",
+        "4414", "4415", "4416", "4417", "4421", "4423", "4425", "4454", "4455", "4456", "4458", "4744", "4749", "4754",
+        "4787", "4797", "4800", "4809", "4810", "4821", "5853", "5854", "7904", "8411", "8412", "8413", "8432", "8433",
+        "8434", "8435", "8521", "8522", "8539", "8540", "8541", "9448", "9695", "13160", "13161", "13162",
+        ],
+    },
+    {
+        "supplier": "Coda",
+        "action": EXCLUDE,
+        "reason": "Coda no longer supplies",
+        "row_ids": [
+        "1163", "1164", "1165", "1166", "1167", "1173", "1176", "1177", "1178", "1179", "1180", "1181", "1182", "1183",
+        "1184", "1185", "1186", "1187", "1188", "1190", "1213", "1277", "1288", "1289", "1290", "1305", "1306", "1308",
+        "1309", "1310", "1311", "1312", "1318", "1319", "1320", "1321", "1322", "1323", "1327", "1328", "1333", "1335",
+        "1341", "1342", "1346", "1347", "1348", "1352", "1358", "1359", "1360", "1361", "1362", "1364", "1365", "1366",
+        "1367", "1368", "1369", "1370", "1372", "1374", "1379", "1386", "1387", "1388", "1389", "1390", "1393", "1394",
+        "1395", "1396", "1397", "1398", "1399", "1400", "1405", "1406", "1407", "1408", "1409", "1410", "1411", "1412",
+        "1413", "1414", "1415", "1416", "1417", "1418", "1425", "1429", "1430", "1439", "1441", "1445", "1446", "1448",
+        "1489", "1490", "1498", "1499", "1510", "1511", "1516", "1520", "6813", "6815", "6825", "6838", "6839", "6844",
+        "6851", "6852", "6864", "6866", "6890", "6893", "6909", "6910", "6911", "6912", "6917", "6918", "6919", "6927",
+        "6928", "6929", "6930", "6932", "6933", "6934", "6939", "7060", "7071", "7072", "7073", "7076", "7089", "7090",
+        "7102", "7111", "7117", "7119", "7125", "7126", "7136", "7145", "7185", "7186", "7187", "7188", "7189", "7197",
+        "7207", "7209", "7210", "7211", "7212", "7213", "7214", "7215", "7254", "7256", "7300", "7301", "7306", "7331",
+        "7332", "7826", "7919", "8742", "8772", "8915", "9994", "13613",
+        ],
+    },
+]
+
+RULE_KEYS = ("supplier", "action", "reason") + tuple(PART_SELECTORS)
+
+# parts whose incumbent is one of these are dropped from the bidsheet altogether
+DROPPED_INCUMBENTS = ['Bugatti Group']
+
+
+def _as_text(values):
+    """Selector keys as stripped strings; whole floats (ROW IDs read with NaNs) lose their '.0'."""
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(str).to_numpy(dtype=object)
+    return values.map(
+        lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v).strip()
+    ).to_numpy(dtype=object)
+
+
+def check_rules(rules):
+    """Raises ValueError on unknown rule keys or actions."""
+    for rule in rules or []:
+        unknown = set(rule) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"unknown rule key(s) in rule for {rule.get('supplier')}: {', '.join(sorted(unknown))}")
+        if rule.get("action") not in (EXCLUDE, FORCE):
+            raise ValueError(f"unknown action {rule.get('action')!r} in rule for {rule.get('supplier')}")
+
+
+def rule_parts(rule, parts, keys=None):
+    """
+    Boolean mask of the rows of parts (a bidsheet frame) that a rule covers. keys caches the
+    parts' selector columns as text across rules.
+    """
+    keys = {} if keys is None else keys
+    covered = np.ones(len(parts), dtype=bool)
+    for selector, col in PART_SELECTORS.items():
+        if selector not in rule:
+            continue
+        if col not in parts:
+            raise ValueError(f"rule for {rule['supplier']} selects by {selector}, but the parts have no '{col}' column")
+        if col not in keys:
+            keys[col] = _as_text(parts[col])
+        covered &= pd.Index(keys[col]).isin(_as_text(rule[selector]))
+    return covered
+
+
+class SupplierRules:
+    """
+    The rules compiled against one set of parts. allowed is a parts x suppliers boolean mask over
+    the given supplier columns; blocking_rule answers the same for any supplier name per part
+    (e.g. an incumbent that has no bid column).
+    """
+
+    def __init__(self, parts, suppliers, rules=None):
+        self.rules = SUPPLIER_RULES if rules is None else rules
+        self.suppliers = list(suppliers)
+        check_rules(self.rules)
+        keys = {}
+        self.covered = [rule_parts(rule, parts, keys) for rule in self.rules]
+        self.allowed = np.ones((len(parts), len(self.suppliers)), dtype=bool)
+        for rule, covered in zip(self.rules, self.covered):
+            named = np.array([supplier == rule["supplier"] for supplier in self.suppliers], dtype=bool)
+            self.allowed[np.ix_(covered, named if rule["action"] == EXCLUDE else ~named)] = False
+
+    def blocking_rule(self, names):
+        """Per part, the index of the first rule that keeps it away from the supplier named for it, -1 if none."""
+        names = np.asarray(names, dtype=object)
+        blocking = np.full(len(names), -1, dtype=np.intp)
+        for i in reversed(range(len(self.rules))):
+            rule = self.rules[i]
+            named = names == rule["supplier"]
+            blocked = self.covered[i] & (named if rule["action"] == EXCLUDE else ~named)
+            blocking[blocked] = i
+        return blocking
+
+    def allows(self, names):
+        """Per part, whether the supplier named for it may be awarded the part."""
+        return self.blocking_rule(names) < 0
+
+    def reason(self, rule_index):
+        return self.rules[rule_index]["reason"]
+
+    def summary(self):
+        """(supplier, action, number of parts covered) per rule."""
+        return [(rule["supplier"], rule["action"], int(covered.sum())) for rule, covered in zip(self.rules, self.covered)]
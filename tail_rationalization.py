@@ -0,0 +1,117 @@
+'''
+Tail supplier rationalization.
+
+Suppliers awarded less than a spend threshold in total are tail suppliers; the others are
+large suppliers. A part held by a tail supplier moves to its incumbent when that is a large
+supplier with a bid, else to its lowest bid among the large suppliers, else to its incumbent.
+Parts with a single valid bid go back to their incumbent.
+
+The supplier totals are one grouped sum over the award vector and the next-best large supplier
+one lookup in a supplier_ranking.SupplierRanking of the tail parts' bids. Moving parts raises the totals of the suppliers that
+receive them, which can lift an incumbent over the threshold and give the remaining tail parts
+a new large option; with fixed_point the pass is repeated on the new totals until no part moves.
+'''
+
+import numpy as np
+
+from bid_matrix import NO_AWARD
+from supplier_ranking import SupplierRanking
+
+TAIL_SPEND_THRESHOLD = 100000
+
+TO_INCUMBENT_SINGLE_BID = "Forced to incumbent because no other bid on it."
+TO_LARGE_SUPPLIER = "Rationalized to other bidder than than bidder based on logic"
+TO_INCUMBENT_ANYWAY = "incumbent anyway"
+
+
+def supplier_totals(award, spend, n_suppliers):
+    """Awarded spend per supplier code and number of parts held, over the parts that have an award."""
+    awarded = award != NO_AWARD
+    totals = np.bincount(award[awarded], weights=spend[awarded], minlength=n_suppliers)
+    counts = np.bincount(award[awarded], minlength=n_suppliers)
+    return totals, counts
+
+
+def _rationalize_once(matrix, award, rows, large, valid_count, allowed, ranking):
+    """New supplier and reason for the parts in rows (all held by tail suppliers)."""
+    current = award[rows]
+    incumbent = matrix.incumbent[rows]
+    has_incumbent = incumbent != NO_AWARD
+    incumbent_ok = np.zeros(len(rows), dtype=bool)
+    inc_rows, inc_codes = rows[has_incumbent], incumbent[has_incumbent]
+    incumbent_ok[has_incumbent] = large[inc_codes] & (matrix.landed[inc_rows, inc_codes] > 0)
+    if allowed is not None:
+        incumbent_ok[has_incumbent] &= allowed[inc_rows, inc_codes]
+
+    among = large if allowed is None else large[None, :] & allowed[rows]
+    best = ranking.next_best_rows(rows, excluding=current, among=among)
+
+    single = valid_count[rows] == 1
+    new = np.where(incumbent_ok | single | (best == NO_AWARD), incumbent, best)
+    reason = np.where(single, TO_INCUMBENT_SINGLE_BID,
+                      np.where(incumbent_ok | (best != NO_AWARD), TO_LARGE_SUPPLIER, TO_INCUMBENT_ANYWAY)).astype(object)
+    # a part without an incumbent to fall back to stays where it is
+    new = np.where(new == NO_AWARD, current, new)
+    return new, reason
+
+
+def rationalize_tail(matrix, award, spend, valid_count, allowed=None, threshold=TAIL_SPEND_THRESHOLD,
+                     fixed_point=False, tail_suppliers=None, unit_costs=None, ranking=None):
+    """
+    award: supplier code per part; spend: awarded landed extended cost per part; valid_count: number
+    of valid bids per part (parts with none neither count towards the totals nor move);
+    tail_suppliers: supplier codes treated as tail suppliers whatever their total; unit_costs:
+    matrix.unit_costs(allowed), when the caller already has it; ranking: a SupplierRanking of
+    matrix.landed over allowed (or a wider mask) covering the tail parts, ranked here when not given.
+
+    Returns a dict with the new award and spend, the parts that moved with their original supplier
+    and reason, the supplier totals before the pass, the tail supplier codes and the rounds run.
+    """
+    award = award.copy()
+    spend = spend.copy()
+    counted = valid_count != 0
+    totals, counts = supplier_totals(np.where(counted, award, NO_AWARD), spend, len(matrix.suppliers))
+    first_totals = totals
+    always_tail = np.zeros(len(matrix.suppliers), dtype=bool)
+    if tail_suppliers is not None:
+        codes = np.asarray(tail_suppliers, dtype=np.intp)
+        always_tail[codes[codes != NO_AWARD]] = True
+    tail = np.flatnonzero((counts > 0) & ((totals < threshold) | always_tail))
+    moved_from = np.full(len(award), NO_AWARD, dtype=np.intp)
+    reasons = np.full(len(award), "", dtype=object)
+    unit_costs = matrix.unit_costs(allowed) if unit_costs is None else unit_costs
+    if ranking is None:
+        # later rounds only move parts of the first round's tail suppliers
+        ranked = np.flatnonzero(np.isin(award, tail) & (valid_count >= 1))
+        ranking = SupplierRanking(matrix.landed, allowed, rows=ranked)
+
+    rounds = 0
+    # a part only ever moves to a large supplier or to its incumbent, so this settles within a few rounds
+    while True:
+        rounds += 1
+        large = (counts > 0) & (totals >= threshold) & ~always_tail
+        rows = np.flatnonzero(np.isin(award, np.flatnonzero(~large & (counts > 0))) & (valid_count >= 1))
+        new, reason = _rationalize_once(matrix, award, rows, large, valid_count, allowed, ranking)
+        changed = new != award[rows]
+        rows, new, reason = rows[changed], new[changed], reason[changed]
+        if not len(rows):
+            break
+        moved_from[rows] = np.where(moved_from[rows] == NO_AWARD, award[rows], moved_from[rows])
+        reasons[rows] = reason
+        award[rows] = new
+        spend[rows] = np.nan_to_num(unit_costs[rows, new] * matrix.volume[rows])
+        if not fixed_point:
+            break
+        totals, counts = supplier_totals(np.where(counted, award, NO_AWARD), spend, len(matrix.suppliers))
+
+    moved = moved_from != NO_AWARD
+    return {
+        "award": award,
+        "spend": spend,
+        "moved": np.flatnonzero(moved),
+        "moved_from": moved_from[moved],
+        "reasons": reasons[moved],
+        "totals": first_totals,
+        "tail": tail,
+        "rounds": rounds,
+    }
@@ -0,0 +1,223 @@
+'''
+Monte Carlo tariff uncertainty over a scenario's award.
+
+The tariffs in tariff_part_level_cleaned.csv are point estimates. A simulation file gives a
+distribution of the tariff change (points added to the point estimate) per supplier country,
+or per country and metal type. Every sample draws one change per distribution. The landed
+costs of all its bids follow from landed_model.LandedCostModel. The scenario is then
+re-awarded: the greedy choice of every part, then the caps, the new-share threshold and the
+tail pass.
+
+Samples are evaluated in chunks, and each chunk is one array operation over samples x parts x
+suppliers. The chunks run on a process pool that shares the bid matrix (scenario_runner.py).
+Chunk i draws from seed (seed, i), so results do not depend on the number of processes.
+
+    python tariff_simulation.py scenarios/tariff_uncertainty.yaml [processes]
+
+prints the distribution of landed savings, switch rate and new-supplier share against the
+point estimate, and writes "<output> tariff simulation.csv" (one row per sample) and
+"<output> tariff simulation suppliers.csv" (awarded spend share per supplier: mean, 5th and
+95th percentile).
+'''
+
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from bid_matrix import NO_AWARD, BidMatrix
+from landed_model import LandedCostModel, changed_costs
+from scenario_engine import (admit_moves, load_bid_matrix, load_scenario_file, load_supplier_info, part_choices,
+                             read_settings_file, run_scenario, scenario_config, share_limit, tail_pass)
+from scenario_runner import SharedBidMatrix, attach
+from supplier_rules import SupplierRules
+
+# distribution -> its parameters, all in tariff points (0.10 = 10 points)
+DISTRIBUTIONS = {"normal": ("mean", "sd"), "uniform": ("low", "high"), "triangular": ("low", "mode", "high")}
+SIMULATION_KEYS = ("scenario", "samples", "chunk", "seed", "tariffs")
+DEFAULT_SAMPLES = 1000
+# samples per chunk: a chunk holds a few samples x parts x suppliers float arrays
+DEFAULT_CHUNK = 8
+
+
+def tariff_factors(tariffs):
+    """
+    [(country, metal type or None, distribution)] of a {country: distribution | {metal type:
+    distribution}} mapping; raises ValueError on unknown distributions or missing parameters.
+    """
+    factors = []
+    for country, spec in tariffs.items():
+        by_metal = spec.items() if "dist" not in spec else [(None, spec)]
+        for metal, dist in by_metal:
+            params = DISTRIBUTIONS.get(dist.get("dist"))
+            if params is None:
+                raise ValueError(f"{country}: unknown distribution {dist.get('dist')!r}, expected one of {tuple(DISTRIBUTIONS)}")
+            missing = [param for param in params if param not in dist]
+            if missing:
+                raise ValueError(f"{country}: {dist['dist']} distribution needs {', '.join(missing)}")
+            factors.append((country, metal, dist))
+    return factors
+
+
+def factor_codes(model, factors):
+    """parts x suppliers index of the factor that moves each cell's tariff, -1 for none."""
+    codes = np.full(model.matrix.shape, -1, dtype=np.int32)
+    for i, (country, metal, _) in enumerate(factors):
+        cells = model.in_country(country) & model.tariffed[:, None]
+        if metal is not None:
+            cells &= model.of_metal(metal)
+        codes[cells] = i
+    return codes
+
+
+def draw(factors, samples, rng):
+    """samples x factors tariff changes."""
+    draws = np.empty((samples, len(factors)))
+    for i, (_, _, dist) in enumerate(factors):
+        if dist["dist"] == "normal":
+            draws[:, i] = rng.normal(dist["mean"], dist["sd"], samples)
+        elif dist["dist"] == "uniform":
+            draws[:, i] = rng.uniform(dist["low"], dist["high"], samples)
+        else:
+            draws[:, i] = rng.triangular(dist["low"], dist["mode"], dist["high"], samples)
+    return draws
+
+
+class TariffSimulation:
+    """A scenario config and tariff factors over one BidMatrix; run_chunk evaluates a chunk of samples."""
+
+    def __init__(self, matrix, config, factors, codes, seed=0):
+        self.matrix = matrix
+        self.config = scenario_config(config)
+        if self.config["mode"] != "greedy":
+            raise ValueError("the tariff simulation re-awards with the greedy mode")
+        self.factors = factors
+        self.codes = codes
+        self.seed = seed
+        self.allowed = SupplierRules(matrix.parts, matrix.suppliers, self.config["rules"]).allowed
+        self.valid_count = matrix.valid_count()
+
+    def run_chunk(self, chunk, samples):
+        """Per sample figures of chunk number chunk: landed savings, new supplier spend, parts switched, supplier spend."""
+        m = self.matrix
+        draws = draw(self.factors, samples, np.random.default_rng([self.seed, chunk]))
+        # the last column is the "no factor" cell change
+        change = np.concatenate([draws, np.zeros((samples, 1))], axis=1)[:, self.codes]
+        landed, incumbent_landed, baseline_cost = changed_costs(m, change)
+        del change
+
+        unit_costs = landed.copy()
+        rows = np.flatnonzero(m.incumbent != NO_AWARD)
+        incumbent = m.incumbent[rows]
+        unit_costs[:, rows, incumbent] = np.where(np.isnan(landed[:, rows, incumbent]),
+                                                  incumbent_landed[:, rows], landed[:, rows, incumbent])
+        unit_costs[:, ~self.allowed] = np.nan
+        choice, extended, forced = part_choices(m, unit_costs)
+
+        result = {"savings": np.empty(samples), "new_spend": np.empty(samples), "switched": np.empty(samples),
+                  "supplier_spend": np.empty((samples, len(m.suppliers)))}
+        for k in range(samples):
+            sample = BidMatrix(m.parts, m.suppliers, landed[k], m.fob, m.volume, baseline_cost[k], m.wapp,
+                               m.incumbent, incumbent_landed[k])
+            award = admit_moves(sample, choice[k], extended[k], forced[k], share_limit(self.config), self.config["caps"])
+            if self.config["tail_threshold"] is not None or self.config["tail_suppliers"]:
+                award = tail_pass(sample, award, self.allowed, self.config, unit_costs[k], self.valid_count)["award"]
+            costs = sample.award_costs(award, unit_costs[k])
+            costed = ~np.isnan(costs)
+            moved = costed & (award != m.incumbent)
+            result["savings"][k] = (baseline_cost[k][costed] - costs[costed]).sum()
+            result["new_spend"][k] = costs[moved].sum()
+            result["switched"][k] = moved.sum()
+            result["supplier_spend"][k] = np.bincount(award[costed], weights=costs[costed], minlength=len(m.suppliers))
+        return result
+
+
+_worker = {}
+
+
+def _init_worker(spec, parts, suppliers, config, factors, codes, seed):
+    matrix, _worker["blocks"] = attach(spec, parts, suppliers)
+    _worker["simulation"] = TariffSimulation(matrix, config, factors, codes, seed)
+
+
+def _run_chunk(task):
+    return _worker["simulation"].run_chunk(*task)
+
+
+def simulate(simulation, samples, chunk=DEFAULT_CHUNK, processes=None):
+    """Per sample figures of samples draws (dict of arrays, in sample order), over a process pool."""
+    tasks = [(i, min(chunk, samples - start)) for i, start in enumerate(range(0, samples, chunk))]
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        results = [simulation.run_chunk(*task) for task in tasks]
+    else:
+        m = simulation.matrix
+        with SharedBidMatrix(m) as shared:
+            initargs = (shared.spec, m.parts, m.suppliers, simulation.config, simulation.factors, simulation.codes,
+                        simulation.seed)
+            with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+                results = pool.map(_run_chunk, tasks, chunksize=1)
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def distribution(values, label):
+    return {"Figure": label, "Mean": values.mean(), "P5": np.percentile(values, 5), "P50": np.percentile(values, 50),
+            "P95": np.percentile(values, 95)}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python tariff_simulation.py <simulation file> [processes]")
+    start_time = time.time()
+    spec = read_settings_file(sys.argv[1])
+    unknown = set(spec) - set(SIMULATION_KEYS)
+    if unknown:
+        sys.exit(f"{sys.argv[1]}: unknown key(s): {', '.join(sorted(unknown))}")
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    batch = load_scenario_file(spec.get("scenario", "scenarios/scenario_3.yaml"))
+    config = batch["scenarios"][0]
+    output_prefix = batch["output"] or "scenario_outputs/scenario 3 12052025"
+    samples = int(spec.get("samples", DEFAULT_SAMPLES))
+
+    supplier_info = load_supplier_info()
+    matrix = load_bid_matrix(batch["input"], supplier_info)
+    factors = tariff_factors(spec.get("tariffs") or {})
+    codes = factor_codes(LandedCostModel(matrix, supplier_info), factors)
+    print(f"Loaded {matrix.shape[0]} parts x {matrix.shape[1]} suppliers in {time.time() - start_time:.2f} seconds; "
+          f"{len(factors)} tariff distributions over {int((codes >= 0).sum())} bids")
+
+    point = run_scenario(matrix, config)["summary"]
+    simulation = TariffSimulation(matrix, config, factors, codes, seed=spec.get("seed", 0))
+    sim_start = time.time()
+    result = simulate(simulation, samples, chunk=int(spec.get("chunk", DEFAULT_CHUNK)), processes=processes)
+    print(f"{samples} samples in {time.time() - sim_start:.2f} seconds")
+
+    total_spend = result["supplier_spend"].sum(axis=1)
+    per_sample = pd.DataFrame({
+        "Sample": np.arange(samples),
+        "Landed savings USD": result["savings"],
+        "New supplier spend USD": result["new_spend"],
+        "Parts switched": result["switched"].astype(int),
+        "Switch rate": result["switched"] / matrix.shape[0],
+        "New supplier share": result["new_spend"] / total_spend,
+    })
+    figures = pd.DataFrame([distribution(per_sample[col].to_numpy(), col) for col in
+                            ["Landed savings USD", "Switch rate", "New supplier share"]])
+    print(f"\nPoint estimate: landed savings ${point['Landed savings USD']:,.2f}, {point['Parts switched']} parts switched")
+    print(figures.to_string(index=False))
+
+    shares = result["supplier_spend"] / total_spend[:, None]
+    suppliers = pd.DataFrame({"Supplier": matrix.suppliers, "Mean share": shares.mean(axis=0),
+                              "P5 share": np.percentile(shares, 5, axis=0), "P95 share": np.percentile(shares, 95, axis=0)})
+    suppliers = suppliers.sort_values("Mean share", ascending=False, kind="stable")
+    print("\nAwarded spend share per supplier (top 15):")
+    print(suppliers.head(15).to_string(index=False))
+
+    samples_file, suppliers_file = f"{output_prefix} tariff simulation.csv", f"{output_prefix} tariff simulation suppliers.csv"
+    per_sample.to_csv(samples_file, index=False)
+    suppliers.to_csv(suppliers_file, index=False)
+    print(f"\n✅ Written to '{samples_file}' and '{suppliers_file}'")
+    print(f"⏱ Time taken: {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,148 @@
+'''
+Warm what-if server for interactive scenario queries.
+
+Loads the landed bidsheet, the supplier port / freight / tariff lookups and the base scenario
+once, then answers what-if queries over HTTP on localhost. A query is evaluated against the
+in-memory state: tariff and freight changes are array updates of the landed costs
+(landed_model.py), exclusions and settings go through scenario_state.ScenarioState.
+
+    python whatif_server.py [scenario file] [port]
+
+serves the first scenario of the scenario file (scenarios/scenario_3.yaml by default) on
+http://127.0.0.1:8765. POST /whatif takes a JSON object, every key optional:
+
+    {"tariff": {"India": 0.10},          tariff points added per supplier country, or {country: {metal type: points}}
+     "freight": {"China": 1.2},          factor on the freight multiplier of the country's ports
+     "exclude_suppliers": ["Coda"],      suppliers left out of every part
+     "rules": [...],                     more exclusion rules, in the supplier_rules.py format
+     "percent_new": 0.6, "caps": {...}, "tail_threshold": 100000, "tail_suppliers": [...]}
+
+and returns the base and what-if summaries, their difference and the parts that changed
+supplier. Every query starts from the base scenario. GET /base returns the base summary.
+
+    curl -s localhost:8765/whatif -d '{"tariff": {"India": 0.10}}'
+'''
+
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+from landed_model import LandedCostModel
+from scenario_engine import load_bid_matrix, load_scenario_file, load_supplier_info
+from scenario_state import DELTA_KEYS, ScenarioState
+from supplier_rules import EXCLUDE
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+WHATIF_KEYS = ("tariff", "freight", "exclude_suppliers") + DELTA_KEYS
+
+
+def _json_default(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+class WhatIf:
+    """The base scenario of one bid matrix, kept in memory; answer evaluates a what-if query against it."""
+
+    def __init__(self, matrix, supplier_info, config):
+        self.matrix = matrix
+        self.model = LandedCostModel(matrix, supplier_info)
+        self.base = ScenarioState(matrix, config)
+
+    def answer(self, query):
+        """Result dict of a what-if query (keys in WHATIF_KEYS); raises ValueError on a bad query."""
+        start = time.time()
+        if not isinstance(query, dict):
+            raise ValueError("a what-if query is a JSON object")
+        unknown = set(query) - set(WHATIF_KEYS)
+        if unknown:
+            raise ValueError(f"unknown what-if key(s): {', '.join(sorted(unknown))}")
+        delta = {key: query[key] for key in DELTA_KEYS if key in query}
+        delta["rules"] = list(query.get("rules") or []) + [
+            {"supplier": supplier, "action": EXCLUDE, "reason": f"{supplier} excluded (what-if)"}
+            for supplier in query.get("exclude_suppliers") or []]
+
+        if query.get("tariff") or query.get("freight"):
+            shifted = self.model.shifted(query.get("tariff"), query.get("freight"))
+            state = ScenarioState(shifted, self.base.config)
+        else:
+            state = self.base.branch()
+        result = state.apply(delta)
+
+        base = self.base.result
+        changed = np.flatnonzero(result["award"] != base["award"])
+        return {
+            "name": result["name"],
+            "base": base["summary"],
+            "whatif": result["summary"],
+            "difference": {key: result["summary"][key] - value for key, value in base["summary"].items()},
+            "parts_changed": len(changed),
+            "changes": [
+                {"ROW ID #": row_id, "from": before, "to": after}
+                for row_id, before, after in zip(self.matrix.row_ids[changed].tolist(),
+                                                 self.matrix.names(base["award"][changed]).tolist(),
+                                                 self.matrix.names(result["award"][changed]).tolist())
+            ],
+            "seconds": time.time() - start,
+        }
+
+
+class WhatIfHandler(BaseHTTPRequestHandler):
+    """GET /base and POST /whatif against the server's WhatIf."""
+
+    def do_GET(self):
+        if self.path != "/base":
+            self._reply(404, {"error": f"unknown path {self.path}, use GET /base or POST /whatif"})
+            return
+        base = self.server.whatif.base.result
+        self._reply(200, {"name": base["name"], "base": base["summary"]})
+
+    def do_POST(self):
+        if self.path != "/whatif":
+            self._reply(404, {"error": f"unknown path {self.path}, use GET /base or POST /whatif"})
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            payload = self.server.whatif.answer(json.loads(body or b"{}"))
+        except (ValueError, KeyError, TypeError) as exc:
+            self._reply(400, {"error": str(exc)})
+            return
+        self._reply(200, payload)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(whatif, host=HOST, port=PORT):
+    """Serve whatif until interrupted."""
+    server = HTTPServer((host, port), WhatIfHandler)
+    server.whatif = whatif
+    print(f"What-if server on http://{host}:{port} (POST /whatif, GET /base), Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    scenario_path = sys.argv[1] if len(sys.argv) > 1 else "scenarios/scenario_3.yaml"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+    start_time = time.time()
+    batch = load_scenario_file(scenario_path)
+    supplier_info = load_supplier_info()
+    matrix = load_bid_matrix(batch["input"], supplier_info)
+    whatif = WhatIf(matrix, supplier_info, batch["scenarios"][0])
+    print(f"Loaded {matrix.shape[0]} parts x {matrix.shape[1]} suppliers and scenario "
+          f"'{whatif.base.result['name']}' in {time.time() - start_time:.1f} seconds")
+    serve(whatif, port=port)